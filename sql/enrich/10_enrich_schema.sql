@@ -0,0 +1,68 @@
+-- enriched fact table: one row per curated record, written fully enriched by 20_enrich_focos.sql
+create schema if not exists curated;
+
+-- monthly range partitions on file_date (see curated.ensure_month_partition)
+create table if not exists curated.inpe_focos_enriched (
+  event_hash text not null,
+  file_date date not null,
+  view_ts text,
+  satelite text,
+  municipio text,
+  estado text,
+  bioma text,
+  lat double precision not null,
+  lon double precision not null,
+  geom geometry(Point, 4326),
+  inserted_at timestamptz not null default now(),
+  mun_cd_mun text,
+  mun_nm_mun text,
+  mun_uf text,
+  mun_area_km2 double precision,
+  primary key (event_hash, file_date)
+) partition by range (file_date);
+
+-- 20_enrich_focos.sql upserts on (event_hash, file_date); a legacy heap table keyed on
+-- event_hash alone cannot take that conflict target
+do $$
+begin
+  if not exists (
+    select 1
+    from pg_index i
+    where i.indrelid = 'curated.inpe_focos_enriched'::regclass
+      and i.indisunique
+      and (
+        select array_agg(a.attname::text order by a.attname)
+        from pg_attribute a
+        where a.attrelid = i.indrelid and a.attnum = any(i.indkey)
+      ) = array['event_hash', 'file_date']
+      and i.indnkeyatts = 2
+  ) then
+    raise exception 'curated.inpe_focos_enriched has no unique key on (event_hash, file_date) (legacy layout) | run: python -m etl.app partitions --migrate';
+  end if;
+end $$;
+
+-- bioma/uc/ti attribution (tables created before the unified pass get them here)
+alter table curated.inpe_focos_enriched
+  add column if not exists cd_bioma text,
+  add column if not exists uc_id text,
+  add column if not exists cd_cnuc text,
+  add column if not exists nome_uc text,
+  add column if not exists terrai_cod text,
+  add column if not exists terrai_nom text,
+  add column if not exists etnia_nome text,
+  add column if not exists bioma_checked boolean default false,
+  add column if not exists uc_checked boolean default false,
+  add column if not exists ti_checked boolean default false;
+
+-- one partition per month touched by [START, END]
+select curated.ensure_month_partition('curated.inpe_focos_enriched'::regclass, m::date)
+from generate_series(date_trunc('month', :'START'::date), :'END'::date, interval '1 month') m;
+
+create index if not exists idx_curated_inpe_focos_enriched_geom
+  on curated.inpe_focos_enriched using gist (geom);
+
+create index if not exists idx_curated_inpe_focos_enriched_file_date
+  on curated.inpe_focos_enriched (file_date);
+
+create index if not exists idx_curated_inpe_focos_enriched_mun_cd_mun
+  on curated.inpe_focos_enriched (mun_cd_mun);
@@ -0,0 +1,151 @@
+-- single-pass enrichment of the file_dates in [START, END] (one day for run_enrich, a month or
+-- a whole range for run_enrich_range): municipality, bioma, uc and ti are computed into
+-- temp tables for the rows still to enrich, then each row is written once, fully enriched.
+-- new rows are inserted; rows left half-checked by older runs are completed by the same
+-- statement through on conflict. rows without geom are inserted unchecked, as before.
+begin;
+
+set local jit = off;
+set local work_mem = '256MB';
+set local maintenance_work_mem = '512MB';
+set local synchronous_commit = off;
+
+-- working set: not enriched yet, or enriched with some attribution unchecked
+create temp table tmp_src on commit drop as
+select
+  f.event_hash, f.file_date, f.view_ts, f.satelite, f.municipio, f.estado, f.bioma,
+  f.lat, f.lon, f.geom
+from curated.inpe_focos f
+left join curated.inpe_focos_enriched e
+  on e.event_hash = f.event_hash
+ and e.file_date = f.file_date
+ and e.file_date between :'START'::date and :'END'::date
+where f.file_date between :'START'::date and :'END'::date
+  and (
+    e.event_hash is null
+    or (f.geom is not null and not (e.bioma_checked and e.uc_checked and e.ti_checked))
+  );
+
+-- attribution of tmp_src, up to the write below. etl.bench enrich-engine runs this same
+-- section on fixture points to check the python engine against it.
+create index tmp_src_geom_gix on tmp_src using gist (geom);
+create index tmp_src_key_idx on tmp_src (event_hash, file_date);
+analyze tmp_src;
+
+-- municipality: point in polygon against the subdivided pieces (sql/ref/06_ref_municipios_sub.sql).
+-- a point on a shared border takes the lowest cd_mun.
+create temp table tmp_mun on commit drop as
+select distinct on (s.event_hash, s.file_date)
+  s.event_hash,
+  s.file_date,
+  m.cd_mun
+from tmp_src s
+join ref.ibge_municipios_sub m
+  on s.geom && m.geom
+ and st_intersects(s.geom, m.geom)
+order by s.event_hash, s.file_date, m.cd_mun;
+
+-- nearest-municipality fallback for points left unmatched (coast, borders): one knn probe
+-- per point against the gist index of the pieces, then the 2 km geography check on that
+-- single candidate. the nearest piece belongs to the nearest municipality.
+insert into tmp_mun (event_hash, file_date, cd_mun)
+select s.event_hash, s.file_date, c.cd_mun
+from tmp_src s
+cross join lateral (
+  select m.cd_mun, m.geom
+  from ref.ibge_municipios_sub m
+  order by m.geom <-> s.geom
+  limit 1
+) c
+where s.geom is not null
+  and not exists (select 1 from tmp_mun t where t.event_hash = s.event_hash and t.file_date = s.file_date)
+  and st_dwithin(s.geom::geography, c.geom::geography, 2000);
+
+-- biomas
+create temp table tmp_bioma on commit drop as
+select distinct on (s.event_hash, s.file_date)
+  s.event_hash,
+  s.file_date,
+  b.cd_bioma::text as cd_bioma,
+  b.bioma::text as bioma
+from tmp_src s
+join ref.biomas_4326_sub b
+  on b.geom is not null
+ and s.geom && b.geom
+ and st_intersects(s.geom, b.geom)
+order by s.event_hash, s.file_date, b.id;
+
+-- ucs
+create temp table tmp_uc on commit drop as
+select distinct on (s.event_hash, s.file_date)
+  s.event_hash,
+  s.file_date,
+  u.uc_id::text as uc_id,
+  u.cd_cnuc::text as cd_cnuc,
+  u.nome_uc::text as nome_uc
+from tmp_src s
+join ref.ucs_4326_sub u
+  on u.geom is not null
+ and s.geom && u.geom
+ and st_intersects(s.geom, u.geom)
+order by s.event_hash, s.file_date, u.id;
+
+-- tis
+create temp table tmp_ti on commit drop as
+select distinct on (s.event_hash, s.file_date)
+  s.event_hash,
+  s.file_date,
+  t.terrai_cod::text as terrai_cod,
+  t.terrai_nom::text as terrai_nom,
+  t.etnia_nome::text as etnia_nome
+from tmp_src s
+join ref.tis_4326_sub t
+  on t.geom is not null
+ and s.geom && t.geom
+ and st_intersects(s.geom, t.geom)
+order by s.event_hash, s.file_date, t.id;
+
+-- one write per row. the source bioma wins over the reference one; a point without
+-- bioma/uc/ti is still marked checked so it is not probed again.
+insert into curated.inpe_focos_enriched (
+  event_hash, file_date, view_ts, satelite, municipio, estado, bioma,
+  lat, lon, geom,
+  mun_cd_mun, mun_nm_mun, mun_uf, mun_area_km2,
+  cd_bioma,
+  uc_id, cd_cnuc, nome_uc,
+  terrai_cod, terrai_nom, etnia_nome,
+  bioma_checked, uc_checked, ti_checked
+)
+select
+  s.event_hash, s.file_date, s.view_ts, s.satelite, s.municipio, s.estado, coalesce(s.bioma, tb.bioma),
+  s.lat, s.lon, s.geom,
+  m.cd_mun, m.nm_mun, m.uf, m.area_km2,
+  tb.cd_bioma,
+  tu.uc_id, tu.cd_cnuc, tu.nome_uc,
+  tt.terrai_cod, tt.terrai_nom, tt.etnia_nome,
+  s.geom is not null, s.geom is not null, s.geom is not null
+from tmp_src s
+left join tmp_mun hm on hm.event_hash = s.event_hash and hm.file_date = s.file_date
+left join ref.ibge_municipios m on m.cd_mun = hm.cd_mun
+left join tmp_bioma tb on tb.event_hash = s.event_hash and tb.file_date = s.file_date
+left join tmp_uc tu on tu.event_hash = s.event_hash and tu.file_date = s.file_date
+left join tmp_ti tt on tt.event_hash = s.event_hash and tt.file_date = s.file_date
+on conflict (event_hash, file_date) do update
+set
+  mun_cd_mun = coalesce(curated.inpe_focos_enriched.mun_cd_mun, excluded.mun_cd_mun),
+  mun_nm_mun = coalesce(curated.inpe_focos_enriched.mun_nm_mun, excluded.mun_nm_mun),
+  mun_uf = coalesce(curated.inpe_focos_enriched.mun_uf, excluded.mun_uf),
+  mun_area_km2 = coalesce(curated.inpe_focos_enriched.mun_area_km2, excluded.mun_area_km2),
+  cd_bioma = coalesce(curated.inpe_focos_enriched.cd_bioma, excluded.cd_bioma),
+  bioma = coalesce(curated.inpe_focos_enriched.bioma, excluded.bioma),
+  uc_id = coalesce(curated.inpe_focos_enriched.uc_id, excluded.uc_id),
+  cd_cnuc = coalesce(curated.inpe_focos_enriched.cd_cnuc, excluded.cd_cnuc),
+  nome_uc = coalesce(curated.inpe_focos_enriched.nome_uc, excluded.nome_uc),
+  terrai_cod = coalesce(curated.inpe_focos_enriched.terrai_cod, excluded.terrai_cod),
+  terrai_nom = coalesce(curated.inpe_focos_enriched.terrai_nom, excluded.terrai_nom),
+  etnia_nome = coalesce(curated.inpe_focos_enriched.etnia_nome, excluded.etnia_nome),
+  bioma_checked = true,
+  uc_checked = true,
+  ti_checked = true;
+
+commit;
@@ -0,0 +1,134 @@
+-- incremental marts for one intraday refresh: recompute only the (day|month, municipio|uf)
+-- groups touched by rows enriched since :'SINCE', upserting into the daily/monthly marts.
+-- counts never shrink within a day, so groups outside the delta are already current.
+-- daily files only carry detections of their own (gmt) day, so file_date is pruned to +-1 day
+-- around the group's day/month to stay on a few partitions.
+-- grouping matches the full marts (sql/marts/1*_, 2*_), so both paths produce the same rows.
+-- marts.focos_diario_uf_trend is a view over focos_diario_uf and follows its upserts.
+begin;
+
+create temp table tmp_delta_keys on commit drop as
+select distinct
+  coalesce(f.view_ts::date, f.file_date) as day,
+  f.mun_cd_mun,
+  f.mun_uf
+from curated.inpe_focos_enriched f
+where f.file_date = :'DATE'::date
+  and f.inserted_at >= :'SINCE'::timestamptz
+  and f.mun_cd_mun is not null;
+
+create temp table tmp_delta_mun_day on commit drop as
+select distinct day, mun_cd_mun from tmp_delta_keys;
+
+create temp table tmp_delta_mun_month on commit drop as
+select distinct date_trunc('month', day)::date as month, mun_cd_mun from tmp_delta_keys;
+
+create temp table tmp_delta_uf_day on commit drop as
+select distinct day, mun_uf as uf from tmp_delta_keys where mun_uf is not null;
+
+create temp table tmp_delta_uf_month on commit drop as
+select distinct date_trunc('month', day)::date as month, mun_uf as uf from tmp_delta_keys where mun_uf is not null;
+
+insert into marts.focos_diario_municipio (
+  day, mun_cd_mun, mun_nm_mun, mun_uf, mun_area_km2, n_focos, focos_por_100km2
+)
+select
+  coalesce(f.view_ts::date, f.file_date) as day,
+  f.mun_cd_mun,
+  f.mun_nm_mun,
+  f.mun_uf,
+  max(f.mun_area_km2) as mun_area_km2,
+  count(*) as n_focos,
+  round(
+    (100 * count(*)::numeric) / nullif(max(f.mun_area_km2)::numeric, 0),
+    4
+  ) as focos_por_100km2
+from curated.inpe_focos_enriched f
+join tmp_delta_mun_day k
+  on k.mun_cd_mun = f.mun_cd_mun
+ and k.day = coalesce(f.view_ts::date, f.file_date)
+where f.file_date between k.day - 1 and k.day + 1
+group by 1, 2, 3, 4
+on conflict (day, mun_cd_mun) do update set
+  mun_nm_mun = excluded.mun_nm_mun,
+  mun_uf = excluded.mun_uf,
+  mun_area_km2 = excluded.mun_area_km2,
+  n_focos = excluded.n_focos,
+  focos_por_100km2 = excluded.focos_por_100km2;
+
+insert into marts.focos_mensal_municipio (
+  month, mun_cd_mun, mun_nm_mun, mun_uf, mun_area_km2, n_focos, focos_por_100km2
+)
+select
+  date_trunc('month', coalesce(f.view_ts::date, f.file_date))::date as month,
+  f.mun_cd_mun,
+  f.mun_nm_mun,
+  f.mun_uf,
+  max(f.mun_area_km2) as mun_area_km2,
+  count(*) as n_focos,
+  round(
+    (100 * count(*)::numeric) / nullif(max(f.mun_area_km2)::numeric, 0),
+    4
+  ) as focos_por_100km2
+from curated.inpe_focos_enriched f
+join tmp_delta_mun_month k
+  on k.mun_cd_mun = f.mun_cd_mun
+ and k.month = date_trunc('month', coalesce(f.view_ts::date, f.file_date))::date
+where f.file_date between k.month - 1 and (k.month + interval '1 month')::date
+group by 1, 2, 3, 4
+on conflict (month, mun_cd_mun) do update set
+  mun_nm_mun = excluded.mun_nm_mun,
+  mun_uf = excluded.mun_uf,
+  mun_area_km2 = excluded.mun_area_km2,
+  n_focos = excluded.n_focos,
+  focos_por_100km2 = excluded.focos_por_100km2;
+
+insert into marts.focos_diario_uf (
+  day, uf, uf_area_km2, n_focos, focos_por_100km2
+)
+select
+  coalesce(f.view_ts::date, f.file_date) as day,
+  f.mun_uf as uf,
+  max(a.area_km2) as uf_area_km2,
+  count(*) as n_focos,
+  round(
+    (100 * count(*)::numeric) / nullif(max(a.area_km2)::numeric, 0),
+    4
+  ) as focos_por_100km2
+from curated.inpe_focos_enriched f
+join ref.ibge_uf_area a on a.uf = f.mun_uf
+join tmp_delta_uf_day k
+  on k.uf = f.mun_uf
+ and k.day = coalesce(f.view_ts::date, f.file_date)
+where f.file_date between k.day - 1 and k.day + 1
+group by 1, 2
+on conflict (day, uf) do update set
+  uf_area_km2 = excluded.uf_area_km2,
+  n_focos = excluded.n_focos,
+  focos_por_100km2 = excluded.focos_por_100km2;
+
+insert into marts.focos_mensal_uf (
+  month, uf, uf_area_km2, n_focos, focos_por_100km2
+)
+select
+  date_trunc('month', coalesce(f.view_ts::date, f.file_date))::date as month,
+  f.mun_uf as uf,
+  max(a.area_km2) as uf_area_km2,
+  count(*) as n_focos,
+  round(
+    (100 * count(*)::numeric) / nullif(max(a.area_km2)::numeric, 0),
+    4
+  ) as focos_por_100km2
+from curated.inpe_focos_enriched f
+join ref.ibge_uf_area a on a.uf = f.mun_uf
+join tmp_delta_uf_month k
+  on k.uf = f.mun_uf
+ and k.month = date_trunc('month', coalesce(f.view_ts::date, f.file_date))::date
+where f.file_date between k.month - 1 and (k.month + interval '1 month')::date
+group by 1, 2
+on conflict (month, uf) do update set
+  uf_area_km2 = excluded.uf_area_km2,
+  n_focos = excluded.n_focos,
+  focos_por_100km2 = excluded.focos_por_100km2;
+
+commit;
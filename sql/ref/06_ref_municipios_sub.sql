@@ -0,0 +1,62 @@
+-- subdivided municipalities for point-in-polygon enrichment: pieces of at most 256 vertices
+-- keep st_intersects cheap and the gist boxes tight (same idea as ref.*_4326_sub).
+-- rebuilt only when ref.ibge_municipios changes.
+create table if not exists ref.ibge_municipios_sub (
+  id bigserial primary key,
+  cd_mun text not null,
+  geom geometry(MultiPolygon, 4326) not null
+);
+
+create index if not exists idx_ref_ibge_municipios_sub_geom
+  on ref.ibge_municipios_sub using gist (geom);
+
+create index if not exists idx_ref_ibge_municipios_sub_cd_mun
+  on ref.ibge_municipios_sub (cd_mun);
+
+create table if not exists ref.ibge_municipios_sub_src (
+  fingerprint text not null,
+  n_mun integer not null,
+  n_pieces integer not null,
+  built_at timestamptz not null default now()
+);
+
+do $$
+declare
+  fp text;
+  n_mun integer;
+  n_pieces integer;
+begin
+  -- stored sizes, no detoasting of the full-resolution geometries
+  select
+    md5(count(*)::text || ':' || coalesce(sum(pg_column_size(geom)), 0)::text || ':' || coalesce(string_agg(cd_mun, ',' order by cd_mun), '')),
+    count(*)
+  into fp, n_mun
+  from ref.ibge_municipios;
+
+  if exists (select 1 from ref.ibge_municipios_sub_src s where s.fingerprint = fp) then
+    raise notice 'ref.ibge_municipios_sub up to date';
+    return;
+  end if;
+
+  truncate ref.ibge_municipios_sub;
+
+  insert into ref.ibge_municipios_sub (cd_mun, geom)
+  select
+    m.cd_mun,
+    st_multi(st_subdivide(
+      case when st_isvalid(m.geom) then m.geom else st_collectionextract(st_makevalid(m.geom), 3) end,
+      256
+    ))::geometry(MultiPolygon, 4326)
+  from ref.ibge_municipios m
+  where m.geom is not null;
+
+  get diagnostics n_pieces = row_count;
+
+  delete from ref.ibge_municipios_sub_src;
+  insert into ref.ibge_municipios_sub_src (fingerprint, n_mun, n_pieces)
+  values (fp, n_mun, n_pieces);
+
+  raise notice 'ref.ibge_municipios_sub rebuilt | municipios=% | pieces=%', n_mun, n_pieces;
+end $$;
+
+analyze ref.ibge_municipios_sub;
@@ -0,0 +1,43 @@
+-- fingerprints of the subdivided bioma/uc/ti layers, one row per layer. built_at moves only
+-- when a layer's pieces or attributes change, so the python enrich engine
+-- (etl.transform.spatial.shared_engine) reloads on real changes and not on row counts.
+create table if not exists ref.ref_layers_sub_src (
+  layer text primary key,
+  fingerprint text not null,
+  n_pieces integer not null,
+  built_at timestamptz not null default now()
+);
+
+do $$
+declare
+  l record;
+  fp text;
+  n_pieces integer;
+begin
+  for l in
+    select * from (values
+      ('bioma', 'ref.biomas_4326_sub', 'cd_bioma, bioma'),
+      ('uc', 'ref.ucs_4326_sub', 'uc_id, cd_cnuc, nome_uc'),
+      ('ti', 'ref.tis_4326_sub', 'terrai_cod, terrai_nom, etnia_nome')
+    ) v(layer, tbl, cols)
+  loop
+    if to_regclass(l.tbl) is null then
+      raise notice '% missing | layer=% not fingerprinted', l.tbl, l.layer;
+      continue;
+    end if;
+
+    -- stored sizes, no detoasting of the geometries; attributes are the ones the engine caches
+    execute format(
+      'select md5(count(*)::text || '':'' || coalesce(sum(pg_column_size(geom)), 0)::text || '':'' || '
+      || 'coalesce(string_agg(concat_ws(''|'', id, %s), '','' order by id), '''')), count(*) '
+      || 'from %s where geom is not null',
+      l.cols, l.tbl
+    ) into fp, n_pieces;
+
+    insert into ref.ref_layers_sub_src (layer, fingerprint, n_pieces)
+    values (l.layer, fp, n_pieces)
+    on conflict (layer) do update
+    set fingerprint = excluded.fingerprint, n_pieces = excluded.n_pieces, built_at = now()
+    where ref.ref_layers_sub_src.fingerprint is distinct from excluded.fingerprint;
+  end loop;
+end $$;
@@ -11,12 +11,18 @@ import sys
 from pathlib import Path
 
 from .config import settings
-from .backfill import run_backfill
+from .backfill import rebuild_from_staged, run_backfill
 from .checks import run_checks
+from .cli import run_day
 from .db_bootstrap import ensure_database
-from .enrich_runner import run_enrich
+from .enrich_runner import run_enrich, run_enrich_range
+from .extract.inpe_focos_diario import clear_processed, fetch_range, local_extract, mark_processed
+from .incremental import watch
+from .load.postgis import EVENT_KEY_TYPES, load_batches, migrate_event_key, migrate_to_partitioned, reset_file_dates
+from .load.staged import stage_batches
 from .marts_runner import run_marts
 from .ref_runner import run_ref
+from .transform.parallel import transform_range
 from . import validate_marts
 
 import psycopg
@@ -60,11 +66,13 @@ def _run_script(script: Path, args: list[str]) -> None:
     subprocess.run(cmd, check=True, cwd=_repo_root())
 
 
-def _run_cli(date_str: str, no_cache: bool = False) -> None:
+def _run_cli(date_str: str, no_cache: bool = False, load_method: str | None = None) -> None:
     env = os.environ.copy()
     env["PYTHONPATH"] = "src"
     uv_bin = shutil.which("uv")
     extra = ["--no-cache"] if no_cache else []
+    if load_method:
+        extra += ["--load-method", load_method]
     if uv_bin:
         cmd = [uv_bin, "run", "python", "-m", "etl.cli", "--date", date_str, *extra]
     else:
@@ -160,6 +168,7 @@ def _drop_schemas(
             sql,
         ]
         subprocess.run(cmd, check=True)
+        clear_processed()
         return
 
     with psycopg.connect(
@@ -173,14 +182,17 @@ def _drop_schemas(
             stmt = psql.SQL("drop schema if exists {} cascade;").format(psql.Identifier(name))
             cur.execute(stmt)
         conn.commit()
+    # loaded rows are gone; the raw cache must not report their files as processed
+    clear_processed()
 
 
 def _reset_state_files() -> None:
     state_dir = Path(settings.data_dir) / "state"
-    if not state_dir.exists():
-        return
-    for path in state_dir.glob("*.json"):
-        path.unlink()
+    if state_dir.exists():
+        for path in state_dir.glob("*.json"):
+            path.unlink()
+    # the raw cache's processed markers are state too; kept, they would skip every cached day
+    clear_processed()
 
 
 def _clear_raw_cache() -> None:
@@ -272,6 +284,12 @@ def cmd_run(
     no_cache: bool = False,
     clear_raw_cache: bool = False,
     mode: str = "dashboard",
+    replace: bool = False,
+    isolation: str = "inprocess",
+    load_method: str | None = None,
+    workers: int = 1,
+    pipeline: bool = False,
+    prefetch: bool = False,
 ) -> None:
     if start_str or end_str:
         if not start_str or not end_str:
@@ -284,6 +302,8 @@ def cmd_run(
             _reset_state_files()
         if clear_raw_cache:
             _clear_raw_cache()
+        if replace:
+            reset_file_dates(dt.date.fromisoformat(start_str), dt.date.fromisoformat(end_str))
         backfill_checks = checks if mode != "dashboard" else False
         run_backfill(
             start_str,
@@ -292,6 +312,12 @@ def cmd_run(
             resume=False,
             engine=engine,
             no_cache=no_cache,
+            isolation=isolation,
+            load_method=load_method,
+            workers=workers,
+            pipeline=pipeline,
+            prefetch=prefetch,
+            skip_unchanged=not replace,
         )
         if mode == "dashboard":
             _run_validate_marts(engine)
@@ -310,9 +336,26 @@ def cmd_run(
         _clear_raw_cache()
     ensure_database(engine=engine)
     run_ref(engine=engine)
-    _run_cli(date_str, no_cache=no_cache)
-    run_enrich(date_str, engine=engine)
-    run_marts(date_str, engine=engine)
+    if replace:
+        day = dt.date.fromisoformat(date_str)
+        reset_file_dates(day, day)
+    day_result = None
+    if isolation == "inprocess":
+        day_result = run_day(
+            dt.date.fromisoformat(date_str),
+            no_cache=no_cache,
+            load_method=load_method,
+            skip_unchanged=not (replace or no_cache),
+        )
+    else:
+        _run_cli(date_str, no_cache=no_cache, load_method=load_method)
+    if day_result is not None and day_result.skipped:
+        log.info("enrich/marts skip | content unchanged | date=%s", date_str)
+    else:
+        run_enrich(date_str, engine=engine)
+        run_marts(date_str, engine=engine)
+        if day_result is not None and day_result.extract is not None:
+            mark_processed(day_result.extract)
     if mode == "dashboard":
         _run_validate_marts(engine)
         if checks:
@@ -335,13 +378,33 @@ def _build_parser() -> argparse.ArgumentParser:
     backfill.add_argument("--checks", action="store_true", help="run checks per day")
     backfill.add_argument("--resume", action="store_true", help="resume from state file")
     backfill.add_argument("--engine", choices=["docker", "direct", "auto"], default="auto")
+    backfill.add_argument("--no-cache", action="store_true", help="force re-download even if cached")
+    backfill.add_argument(
+        "--isolation",
+        choices=["inprocess", "subprocess"],
+        default="inprocess",
+        help="inprocess: shared session/connection; subprocess: one etl.cli process per day",
+    )
+    backfill.add_argument("--load-method", choices=["executemany", "copy"], default=None)
+    backfill.add_argument("--workers", type=int, default=1, help="parallel day workers (process pool)")
+    backfill.add_argument("--pipeline", action="store_true", help="overlap extract/transform/load/sql stages across days")
+    backfill.add_argument("--queue-size", type=int, default=2, help="pipeline: max days buffered between stages")
+    backfill.add_argument("--prefetch", action="store_true", help="download the whole range concurrently first")
+    backfill.add_argument(
+        "--skip-unchanged",
+        action="store_true",
+        help="skip days whose cached content was already processed and is still in the database",
+    )
 
     checks = sub.add_parser("checks", help="run checks")
     checks.add_argument("--date", help="date in YYYY-MM-DD", required=False)
     checks.add_argument("--engine", choices=["docker", "direct", "auto"], default="auto")
 
-    enrich = sub.add_parser("enrich", help="run enrich sql for a date")
-    enrich.add_argument("--date", help="date in YYYY-MM-DD", required=True)
+    enrich = sub.add_parser("enrich", help="run enrich sql for a date or a range")
+    enrich.add_argument("--date", help="date in YYYY-MM-DD")
+    enrich.add_argument("--start", help="range start YYYY-MM-DD (set-based enrichment of [start, end])")
+    enrich.add_argument("--end", help="range end YYYY-MM-DD")
+    enrich.add_argument("--chunk", choices=["month", "all"], default="month", help="range: one transaction per month or for the whole range")
     enrich.add_argument("--engine", choices=["docker", "direct", "auto"], default="auto")
 
     marts = sub.add_parser("marts", help="run marts sql for a date")
@@ -353,7 +416,7 @@ def _build_parser() -> argparse.ArgumentParser:
     reset.add_argument("--drop-raw", action="store_true", help="drop raw schema")
     reset.add_argument("--drop-curated", action="store_true", help="drop curated schema")
     reset.add_argument("--drop-marts", action="store_true", help="drop marts schema")
-    reset.add_argument("--reset-state", action="store_true", help="clear data/state/*.json")
+    reset.add_argument("--reset-state", action="store_true", help="clear data/state/*.json and the processed markers of the raw cache")
     reset.add_argument("--clear-raw-cache", action="store_true", help="clear data/raw cache")
 
     run = sub.add_parser("run", help="run pipeline for a date or range")
@@ -361,16 +424,151 @@ def _build_parser() -> argparse.ArgumentParser:
     run.add_argument("--start", help="start date in YYYY-MM-DD", required=False)
     run.add_argument("--end", help="end date in YYYY-MM-DD", required=False)
     run.add_argument("--from-scratch", action="store_true", help="drop raw/curated/marts before run")
-    run.add_argument("--reset-state", action="store_true", help="clear data/state/*.json")
+    run.add_argument("--reset-state", action="store_true", help="clear data/state/*.json and the processed markers of the raw cache")
     run.add_argument("--clear-raw-cache", action="store_true", help="clear data/raw cache before run")
     run.add_argument("--no-cache", action="store_true", help="force re-download even if cached")
     run.add_argument("--checks", action="store_true", help="run checks after")
     run.add_argument("--mode", choices=["dashboard", "full"], default="dashboard")
+    run.add_argument("--replace", action="store_true", help="clear raw/curated/enriched rows of the date(s) before load")
+    run.add_argument(
+        "--isolation",
+        choices=["inprocess", "subprocess"],
+        default="inprocess",
+        help="inprocess: shared session/connection; subprocess: one etl.cli process per day",
+    )
+    run.add_argument("--load-method", choices=["executemany", "copy"], default=None)
+    run.add_argument("--workers", type=int, default=1, help="range runs: parallel day workers (process pool)")
+    run.add_argument("--pipeline", action="store_true", help="range runs: overlap extract/transform/load/sql stages")
+    run.add_argument("--prefetch", action="store_true", help="range runs: download the whole range concurrently first")
     run.add_argument("--engine", choices=["docker", "direct", "auto"], default="auto")
 
+    fetch = sub.add_parser("fetch", help="download raw INPE files for a date range concurrently")
+    fetch.add_argument("--start", help="start date in YYYY-MM-DD", required=True)
+    fetch.add_argument("--end", help="end date in YYYY-MM-DD", required=True)
+    fetch.add_argument("--concurrency", type=int, default=None, help="parallel downloads (default: DOWNLOAD_CONCURRENCY)")
+    fetch.add_argument("--no-cache", action="store_true", help="force re-download even if cached")
+
+    rebuild = sub.add_parser("rebuild", help="reload a year (or range) from data/staged parquet, then enrich/marts")
+    rebuild.add_argument("--year", type=int, help="calendar year to rebuild", required=False)
+    rebuild.add_argument("--start", help="start date in YYYY-MM-DD (instead of --year)", required=False)
+    rebuild.add_argument("--end", help="end date in YYYY-MM-DD (instead of --year)", required=False)
+    rebuild.add_argument("--load-method", choices=["executemany", "copy"], default=None)
+    rebuild.add_argument("--skip-sql", action="store_true", help="load only; do not rerun enrich/marts")
+    rebuild.add_argument("--engine", choices=["docker", "direct", "auto"], default="auto")
+
+    transform = sub.add_parser("transform", help="transform cached raw csv files of a range across a process pool (offline)")
+    transform.add_argument("--start", help="start date in YYYY-MM-DD", required=True)
+    transform.add_argument("--end", help="end date in YYYY-MM-DD", required=True)
+    transform.add_argument("--workers", type=int, default=None, help="pool size (default: TRANSFORM_WORKERS, 0 = one per cpu)")
+    transform.add_argument("--input-dir", default=None, help="read <date>.csv from this dir instead of the raw cache")
+    transform.add_argument("--stage", action="store_true", help="write each day to data/staged parquet")
+    transform.add_argument("--load", action="store_true", help="load each day into raw/curated")
+    transform.add_argument("--load-method", choices=["executemany", "copy"], default=None)
+
+    partitions = sub.add_parser("partitions", help="manage monthly partitions of raw/curated fact tables")
+    partitions.add_argument("--migrate", action="store_true", help="convert legacy heap tables to partitioned")
+    partitions.add_argument("--reset-start", help="clear rows from this date (YYYY-MM-DD)", required=False)
+    partitions.add_argument("--reset-end", help="clear rows up to this date (YYYY-MM-DD)", required=False)
+
+    watch_p = sub.add_parser("watch", help="intraday incremental refresh: load only appended rows, upsert touched marts")
+    watch_p.add_argument("--date", help="date in YYYY-MM-DD (default: today, following the calendar)", required=False)
+    watch_p.add_argument("--interval", type=int, default=None, help="seconds between refreshes (default: WATCH_INTERVAL_S)")
+    watch_p.add_argument("--once", action="store_true", help="run a single refresh and exit")
+    watch_p.add_argument("--load-method", choices=["executemany", "copy"], default=None)
+    watch_p.add_argument("--engine", choices=["docker", "direct", "auto"], default="auto")
+
+    event_key = sub.add_parser("event-key", help="add/backfill the compact event_key (uuid/bigint) on raw/curated fact tables")
+    event_key.add_argument("--type", choices=list(EVENT_KEY_TYPES), required=True, help="must match EVENT_KEY")
+    event_key.add_argument("--no-backfill", action="store_true", help="only add the column; rows loaded before stay null")
+    event_key.add_argument("--swap-pk", action="store_true", help="make (event_key, file_date) the primary key")
+
     return parser
 
 
+def cmd_enrich(date_str: str | None, start_str: str | None, end_str: str | None, chunk: str, engine: str | None) -> None:
+    if date_str and (start_str or end_str):
+        raise SystemExit("use either --date or --start/--end")
+    if date_str:
+        run_enrich(_validate_date(date_str), engine=engine)
+        return
+    if not (start_str and end_str):
+        raise SystemExit("enrich needs --date or --start and --end")
+    start = dt.date.fromisoformat(_validate_date(start_str))
+    end = dt.date.fromisoformat(_validate_date(end_str))
+    if end < start:
+        raise SystemExit("--end must not be before --start")
+    run_enrich_range(start, end, chunk=chunk, engine=engine)
+
+
+def cmd_partitions(migrate: bool, reset_start: str | None, reset_end: str | None) -> None:
+    if migrate:
+        migrated = migrate_to_partitioned()
+        if migrated:
+            log.warning("partitions migrated | %s | re-apply views: python -m etl.validate_marts --apply-minimal", migrated)
+    if reset_start or reset_end:
+        start = dt.date.fromisoformat(_validate_date(reset_start or reset_end))
+        end = dt.date.fromisoformat(_validate_date(reset_end or reset_start))
+        if start > end:
+            raise ValueError("--reset-start must be <= --reset-end")
+        reset_file_dates(start, end)
+
+
+def cmd_rebuild(
+    year: int | None,
+    start_str: str | None,
+    end_str: str | None,
+    engine: str | None,
+    load_method: str | None,
+    skip_sql: bool,
+) -> None:
+    if year is not None:
+        start, end = dt.date(year, 1, 1), dt.date(year, 12, 31)
+    elif start_str and end_str:
+        start = dt.date.fromisoformat(_validate_date(start_str))
+        end = dt.date.fromisoformat(_validate_date(end_str))
+    else:
+        raise ValueError("rebuild needs --year or --start/--end")
+    if start > end:
+        raise ValueError("start date must be <= end date")
+    rebuild_from_staged(start, end, engine=engine, load_method=load_method, sql=not skip_sql)
+    if not skip_sql:
+        _run_validate_marts(engine)
+
+
+def cmd_transform(
+    start_str: str,
+    end_str: str,
+    *,
+    workers: int | None,
+    input_dir: str | None,
+    stage: bool,
+    load: bool,
+    load_method: str | None,
+) -> None:
+    start = dt.date.fromisoformat(_validate_date(start_str))
+    end = dt.date.fromisoformat(_validate_date(end_str))
+    if start > end:
+        raise ValueError("start date must be <= end date")
+
+    days = transform_range(
+        start,
+        end,
+        workers=workers,
+        input_dir=Path(input_dir) if input_dir else None,
+    )
+    for day in days:
+        log.info("transform day ok | date=%s | rows=%s | dt=%.2fs", day.file_date.isoformat(), day.rows, day.dt)
+        batches = iter(day.batches)
+        if stage:
+            ex = local_extract(day.file_date, day.path)
+            batches = stage_batches(day.file_date, batches, source_sha256=ex.sha256)
+        if load:
+            load_batches(batches, method=load_method)
+        else:
+            for _ in batches:
+                pass
+
+
 def main(argv: list[str] | None = None) -> None:
     _try_load_dotenv()
     _setup_logging()
@@ -390,11 +588,19 @@ def main(argv: list[str] | None = None) -> None:
                 args.checks,
                 args.resume,
                 engine=None if args.engine == "auto" else args.engine,
+                no_cache=args.no_cache,
+                isolation=args.isolation,
+                load_method=args.load_method,
+                workers=args.workers,
+                pipeline=args.pipeline,
+                queue_size=args.queue_size,
+                prefetch=args.prefetch,
+                skip_unchanged=args.skip_unchanged,
             )
         elif args.command == "checks":
             cmd_checks(args.date)
         elif args.command == "enrich":
-            run_enrich(_validate_date(args.date), engine=None if args.engine == "auto" else args.engine)
+            cmd_enrich(args.date, args.start, args.end, args.chunk, engine=None if args.engine == "auto" else args.engine)
         elif args.command == "marts":
             run_marts(_validate_date(args.date), engine=None if args.engine == "auto" else args.engine)
         elif args.command == "run":
@@ -409,7 +615,56 @@ def main(argv: list[str] | None = None) -> None:
                 no_cache=getattr(args, "no_cache", False),
                 clear_raw_cache=getattr(args, "clear_raw_cache", False),
                 mode=getattr(args, "mode", "dashboard"),
+                replace=getattr(args, "replace", False),
+                isolation=getattr(args, "isolation", "inprocess"),
+                load_method=getattr(args, "load_method", None),
+                workers=getattr(args, "workers", 1),
+                pipeline=getattr(args, "pipeline", False),
+                prefetch=getattr(args, "prefetch", False),
+            )
+        elif args.command == "fetch":
+            results = fetch_range(
+                dt.date.fromisoformat(_validate_date(args.start)),
+                dt.date.fromisoformat(_validate_date(args.end)),
+                concurrency=args.concurrency,
+                force=args.no_cache,
+            )
+            if any(isinstance(v, Exception) for v in results.values()):
+                sys.exit(1)
+        elif args.command == "rebuild":
+            cmd_rebuild(
+                args.year,
+                args.start,
+                args.end,
+                engine=None if args.engine == "auto" else args.engine,
+                load_method=args.load_method,
+                skip_sql=args.skip_sql,
+            )
+        elif args.command == "transform":
+            cmd_transform(
+                args.start,
+                args.end,
+                workers=args.workers,
+                input_dir=args.input_dir,
+                stage=args.stage,
+                load=args.load,
+                load_method=args.load_method,
+            )
+        elif args.command == "watch":
+            engine = None if args.engine == "auto" else args.engine
+            ensure_database(engine=engine)
+            run_ref(engine=engine)
+            watch(
+                dt.date.fromisoformat(_validate_date(args.date)) if args.date else None,
+                interval=args.interval,
+                once=args.once,
+                engine=engine,
+                load_method=args.load_method,
             )
+        elif args.command == "event-key":
+            migrate_event_key(args.type, backfill=not args.no_backfill, swap_pk=args.swap_pk)
+        elif args.command == "partitions":
+            cmd_partitions(args.migrate, args.reset_start, args.reset_end)
         elif args.command == "reset":
             engine = None if args.engine == "auto" else args.engine
             _drop_schemas(
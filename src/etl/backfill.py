@@ -6,31 +6,47 @@ import os
 import shutil
 import subprocess
 import sys
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
 from datetime import date, timedelta
 from pathlib import Path
+from typing import Callable
 
 import psycopg
+import requests
 
 from .checks import run_checks
-from .config import settings
+from .cli import day_batches, run_day, setup_logging, skip_unchanged_day
+from .config import conn_str, settings
 from .db_bootstrap import ensure_database
-from .enrich_runner import run_enrich
+from .enrich_runner import run_enrich, run_enrich_range
+from .extract.inpe_focos_diario import ExtractResult, download_daily_csv, fetch_range, mark_processed
+from .load.postgis import load_batches, reset_file_dates
+from .load.staged import read_staged_day, staged_days, staged_dir
+from .locks import advisory_unlock, sql_stage_lock, try_advisory_lock
 from .marts_runner import run_marts
+from .pipeline import Stage, run_pipeline
 from .ref_runner import run_ref
+from .transform.inpe_focos_diario import RecordBatch
 
 log = logging.getLogger("backfill")
 
+ISOLATION_MODES = ("inprocess", "subprocess")
+
 
 def _repo_root() -> Path:
     return Path(__file__).resolve().parents[2]
 
 
-def _run_cli(date_str: str, no_cache: bool = False) -> None:
+def _run_cli(date_str: str, no_cache: bool = False, load_method: str | None = None) -> None:
     env = os.environ.copy()
     env["PYTHONPATH"] = "src"
     uv_bin = shutil.which("uv")
     extra = ["--no-cache"] if no_cache else []
+    if load_method:
+        extra += ["--load-method", load_method]
     if uv_bin:
         cmd = [uv_bin, "run", "python", "-m", "etl.cli", "--date", date_str, *extra]
     else:
@@ -66,11 +82,7 @@ def _write_state(path: Path, payload: dict) -> None:
     tmp_path.replace(path)
 
 
-def _check_day_counts(day: date) -> tuple[float, int]:
-    conn_str = (
-        f"host={settings.db_host} port={settings.db_port} dbname={settings.db_name} "
-        f"user={settings.db_user} password={settings.db_password}"
-    )
+def _check_day_counts(day: date, conn: psycopg.Connection | None = None) -> tuple[float, int]:
     sql = """
     select
       (select count(*) from raw.inpe_focos where file_date = %s::date) as raw_n,
@@ -84,9 +96,14 @@ def _check_day_counts(day: date) -> tuple[float, int]:
        from marts.focos_diario_uf
        where day = %s::date) as marts_uf_sum
     """
-    with psycopg.connect(conn_str) as conn, conn.cursor() as cur:
-        cur.execute(sql, (day, day, day, day, day))
-        raw_n, curated_total, curated_com_mun, marts_mun_sum, marts_uf_sum = cur.fetchone()
+    if conn is not None:
+        with conn.cursor() as cur:
+            cur.execute(sql, (day, day, day, day, day))
+            raw_n, curated_total, curated_com_mun, marts_mun_sum, marts_uf_sum = cur.fetchone()
+    else:
+        with psycopg.connect(conn_str()) as own, own.cursor() as cur:
+            cur.execute(sql, (day, day, day, day, day))
+            raw_n, curated_total, curated_com_mun, marts_mun_sum, marts_uf_sum = cur.fetchone()
 
     curated_total = int(curated_total or 0)
     curated_com_mun = int(curated_com_mun or 0)
@@ -135,6 +152,220 @@ def _check_day_counts(day: date) -> tuple[float, int]:
     return pct_mun, missing_mun
 
 
+def _is_done(entry: dict | None) -> bool:
+    return bool(entry) and entry.get("status") in ("ok", "unchanged")
+
+
+def _legacy_days(state: dict, start: date) -> dict[str, dict]:
+    # pre-worker state files only tracked a last_completed watermark
+    last_completed = state.get("last_completed")
+    if not last_completed or "days" in state:
+        return {}
+    days: dict[str, dict] = {}
+    current = start
+    last_date = date.fromisoformat(last_completed)
+    while current <= last_date:
+        days[current.isoformat()] = {"status": "ok", "updated_at": state.get("updated_at")}
+        current += timedelta(days=1)
+    return days
+
+
+@dataclass(frozen=True)
+class _DayOptions:
+    checks: bool
+    engine: str | None
+    no_cache: bool
+    isolation: str
+    load_method: str | None
+    skip_unchanged: bool = False
+
+
+@dataclass(frozen=True)
+class DayOutcome:
+    day: str
+    status: str  # ok | unchanged | fail | claimed
+    dt: float
+    err: str | None = None
+    pct_mun: float | None = None
+    missing_mun: int = 0
+
+
+# per-process resources; set by _init_worker in each pool process (or the main process)
+_worker: dict = {}
+
+
+def _init_worker(isolation: str) -> None:
+    if not logging.getLogger().handlers:
+        # spawned workers (windows) do not inherit the parent's logging setup
+        setup_logging()
+    _worker["conn"] = psycopg.connect(conn_str(), autocommit=True)
+    _worker["session"] = requests.Session() if isolation == "inprocess" else None
+
+
+def _close_worker() -> None:
+    conn = _worker.pop("conn", None)
+    if conn is not None:
+        conn.close()
+    session = _worker.pop("session", None)
+    if session is not None:
+        session.close()
+
+
+def _worker_conn() -> psycopg.Connection:
+    conn = _worker.get("conn")
+    if conn is None or conn.closed or conn.broken:
+        log.warning("worker reconnect | pid=%s", os.getpid())
+        conn = psycopg.connect(conn_str(), autocommit=True)
+        _worker["conn"] = conn
+    return conn
+
+
+def _run_sql_stage(day_str: str, opts: _DayOptions, conn: psycopg.Connection) -> tuple[float | None, int]:
+    # monthly marts delete/reinsert whole months; keep the sql stage one-at-a-time
+    with sql_stage_lock(conn):
+        run_enrich(day_str, engine=opts.engine, conn=conn)
+        run_marts(day_str, engine=opts.engine, conn=conn)
+
+    if not opts.checks:
+        return None, 0
+    run_checks(day_str)
+    return _check_day_counts(date.fromisoformat(day_str), conn=conn)
+
+
+def _process_day(day_str: str, opts: _DayOptions) -> DayOutcome:
+    # claim, run and check one day; failures are returned, never raised
+    day = date.fromisoformat(day_str)
+    conn = _worker_conn()
+    t0 = time.perf_counter()
+
+    if not try_advisory_lock(conn, day.toordinal()):
+        log.warning("day claimed elsewhere | date=%s", day_str)
+        return DayOutcome(day=day_str, status="claimed", dt=0.0, err="claimed by another worker")
+
+    try:
+        result = None
+        if opts.isolation == "inprocess":
+            result = run_day(
+                day,
+                no_cache=opts.no_cache,
+                load_method=opts.load_method,
+                session=_worker.get("session"),
+                conn=conn,
+                skip_unchanged=opts.skip_unchanged and not opts.no_cache,
+            )
+            if result.skipped:
+                dt = time.perf_counter() - t0
+                log.info("day unchanged | date=%s | dt=%.2fs | pid=%s", day_str, dt, os.getpid())
+                return DayOutcome(day=day_str, status="unchanged", dt=dt)
+        else:
+            _run_cli(day_str, no_cache=opts.no_cache, load_method=opts.load_method)
+
+        pct_mun, missing_mun = _run_sql_stage(day_str, opts, conn)
+        if result is not None and result.extract is not None:
+            mark_processed(result.extract)
+
+        dt = time.perf_counter() - t0
+        log.info("day ok | date=%s | dt=%.2fs | pid=%s", day_str, dt, os.getpid())
+        return DayOutcome(day=day_str, status="ok", dt=dt, pct_mun=pct_mun, missing_mun=missing_mun)
+    except (Exception, SystemExit) as exc:
+        dt = time.perf_counter() - t0
+        log.error("day fail | date=%s | err=%s", day_str, exc)
+        return DayOutcome(day=day_str, status="fail", dt=dt, err=str(exc) or type(exc).__name__)
+    finally:
+        advisory_unlock(conn, day.toordinal())
+
+
+class _DayClaimed(RuntimeError):
+    pass
+
+
+def _run_pipelined(
+    pending: list[str],
+    opts: _DayOptions,
+    queue_size: int,
+    record: Callable[[DayOutcome], None],
+) -> list[DayOutcome]:
+    # stage threads: extract -> transform -> load -> sql (enrich/marts/checks);
+    # each stage owns its connection/session, the claim connection is shared
+    claim_conn = psycopg.connect(conn_str(), autocommit=True)
+    load_conn = psycopg.connect(conn_str(), autocommit=True)
+    sql_conn = psycopg.connect(conn_str(), autocommit=True)
+    session = requests.Session()
+    started: dict[str, float] = {}
+    outcomes: list[DayOutcome] = []
+    lock = threading.Lock()
+
+    def _extract(day_str: str, _: object) -> ExtractResult:
+        if not try_advisory_lock(claim_conn, date.fromisoformat(day_str).toordinal()):
+            raise _DayClaimed("claimed by another worker")
+        started[day_str] = time.perf_counter()
+        return download_daily_csv(date.fromisoformat(day_str), force=opts.no_cache, session=session)
+
+    skip_unchanged = opts.skip_unchanged and not opts.no_cache
+
+    # payloads carry the ExtractResult along; batches=None marks an unchanged day
+    def _transform(day_str: str, ex: ExtractResult) -> tuple[ExtractResult, list[RecordBatch] | None]:
+        if skip_unchanged and skip_unchanged_day(ex, conn=claim_conn):
+            log.info("etl skip | content unchanged | date=%s | sha256=%s", day_str, ex.sha256)
+            return ex, None
+        return ex, list(day_batches(date.fromisoformat(day_str), ex))
+
+    def _load(day_str: str, payload: tuple[ExtractResult, list[RecordBatch] | None]) -> tuple[ExtractResult, bool]:
+        ex, batches = payload
+        if batches is None:
+            return ex, True
+        load_batches(batches, method=opts.load_method, conn=load_conn)
+        return ex, False
+
+    def _sql(day_str: str, payload: tuple[ExtractResult, bool]) -> tuple[ExtractResult, bool, float | None, int]:
+        ex, skipped = payload
+        if skipped:
+            return ex, True, None, 0
+        pct_mun, missing_mun = _run_sql_stage(day_str, opts, sql_conn)
+        mark_processed(ex)
+        return ex, False, pct_mun, missing_mun
+
+    def _finish(outcome: DayOutcome) -> None:
+        with lock:
+            outcomes.append(outcome)
+            record(outcome)
+
+    def _on_done(day_str: str, result: tuple[ExtractResult, bool, float | None, int]) -> None:
+        _, skipped, pct_mun, missing_mun = result
+        dt = time.perf_counter() - started.get(day_str, time.perf_counter())
+        advisory_unlock(claim_conn, date.fromisoformat(day_str).toordinal())
+        status = "unchanged" if skipped else "ok"
+        log.info("day %s | date=%s | dt=%.2fs", status, day_str, dt)
+        _finish(DayOutcome(day=day_str, status=status, dt=dt, pct_mun=pct_mun, missing_mun=missing_mun))
+
+    def _on_fail(day_str: str, stage: str, exc: BaseException) -> None:
+        if isinstance(exc, _DayClaimed):
+            _finish(DayOutcome(day=day_str, status="claimed", dt=0.0, err=str(exc)))
+            return
+        dt = time.perf_counter() - started.get(day_str, time.perf_counter())
+        advisory_unlock(claim_conn, date.fromisoformat(day_str).toordinal())
+        _finish(DayOutcome(day=day_str, status="fail", dt=dt, err=f"{stage}: {exc or type(exc).__name__}"))
+
+    try:
+        run_pipeline(
+            pending,
+            [
+                Stage("extract", _extract),
+                Stage("transform", _transform),
+                Stage("load", _load),
+                Stage("sql", _sql),
+            ],
+            on_done=_on_done,
+            on_fail=_on_fail,
+            queue_size=queue_size,
+        )
+    finally:
+        for conn in (claim_conn, load_conn, sql_conn):
+            conn.close()
+        session.close()
+    return outcomes
+
+
 def run_backfill(
     start_str: str,
     end_str: str,
@@ -142,7 +373,23 @@ def run_backfill(
     resume: bool,
     engine: str | None = None,
     no_cache: bool = False,
+    isolation: str = "inprocess",
+    load_method: str | None = None,
+    workers: int = 1,
+    pipeline: bool = False,
+    queue_size: int = 2,
+    prefetch: bool = False,
+    skip_unchanged: bool = False,
 ) -> None:
+    # skip_unchanged: days whose raw content is unchanged since it was last processed, and whose
+    # rows are still in the database, stop after extract
+    if isolation not in ISOLATION_MODES:
+        raise ValueError(f"invalid isolation: {isolation} (expected one of {ISOLATION_MODES})")
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+    if pipeline and (workers > 1 or isolation != "inprocess"):
+        raise ValueError("pipeline mode requires workers=1 and isolation=inprocess")
+
     start = date.fromisoformat(start_str)
     end = date.fromisoformat(end_str)
     if start > end:
@@ -150,75 +397,188 @@ def run_backfill(
 
     state_file = _state_path(start, end)
     state = _read_state(state_file)
+    days_state: dict[str, dict] = dict(state.get("days") or _legacy_days(state, start))
 
+    pending: list[str] = []
     current = start
-    if resume:
-        last_completed = state.get("last_completed")
-        if last_completed:
-            last_date = date.fromisoformat(last_completed)
-            current = last_date + timedelta(days=1)
-        if current > end:
-            log.info("backfill already complete | start=%s | end=%s", start, end)
-            return
+    while current <= end:
+        if not (resume and _is_done(days_state.get(current.isoformat()))):
+            pending.append(current.isoformat())
+        current += timedelta(days=1)
+
+    if not pending:
+        log.info("backfill already complete | start=%s | end=%s", start, end)
+        return
 
     ensure_database(engine=engine)
     run_ref(engine=engine)
 
-    n_ok = 0
-    n_fail = 0
-    first_fail = None
-    pct_min = None
-    pct_sum = 0.0
-    pct_count = 0
-    missing_total = 0
+    if prefetch:
+        # download the whole range concurrently up front; days then hit the raw cache
+        fetch_range(date.fromisoformat(pending[0]), date.fromisoformat(pending[-1]), force=no_cache)
+        no_cache = False
 
-    while current <= end:
-        t0 = time.perf_counter()
+    opts = _DayOptions(
+        checks=checks,
+        engine=engine,
+        no_cache=no_cache,
+        isolation=isolation,
+        load_method=load_method,
+        skip_unchanged=skip_unchanged,
+    )
+    log.info(
+        "backfill start | start=%s | end=%s | pending=%s | workers=%s | isolation=%s | pipeline=%s",
+        start,
+        end,
+        len(pending),
+        workers,
+        isolation,
+        pipeline,
+    )
+
+    def _record(outcome: DayOutcome) -> None:
+        days_state[outcome.day] = {
+            "status": outcome.status,
+            "dt": round(outcome.dt, 2),
+            "err": outcome.err,
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        _write_state(
+            state_file,
+            {
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "days": days_state,
+                "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+        )
+
+    outcomes: list[DayOutcome] = []
+    if pipeline:
+        outcomes = _run_pipelined(pending, opts, queue_size, _record)
+    elif workers == 1:
+        # inprocess: one interpreter, one requests.Session and one autocommit connection
+        # for extract/transform/load, enrich and marts. subprocess: one etl.cli per day.
+        _init_worker(isolation)
         try:
-            _run_cli(current.isoformat(), no_cache=no_cache)
-            run_enrich(current.isoformat(), engine=engine)
-            run_marts(current.isoformat(), engine=engine)
-            if checks:
-                run_checks(current.isoformat())
-                pct_mun, missing_mun = _check_day_counts(current)
-                pct_min = pct_mun if pct_min is None else min(pct_min, pct_mun)
-                pct_sum += pct_mun
-                pct_count += 1
-                missing_total += missing_mun
-            n_ok += 1
-            _write_state(
-                state_file,
-                {
-                    "start": start.isoformat(),
-                    "end": end.isoformat(),
-                    "last_completed": current.isoformat(),
-                    "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
-                },
-            )
-            log.info(
-                "day ok | date=%s | dt=%.2fs",
-                current.isoformat(),
-                time.perf_counter() - t0,
-            )
-        except Exception as exc:
-            n_fail += 1
-            first_fail = first_fail or current.isoformat()
-            log.error(
-                "day fail | date=%s | err=%s",
-                current.isoformat(),
-                exc,
-            )
-            break
-        current = current + timedelta(days=1)
+            for day_str in pending:
+                outcome = _process_day(day_str, opts)
+                outcomes.append(outcome)
+                _record(outcome)
+        finally:
+            _close_worker()
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(isolation,),
+        ) as pool:
+            futures = {pool.submit(_process_day, day_str, opts): day_str for day_str in pending}
+            for fut in as_completed(futures):
+                try:
+                    outcome = fut.result()
+                except Exception as exc:
+                    # worker process died (e.g. oom); the day is still recorded as failed
+                    outcome = DayOutcome(day=futures[fut], status="fail", dt=0.0, err=str(exc))
+                    log.error("day fail | date=%s | err=%s", outcome.day, exc)
+                outcomes.append(outcome)
+                _record(outcome)
+
+    ok = [o for o in outcomes if o.status == "ok"]
+    unchanged = [o for o in outcomes if o.status == "unchanged"]
+    failed = sorted(o.day for o in outcomes if o.status == "fail")
+    claimed = sorted(o.day for o in outcomes if o.status == "claimed")
+    pcts = [o.pct_mun for o in ok if o.pct_mun is not None]
+
+    log.info(
+        "summary | n_ok=%s | n_unchanged=%s | n_fail=%s | n_claimed=%s | first_fail=%s | pct_min=%s | pct_avg=%s | missing_mun_total=%s",
+        len(ok),
+        len(unchanged),
+        len(failed),
+        len(claimed),
+        failed[0] if failed else "-",
+        "-" if not pcts else f"{min(pcts):.2f}",
+        "-" if not pcts else f"{(sum(pcts) / len(pcts)):.2f}",
+        sum(o.missing_mun for o in ok),
+    )
+    if failed:
+        log.error("failed days | %s | retry with --resume", ", ".join(failed))
+        raise SystemExit(1)
+
+
+def _contiguous_ranges(days: list[date]) -> list[tuple[date, date]]:
+    ranges: list[tuple[date, date]] = []
+    for d in days:
+        if ranges and ranges[-1][1] + timedelta(days=1) == d:
+            ranges[-1] = (ranges[-1][0], d)
+        else:
+            ranges.append((d, d))
+    return ranges
+
+
+def rebuild_from_staged(
+    start: date,
+    end: date,
+    *,
+    engine: str | None = None,
+    load_method: str | None = None,
+    sql: bool = True,
+) -> None:
+    # reload every staged day in [start, end] from data/staged parquet (no download, no
+    # csv parsing), then rerun enrich/marts; days without parquet are left untouched.
+    # enrich runs set-based over each contiguous block of loaded days (monthly chunks), marts per day
+    days = staged_days(start, end)
+    if not days:
+        log.error("rebuild nothing staged | start=%s | end=%s | dir=%s", start, end, staged_dir().as_posix())
+        raise SystemExit(1)
+
+    ensure_database(engine=engine)
+    run_ref(engine=engine)
+    for lo, hi in _contiguous_ranges(days):
+        reset_file_dates(lo, hi)
+
+    log.info("rebuild start | start=%s | end=%s | staged_days=%s | sql=%s", start, end, len(days), sql)
+    t0 = time.perf_counter()
+    failed: list[str] = []
+    rows = 0
+    with psycopg.connect(conn_str(), autocommit=True) as conn:
+        loaded: list[date] = []
+        for d in days:
+            t_day = time.perf_counter()
+            try:
+                result = load_batches(read_staged_day(d), method=load_method, conn=conn)
+            except (Exception, SystemExit) as exc:
+                failed.append(d.isoformat())
+                log.error("rebuild day fail | date=%s | err=%s", d.isoformat(), exc)
+                continue
+            rows += result.attempted
+            loaded.append(d)
+            log.info("rebuild day loaded | date=%s | rows=%s | dt=%.2fs", d.isoformat(), result.attempted, time.perf_counter() - t_day)
+
+        if sql and loaded:
+            with sql_stage_lock(conn):
+                for lo, hi in _contiguous_ranges(loaded):
+                    block = [d for d in loaded if lo <= d <= hi]
+                    try:
+                        run_enrich_range(lo, hi, chunk="month", engine=engine, conn=conn)
+                    except (Exception, SystemExit) as exc:
+                        failed.extend(d.isoformat() for d in block)
+                        log.error("rebuild enrich fail | start=%s | end=%s | err=%s", lo, hi, exc)
+                        continue
+                    for d in block:
+                        try:
+                            run_marts(d.isoformat(), engine=engine, conn=conn)
+                        except (Exception, SystemExit) as exc:
+                            failed.append(d.isoformat())
+                            log.error("rebuild marts fail | date=%s | err=%s", d.isoformat(), exc)
 
     log.info(
-        "summary | n_ok=%s | n_fail=%s | first_fail=%s | pct_min=%s | pct_avg=%s | missing_mun_total=%s",
-        n_ok,
-        n_fail,
-        first_fail or "-",
-        "-" if pct_min is None else f"{pct_min:.2f}",
-        "-" if pct_count == 0 else f"{(pct_sum / pct_count):.2f}",
-        missing_total,
+        "rebuild summary | days=%s | n_fail=%s | rows=%s | dt=%.2fs",
+        len(days),
+        len(failed),
+        rows,
+        time.perf_counter() - t0,
     )
-    if n_fail:
+    if failed:
+        log.error("rebuild failed days | %s", ", ".join(failed))
         raise SystemExit(1)
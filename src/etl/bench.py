@@ -0,0 +1,599 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import hashlib
+import json
+import logging
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import psycopg
+
+from .config import conn_str
+from .load.hash_index import drop_index, invalidate
+from .load.postgis import (
+    EVENT_KEY_TYPES,
+    FACT_TABLES,
+    LOAD_METHODS,
+    STAGE_COPY_SQL,
+    STAGE_DDL,
+    STAGE_TYPES,
+    _is_partitioned,
+    ensure_db,
+    event_key_expr,
+    index_sizes,
+    load_records,
+)
+from .transform.inpe_focos_diario import ROW_FIELDS, Record, RecordBatch, iter_inpe_csv, transform_inpe_csv
+from .transform.parallel import transform_files
+from .transform.spatial import ENRICH_FIELDS, SpatialEngine
+
+_filename = Path(__file__).stem
+log = logging.getLogger(_filename)
+
+# sentinel file_date for synthetic rows; never collides with INPE data
+BENCH_FILE_DATE = date(1900, 1, 1)
+BENCH_SOURCE = "bench"
+
+
+def _synthetic_records(n: int, file_date: date, seed: int = 42) -> list[Record]:
+    rnd = random.Random(seed)
+    sats = ["AQUA_M-T", "TERRA_M-T", "NOAA-20", "NPP-375", "GOES-16"]
+    ufs = ["MT", "PA", "AM", "TO", "MA", "RO"]
+    biomas = ["Amazonia", "Cerrado", "Pantanal"]
+
+    out: list[Record] = []
+    for i in range(n):
+        lat = round(rnd.uniform(-33.0, 5.0), 5)
+        lon = round(rnd.uniform(-73.0, -35.0), 5)
+        sat = rnd.choice(sats)
+        uf = rnd.choice(ufs)
+        bioma = rnd.choice(biomas)
+        view_ts = f"{file_date.isoformat()} {i % 24:02d}:{i % 60:02d}:00"
+        props = {
+            "lat": lat,
+            "lon": lon,
+            "data_hora_gmt": view_ts,
+            "satelite": sat,
+            "estado": uf,
+            "bioma": bioma,
+            "municipio": f"MUN {i % 5000}",
+        }
+        out.append(
+            Record(
+                # real md5 hex, so the compact event_key casts apply
+                event_hash=hashlib.md5(f"bench{i}".encode()).hexdigest(),
+                file_date=file_date,
+                view_ts=view_ts,
+                satelite=sat,
+                municipio=props["municipio"],
+                estado=uf,
+                bioma=bioma,
+                lat=lat,
+                lon=lon,
+                props_json=json.dumps(props, ensure_ascii=False),
+            )
+        )
+    return out
+
+
+def _cleanup(file_date: date) -> None:
+    # drop the sentinel month partitions (plain delete on legacy heap tables) and the
+    # prefilter's hash index of that day, so the bench leaves nothing behind
+    with psycopg.connect(conn_str()) as conn, conn.cursor() as cur:
+        invalidate(cur, file_date, file_date)
+        for table in FACT_TABLES:
+            state = _is_partitioned(cur, table)
+            if state is None:
+                continue
+            if state:
+                cur.execute(f"drop table if exists {table}_p{file_date.strftime('%Y%m')}")
+            else:
+                cur.execute(f"delete from {table} where file_date = %s", (file_date,))
+        conn.commit()
+    drop_index(file_date)
+
+
+def bench_load(rows: int, methods: list[str], repeat: int = 1) -> dict[str, float]:
+    # compare loader throughput (rows/sec) on synthetic records
+    ensure_db()
+    records = _synthetic_records(rows, BENCH_FILE_DATE)
+    results: dict[str, float] = {}
+
+    for method in methods:
+        best = None
+        for attempt in range(1, repeat + 1):
+            _cleanup(BENCH_FILE_DATE)
+            t0 = time.perf_counter()
+            load_records(records, source=BENCH_SOURCE, method=method, prefilter=False)
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+            log.info("bench load | method=%s | attempt=%s | rows=%s | dt=%.2fs", method, attempt, rows, dt)
+        results[method] = rows / best if best else 0.0
+
+    _cleanup(BENCH_FILE_DATE)
+
+    for method, rps in results.items():
+        log.info("bench load result | method=%s | rows=%s | rows_per_sec=%.0f", method, rows, rps)
+    return results
+
+
+# scratch schema for key layout comparisons; dropped at the end
+_KEY_BENCH_SCHEMA = "bench_event_key"
+
+
+def _key_bench_ddl(layout: str) -> str:
+    key = "event_hash" if layout == "text" else "event_key"
+    key_col = "" if layout == "text" else f"  event_key {layout} NOT NULL,\n"
+    return f"""
+CREATE TABLE {_KEY_BENCH_SCHEMA}.focos_{layout} (
+  event_hash text NOT NULL,
+{key_col}  file_date date NOT NULL,
+  view_ts text,
+  satelite text,
+  municipio text,
+  estado text,
+  bioma text,
+  lat double precision NOT NULL,
+  lon double precision NOT NULL,
+  PRIMARY KEY ({key}, file_date)
+)
+"""
+
+
+def bench_event_key(rows: int, repeat: int = 1) -> dict[str, dict[str, float]]:
+    # ingest rate and primary key size of text event_hash vs the compact uuid/bigint keys.
+    # rows are staged once per attempt (same binary COPY as the loader), then inserted.
+    records = _synthetic_records(rows, BENCH_FILE_DATE)
+    batch = RecordBatch.from_records(records)
+    results: dict[str, dict[str, float]] = {}
+
+    with psycopg.connect(conn_str()) as conn, conn.cursor() as cur:
+        cur.execute(f"drop schema if exists {_KEY_BENCH_SCHEMA} cascade")
+        cur.execute(f"create schema {_KEY_BENCH_SCHEMA}")
+        conn.commit()
+        try:
+            for layout in ("text", *EVENT_KEY_TYPES):
+                table = f"{_KEY_BENCH_SCHEMA}.focos_{layout}"
+                key_col = "" if layout == "text" else ", event_key"
+                key_val = "" if layout == "text" else ", " + event_key_expr(layout, "s.event_hash")
+                insert_sql = f"""
+                INSERT INTO {table} (event_hash{key_col}, file_date, view_ts, satelite, municipio, estado, bioma, lat, lon)
+                SELECT s.event_hash{key_val}, s.file_date, s.view_ts, s.satelite, s.municipio, s.estado, s.bioma, s.lat, s.lon
+                FROM tmp_inpe_focos_stage s
+                ON CONFLICT DO NOTHING
+                """
+                best = None
+                for attempt in range(1, repeat + 1):
+                    cur.execute(f"drop table if exists {table}")
+                    cur.execute(_key_bench_ddl(layout))
+                    conn.commit()
+
+                    cur.execute(STAGE_DDL)
+                    with cur.copy(STAGE_COPY_SQL) as copy:
+                        copy.set_types(STAGE_TYPES)
+                        for row in batch.iter_rows(BENCH_SOURCE):
+                            copy.write_row(row)
+                    t0 = time.perf_counter()
+                    cur.execute(insert_sql)
+                    conn.commit()
+                    dt = time.perf_counter() - t0
+                    best = dt if best is None else min(best, dt)
+                    log.info("bench event-key | layout=%s | attempt=%s | rows=%s | dt=%.2fs", layout, attempt, rows, dt)
+
+                pkey_bytes = index_sizes(cur, table).get(f"{_KEY_BENCH_SCHEMA}.focos_{layout}_pkey", 0)
+                results[layout] = {"rows_per_sec": rows / best if best else 0.0, "pkey_bytes": float(pkey_bytes)}
+        finally:
+            conn.rollback()
+            cur.execute(f"drop schema if exists {_KEY_BENCH_SCHEMA} cascade")
+            conn.commit()
+
+    for layout, res in results.items():
+        log.info(
+            "bench event-key result | layout=%s | rows=%s | rows_per_sec=%.0f | pkey_mb=%.2f | pkey_vs_text=%.2f",
+            layout,
+            rows,
+            res["rows_per_sec"],
+            res["pkey_bytes"] / 1e6,
+            res["pkey_bytes"] / results["text"]["pkey_bytes"] if results["text"]["pkey_bytes"] else 0.0,
+        )
+    return results
+
+
+# municipality point-in-polygon for one day's points: full-resolution polygons vs subdivided pieces
+_MUN_PIP_SQL = {
+    "full": """
+        select distinct on (f.event_hash) f.event_hash, m.cd_mun
+        from curated.inpe_focos f
+        join ref.ibge_municipios m on m.geom is not null and st_intersects(f.geom, m.geom)
+        where f.file_date = %s and f.geom is not null
+        order by f.event_hash, m.cd_mun
+    """,
+    "sub": """
+        select distinct on (f.event_hash) f.event_hash, s.cd_mun
+        from curated.inpe_focos f
+        join ref.ibge_municipios_sub s on s.geom && f.geom and st_intersects(f.geom, s.geom)
+        where f.file_date = %s and f.geom is not null
+        order by f.event_hash, s.cd_mun
+    """,
+}
+
+
+def bench_enrich_mun(day: date, repeat: int = 1) -> dict[str, float]:
+    # read-only timing of the municipality match used by enrich; both must assign the same cd_mun
+    results: dict[str, float] = {}
+    matches: dict[str, dict[str, str]] = {}
+    with psycopg.connect(conn_str()) as conn, conn.cursor() as cur:
+        cur.execute("select count(*) from curated.inpe_focos where file_date = %s and geom is not null", (day,))
+        n_points = int(cur.fetchone()[0])
+        for name, query in _MUN_PIP_SQL.items():
+            best = None
+            for attempt in range(1, repeat + 1):
+                t0 = time.perf_counter()
+                cur.execute(query, (day,))
+                matches[name] = dict(cur.fetchall())
+                dt = time.perf_counter() - t0
+                best = dt if best is None else min(best, dt)
+                log.info("bench enrich-mun | mode=%s | attempt=%s | date=%s | points=%s | dt=%.2fs", name, attempt, day, n_points, dt)
+            results[name] = best or 0.0
+
+    diff = sum(1 for h, cd in matches["full"].items() if matches["sub"].get(h) != cd)
+    diff += sum(1 for h in matches["sub"] if h not in matches["full"])
+    if diff:
+        raise AssertionError(f"subdivided municipality match differs for {diff} points")
+
+    for name, dt in results.items():
+        log.info("bench enrich-mun result | mode=%s | date=%s | points=%s | matched=%s | dt=%.2fs", name, day, n_points, len(matches[name]), dt)
+    if results["sub"]:
+        log.info("bench enrich-mun speedup | x%.2f | identical=true", results["full"] / results["sub"])
+    return results
+
+
+ENRICH_SQL = Path(__file__).resolve().parents[2] / "sql" / "enrich" / "20_enrich_focos.sql"
+_ENRICH_SECTION_START = "-- attribution of tmp_src, up to the write below."
+_ENRICH_SECTION_END = "-- one write per row."
+
+# fixture points in the shape of 20_enrich_focos.sql's working set; event_hash is the point index
+_FIXTURE_SRC_SQL = """
+create temp table tmp_src on commit drop as
+select
+  p.idx::text as event_hash, %s::date as file_date, null::text as view_ts, null::text as satelite,
+  null::text as municipio, null::text as estado, null::text as bioma,
+  p.lon as lon, p.lat as lat, st_setsrid(st_makepoint(p.lon, p.lat), 4326) as geom
+from tmp_fixture_pts p
+"""
+
+# the attribution 20_enrich_focos.sql writes, read back per point (ref_bioma is the reference bioma)
+_FIXTURE_RESULT_SQL = """
+select
+  s.event_hash::int,
+  m.cd_mun, m.nm_mun, m.uf, m.area_km2,
+  tb.cd_bioma, tb.bioma,
+  tu.uc_id, tu.cd_cnuc, tu.nome_uc,
+  tt.terrai_cod, tt.terrai_nom, tt.etnia_nome
+from tmp_src s
+left join tmp_mun hm on hm.event_hash = s.event_hash and hm.file_date = s.file_date
+left join ref.ibge_municipios m on m.cd_mun = hm.cd_mun
+left join tmp_bioma tb on tb.event_hash = s.event_hash and tb.file_date = s.file_date
+left join tmp_uc tu on tu.event_hash = s.event_hash and tu.file_date = s.file_date
+left join tmp_ti tt on tt.event_hash = s.event_hash and tt.file_date = s.file_date
+order by s.event_hash::int
+"""
+
+
+def _enrich_attribution_sql() -> str:
+    # the temp-table attribution section of the production enrich file, so the bench cannot drift from it
+    text = ENRICH_SQL.read_text(encoding="utf-8").lstrip("\ufeff")
+    start = text.find(_ENRICH_SECTION_START)
+    end = text.find(_ENRICH_SECTION_END, start)
+    if start < 0 or end < 0:
+        raise RuntimeError(f"attribution section markers not found in {ENRICH_SQL.as_posix()}")
+    return text[start:end]
+
+
+def bench_enrich_engine(rows: int, csv_path: str | None = None, csv_date: date | None = None) -> dict[str, int]:
+    # consistency and speed of the in-process STRtree engine against the sql path on fixture
+    # points (synthetic points over brazil and its coast, or an INPE csv). the points become a
+    # temp tmp_src and go through the attribution section of sql/enrich/20_enrich_focos.sql;
+    # read-only, everything is rolled back. fails when any attribution differs.
+    if csv_path:
+        batches = list(iter_inpe_csv(csv_path, file_date=csv_date or BENCH_FILE_DATE))
+        lon = np.concatenate([b.lon for b in batches]) if batches else np.empty(0)
+        lat = np.concatenate([b.lat for b in batches]) if batches else np.empty(0)
+    else:
+        records = _synthetic_records(rows, BENCH_FILE_DATE)
+        lon = np.array([r.lon for r in records], dtype=np.float64)
+        lat = np.array([r.lat for r in records], dtype=np.float64)
+    n = len(lon)
+
+    with psycopg.connect(conn_str()) as conn:
+        t0 = time.perf_counter()
+        engine = SpatialEngine.from_db(conn)
+        dt_load = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        py_cols = engine.attribute(lon, lat)
+        dt_py = time.perf_counter() - t0
+
+        with conn.cursor() as cur:
+            t0 = time.perf_counter()
+            cur.execute("create temp table tmp_fixture_pts (idx int primary key, lon float8, lat float8) on commit drop")
+            with cur.copy("copy tmp_fixture_pts (idx, lon, lat) from stdin (format binary)") as copy:
+                copy.set_types(["int4", "float8", "float8"])
+                for row in zip(range(n), lon.tolist(), lat.tolist()):
+                    copy.write_row(row)
+            cur.execute(_FIXTURE_SRC_SQL, (BENCH_FILE_DATE,))
+            cur.execute(_enrich_attribution_sql())
+            cur.execute(_FIXTURE_RESULT_SQL)
+            sql_rows = cur.fetchall()
+            dt_sql = time.perf_counter() - t0
+        conn.rollback()
+
+    mismatches = {name: 0 for name in ENRICH_FIELDS}
+    py_rows = list(zip(*(py_cols[name].tolist() for name in ENRICH_FIELDS)))
+    for (idx, *sql_vals), py_vals in zip(sql_rows, py_rows):
+        for name, a, b in zip(ENRICH_FIELDS, sql_vals, py_vals):
+            if a != b:
+                mismatches[name] += 1
+                if sum(mismatches.values()) <= 10:
+                    log.warning("bench enrich-engine mismatch | idx=%s | lon=%s | lat=%s | field=%s | sql=%s | python=%s", idx, lon[idx], lat[idx], name, a, b)
+
+    matched = sum(v is not None for v in py_cols["mun_cd_mun"].tolist())
+    log.info("bench enrich-engine python | points=%s | mun_matched=%s | load_refs=%.2fs | dt=%.2fs | foci_per_s=%.0f", n, matched, dt_load, dt_py, n / dt_py if dt_py else 0.0)
+    log.info("bench enrich-engine sql | points=%s | dt=%.2fs | foci_per_s=%.0f", n, dt_sql, n / dt_sql if dt_sql else 0.0)
+    if any(mismatches.values()):
+        raise AssertionError(f"python enrich engine differs from sql: {({k: v for k, v in mismatches.items() if v})}")
+    log.info("bench enrich-engine consistent | points=%s | fields=%s", n, len(ENRICH_FIELDS))
+    return mismatches
+
+
+def _write_synthetic_csv(path: Path, n: int, file_date: date, seed: int = 42) -> None:
+    # INPE daily layout with blanks, null tokens, accents and ~1% repeated rows
+    rnd = random.Random(seed)
+    sats = ["AQUA_M-T", "TERRA_M-T", "NOAA-20", "NPP-375", "GOES-16", "null"]
+    ufs = ["MATO GROSSO", "PARÁ", "AMAZONAS", "TOCANTINS", "MARANHÃO", ""]
+    biomas = ["Amazônia", "Cerrado", "Pantanal", "NaN"]
+    header = "id;lat;lon;data_hora_gmt;satelite;pais;estado;municipio;bioma;numero_dias_sem_chuva;precipitacao;risco_fogo;frp"
+
+    lines = [header]
+    prev = None
+    for i in range(n):
+        if prev is not None and rnd.random() < 0.01:
+            lines.append(prev)
+            continue
+        ts = f"{file_date.isoformat()} {rnd.randrange(24):02d}:{rnd.randrange(60):02d}:00"
+        frp = "" if rnd.random() < 0.3 else f"{rnd.uniform(0, 200):.1f}"
+        prev = ";".join(
+            [
+                f"{i:08d}",
+                f"{rnd.uniform(-33.0, 5.0):.5f}",
+                f"{rnd.uniform(-73.0, -35.0):.5f}".replace(".", ","),
+                ts,
+                rnd.choice(sats),
+                "Brasil",
+                rnd.choice(ufs),
+                f'MUNICÍPIO "{i % 5000}"',
+                rnd.choice(biomas),
+                str(rnd.randrange(30)),
+                f"{rnd.uniform(0, 20):.2f}",
+                f"{rnd.random():.2f}",
+                frp,
+            ]
+        )
+        lines.append(prev)
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def bench_transform(rows: int, repeat: int = 1) -> dict[str, float]:
+    # compare the row-wise and column-wise record builders; outputs must be identical
+    results: dict[str, float] = {}
+    outputs: dict[str, list[Record]] = {}
+    with tempfile.TemporaryDirectory(prefix="etl-bench-") as tmp:
+        csv_path = Path(tmp) / "focos.csv"
+        _write_synthetic_csv(csv_path, rows, BENCH_FILE_DATE)
+
+        for name, vectorized in (("rowwise", False), ("vectorized", True)):
+            best = None
+            for attempt in range(1, repeat + 1):
+                t0 = time.perf_counter()
+                outputs[name] = transform_inpe_csv(str(csv_path), BENCH_FILE_DATE, vectorized=vectorized)
+                dt = time.perf_counter() - t0
+                best = dt if best is None else min(best, dt)
+                log.info("bench transform | mode=%s | attempt=%s | rows=%s | dt=%.2fs", name, attempt, rows, dt)
+            results[name] = best or 0.0
+
+    if outputs["rowwise"] != outputs["vectorized"]:
+        raise AssertionError("vectorized transform output differs from rowwise")
+
+    for name, dt in results.items():
+        log.info("bench transform result | mode=%s | rows=%s | dt=%.2fs | rows_per_sec=%.0f", name, rows, dt, rows / dt if dt else 0.0)
+    if results["vectorized"]:
+        log.info("bench transform speedup | x%.2f | records=%s | identical=true", results["rowwise"] / results["vectorized"], len(outputs["vectorized"]))
+    return results
+
+
+def bench_transform_range(days: int, rows: int, workers: int | None = None) -> dict[str, float]:
+    # serial transform of `days` fixture csvs vs the process pool; row counts must match
+    results: dict[str, float] = {}
+    with tempfile.TemporaryDirectory(prefix="etl-bench-") as tmp:
+        items = []
+        for i in range(days):
+            d = BENCH_FILE_DATE + timedelta(days=i)
+            path = Path(tmp) / f"{d.isoformat()}.csv"
+            _write_synthetic_csv(path, rows, d, seed=i)
+            items.append((d, path))
+
+        t0 = time.perf_counter()
+        serial = [sum(len(b) for b in iter_inpe_csv(str(path), file_date=d)) for d, path in items]
+        results["serial"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        pooled = [day.rows for day in transform_files(items, workers=workers)]
+        results["pool"] = time.perf_counter() - t0
+
+    if serial != pooled:
+        raise AssertionError("pool transform row counts differ from serial")
+
+    total = sum(serial)
+    for name, dt in results.items():
+        log.info("bench transform-range result | mode=%s | days=%s | rows=%s | dt=%.2fs | rows_per_sec=%.0f", name, days, total, dt, total / dt if dt else 0.0)
+    if results["pool"]:
+        log.info("bench transform-range speedup | x%.2f", results["serial"] / results["pool"])
+    return results
+
+
+class _GcTimer:
+    # collections and pause time reported through gc.callbacks
+    def __init__(self) -> None:
+        self.collections = 0
+        self.pause = 0.0
+        self._t0 = 0.0
+
+    def __call__(self, phase: str, info: dict) -> None:
+        if phase == "start":
+            self._t0 = time.perf_counter()
+        else:
+            self.collections += 1
+            self.pause += time.perf_counter() - self._t0
+
+
+def _measure_memory(name: str, fn) -> dict[str, float]:
+    gc.collect()
+    timer = _GcTimer()
+    gc.callbacks.append(timer)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        held = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        dt = time.perf_counter() - t0
+        tracemalloc.stop()
+        gc.callbacks.remove(timer)
+    del held
+    stats = {
+        "held_mb": current / 2**20,
+        "peak_mb": peak / 2**20,
+        "gc_collections": timer.collections,
+        "gc_pause_s": timer.pause,
+        "dt_s": dt,
+    }
+    log.info(
+        "bench memory | repr=%s | held_mb=%.1f | peak_mb=%.1f | gc_collections=%s | gc_pause=%.2fs | dt=%.2fs",
+        name,
+        stats["held_mb"],
+        stats["peak_mb"],
+        stats["gc_collections"],
+        stats["gc_pause_s"],
+        stats["dt_s"],
+    )
+    return stats
+
+
+def bench_memory(rows: int, chunk_size: int = 5000) -> dict[str, dict[str, float]]:
+    # one day held in memory the way the loader sees it: list[Record] plus the per-row
+    # parameter dicts the old loader built up front, vs RecordBatches with dicts per chunk
+    results: dict[str, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory(prefix="etl-bench-") as tmp:
+        csv_path = Path(tmp) / "focos.csv"
+        _write_synthetic_csv(csv_path, rows, BENCH_FILE_DATE)
+
+        def _records():
+            recs = transform_inpe_csv(str(csv_path), BENCH_FILE_DATE)
+            params = [
+                dict(zip(ROW_FIELDS, (r.event_hash, BENCH_SOURCE, r.file_date, r.view_ts, r.satelite, r.municipio, r.estado, r.bioma, r.lat, r.lon, r.props_json)))
+                for r in recs
+            ]
+            return recs, params
+
+        def _batches():
+            batches = list(iter_inpe_csv(str(csv_path), BENCH_FILE_DATE))
+            for batch in batches:
+                for start in range(0, len(batch), chunk_size):
+                    params = [dict(zip(ROW_FIELDS, row)) for row in batch.iter_rows(BENCH_SOURCE, start, start + chunk_size)]
+            return batches
+
+        results["records"] = _measure_memory("records", _records)
+        results["batches"] = _measure_memory("batches", _batches)
+
+    before, after = results["records"], results["batches"]
+    log.info(
+        "bench memory result | rows=%s | held_mb=%.1f->%.1f | peak_mb=%.1f->%.1f | gc_pause=%.2fs->%.2fs",
+        rows,
+        before["held_mb"],
+        after["held_mb"],
+        before["peak_mb"],
+        after["peak_mb"],
+        before["gc_pause_s"],
+        after["gc_pause_s"],
+    )
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="etl micro benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    load = sub.add_parser("load", help="compare loader modes against the configured database")
+    load.add_argument("--rows", type=int, default=100_000)
+    load.add_argument("--repeat", type=int, default=1)
+    load.add_argument("--method", choices=list(LOAD_METHODS), action="append", default=None)
+
+    transform = sub.add_parser("transform", help="compare record builders on a synthetic csv")
+    transform.add_argument("--rows", type=int, default=200_000)
+    transform.add_argument("--repeat", type=int, default=1)
+
+    event_key = sub.add_parser("event-key", help="ingest rate and pk size: text event_hash vs uuid/bigint keys")
+    event_key.add_argument("--rows", type=int, default=200_000)
+    event_key.add_argument("--repeat", type=int, default=1)
+
+    enrich_mun = sub.add_parser("enrich-mun", help="municipality point-in-polygon for a loaded day: full vs subdivided polygons")
+    enrich_mun.add_argument("--date", required=True, help="file_date already loaded into curated.inpe_focos")
+    enrich_mun.add_argument("--repeat", type=int, default=2)
+
+    enrich_engine = sub.add_parser("enrich-engine", help="python STRtree enrich engine vs the sql path on fixture points (consistency + speed)")
+    enrich_engine.add_argument("--rows", type=int, default=50_000, help="synthetic points when no --csv is given")
+    enrich_engine.add_argument("--csv", default=None, help="INPE daily csv to use as fixture")
+    enrich_engine.add_argument("--csv-date", default=None, help="file_date for --csv (default: sentinel date)")
+
+    trange = sub.add_parser("transform-range", help="serial vs process-pool transform over fixture csv days")
+    trange.add_argument("--days", type=int, default=8)
+    trange.add_argument("--rows", type=int, default=50_000)
+    trange.add_argument("--workers", type=int, default=None)
+
+    memory = sub.add_parser("memory", help="memory/gc of list[Record] vs columnar batches for one day")
+    memory.add_argument("--rows", type=int, default=200_000)
+
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+    )
+
+    if args.command == "load":
+        bench_load(args.rows, args.method or list(LOAD_METHODS), repeat=args.repeat)
+    elif args.command == "transform":
+        bench_transform(args.rows, repeat=args.repeat)
+    elif args.command == "event-key":
+        bench_event_key(args.rows, repeat=args.repeat)
+    elif args.command == "enrich-mun":
+        bench_enrich_mun(date.fromisoformat(args.date), repeat=args.repeat)
+    elif args.command == "enrich-engine":
+        bench_enrich_engine(args.rows, csv_path=args.csv, csv_date=date.fromisoformat(args.csv_date) if args.csv_date else None)
+    elif args.command == "transform-range":
+        bench_transform_range(args.days, args.rows, workers=args.workers)
+    elif args.command == "memory":
+        bench_memory(args.rows)
+    else:
+        parser.error(f"unknown command: {args.command}")
+
+
+if __name__ == "__main__":
+    main()
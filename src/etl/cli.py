@@ -5,19 +5,25 @@ import logging
 import os
 import sys
 import time
+from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
+from typing import Iterator, Optional
+
+import psycopg
+import requests
 
 from .config import settings
-from .extract.inpe_focos_diario import download_daily_csv
-from .load.postgis import load_records
-from .transform.inpe_focos_diario import transform_inpe_csv
+from .extract.inpe_focos_diario import ExtractResult, download_daily_csv
+from .load.postgis import LoadResult, day_loaded, load_batches
+from .load.staged import read_staged_day, stage_batches, staged_sha256
+from .transform.inpe_focos_diario import RecordBatch, iter_inpe_csv
 
 _filename = Path(__file__).stem
 log = logging.getLogger(_filename)
 
 
-def _setup_logging() -> Path:
+def setup_logging() -> Path:
     # set up console and file logging
     log_dir = Path(settings.data_dir) / "logs"
     log_dir.mkdir(parents=True, exist_ok=True)
@@ -41,7 +47,7 @@ def _setup_logging() -> Path:
     return log_file
 
 
-def _try_load_dotenv() -> None:
+def try_load_dotenv() -> None:
     # load .env if python-dotenv is installed; not a hard dependency
     try:
         from dotenv import load_dotenv  # type: ignore
@@ -50,45 +56,103 @@ def _try_load_dotenv() -> None:
     load_dotenv()
 
 
-def run(date_str: str, no_cache: bool = False) -> None:
-    # run the ETL flow for a single date
-    _try_load_dotenv()
-    _setup_logging()
-
+def day_batches(file_date: date, ex: ExtractResult, *, stage: bool | None = None) -> Iterator[RecordBatch]:
+    # record batches for a day: from data/staged when it was staged from this exact csv,
+    # otherwise parsed from the csv (and written to data/staged when staging is on)
+    stage = settings.staging_enabled if stage is None else stage
+    if not stage:
+        return iter_inpe_csv(str(ex.path), file_date=file_date)
+    if ex.sha256 and staged_sha256(file_date) == ex.sha256:
+        log.info("transform skip | staged parquet is current | date=%s", file_date.isoformat())
+        return read_staged_day(file_date)
+    return stage_batches(file_date, iter_inpe_csv(str(ex.path), file_date=file_date), source_sha256=ex.sha256)
+
+
+def skip_unchanged_day(ex: ExtractResult, conn: Optional[psycopg.Connection] = None) -> bool:
+    # the processed marker lives next to the raw cache, not in the database: unchanged content
+    # is skipped only while its rows are still loaded (schemas dropped, a reset or another
+    # database keep the markers but not the rows)
+    if ex.changed:
+        return False
+    if day_loaded(ex.file_date, conn=conn):
+        return True
+    log.info("etl reload | content unchanged but not in database | date=%s", ex.file_date.isoformat())
+    return False
+
+
+@dataclass(frozen=True)
+class DayResult:
+    file_date: date
+    url: str
+    rows_parsed: int
+    load: LoadResult
+    extract: ExtractResult | None = None
+    # true when the raw content was unchanged since last processed and nothing ran
+    skipped: bool = False
+
+
+def run_day(
+    file_date: date,
+    *,
+    no_cache: bool = False,
+    load_method: str | None = None,
+    session: Optional[requests.Session] = None,
+    conn: Optional[psycopg.Connection] = None,
+    skip_unchanged: bool = False,
+    stage: bool | None = None,
+) -> DayResult:
+    # extract/transform/load one date; session and conn are reused when given.
+    # with skip_unchanged, content already marked processed (and still loaded) stops after extract.
     t0 = time.perf_counter()
-    file_date = date.fromisoformat(date_str)
 
     log.info("etl start | date=%s", file_date.isoformat())
 
     # extract csv from the INPE source
     t_extract = time.perf_counter()
-    ex = download_daily_csv(file_date, force=no_cache)
+    ex = download_daily_csv(file_date, force=no_cache, session=session)
     dt_extract = time.perf_counter() - t_extract
 
     log.info("extract ok | dt=%.2fs | url=%s", dt_extract, ex.url)
 
-    # transform into normalized records
-    t_transform = time.perf_counter()
-    records = transform_inpe_csv(str(ex.path), file_date=file_date)
-    dt_transform = time.perf_counter() - t_transform
-
-    log.info("transform ok | dt=%.2fs | rows=%s", dt_transform, len(records))
-
-    # load into the database
+    if skip_unchanged and skip_unchanged_day(ex, conn=conn):
+        log.info("etl skip | content unchanged | date=%s | sha256=%s", file_date.isoformat(), ex.sha256)
+        return DayResult(
+            file_date=file_date,
+            url=ex.url,
+            rows_parsed=0,
+            load=LoadResult(inserted=0, attempted=0),
+            extract=ex,
+            skipped=True,
+        )
+
+    # transform and load stream together, one record batch at a time
     t_load = time.perf_counter()
-    load_result = load_records(records)
+    batches = day_batches(file_date, ex, stage=stage)
+    load_result = load_batches(batches, method=load_method, conn=conn)
     dt_load = time.perf_counter() - t_load
 
     log.info(
-        "load ok | dt=%.2fs | rows_inserted=%s | rows_attempted=%s",
+        "transform+load ok | dt=%.2fs | rows_inserted=%s | rows_skipped=%s | curated_inserted=%s | rows_attempted=%s",
         dt_load,
         load_result.inserted,
+        load_result.raw.total_skipped,
+        load_result.curated.total_inserted,
         load_result.attempted,
     )
     log.info("etl done | total_dt=%.2fs", time.perf_counter() - t0)
 
-    print(f"Downloaded: {ex.url}")
-    print(f"Rows parsed: {len(records)}")
+    return DayResult(file_date=file_date, url=ex.url, rows_parsed=load_result.attempted, load=load_result, extract=ex)
+
+
+def run(date_str: str, no_cache: bool = False, load_method: str | None = None, stage: bool | None = None) -> None:
+    # run the ETL flow for a single date
+    try_load_dotenv()
+    setup_logging()
+
+    result = run_day(date.fromisoformat(date_str), no_cache=no_cache, load_method=load_method, stage=stage)
+
+    print(f"Downloaded: {result.url}")
+    print(f"Rows parsed: {result.rows_parsed}")
 
 
 def _parse_args(argv: list[str] | None) -> argparse.Namespace:
@@ -96,13 +160,20 @@ def _parse_args(argv: list[str] | None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="run inpe queimadas etl")
     parser.add_argument("--date", required=True, help="date in YYYY-MM-DD")
     parser.add_argument("--no-cache", action="store_true", help="force re-download")
+    parser.add_argument("--stage", action="store_true", default=None, help="write/read data/staged parquet (default: STAGING_ENABLED)")
+    parser.add_argument(
+        "--load-method",
+        choices=["executemany", "copy"],
+        default=None,
+        help="loader mode (default: settings.load_method)",
+    )
     return parser.parse_args(argv)
 
 
 def main(argv: list[str] | None = None) -> None:
     # main entrypoint
     args = _parse_args(argv)
-    run(args.date, no_cache=bool(args.no_cache))
+    run(args.date, no_cache=bool(args.no_cache), load_method=args.load_method, stage=args.stage)
 
 
 if __name__ == "__main__":
@@ -14,9 +14,44 @@ class Settings(BaseSettings):
     inpe_base_url: str = "https://dataserver-coids.inpe.br/queimadas/queimadas/focos/csv/diario/Brasil"
     inpe_monthly_base_url: str = "https://dataserver-coids.inpe.br/queimadas/queimadas/focos/csv/mensal/Brasil"
     inpe_retention_days: int = 45
+    # daily files newer than this are revalidated (etag/last-modified) instead of served from cache
+    inpe_revalidate_days: int = 2
+    # bulk range downloads (fetch_range)
+    download_concurrency: int = 4
+    download_retries: int = 3
+    # loader mode: "copy" (binary COPY into staging) or "executemany"
+    load_method: str = "executemany"
+    # drop rows whose event_hash is already in raw and curated (and enriched with ENRICH_ENGINE=python)
+    # before sending them; per-day hash index under data/state
+    load_prefilter: bool = False
+    # compact key written next to event_hash: "off", "uuid" (the md5 as 16 bytes) or "bigint" (its first 64 bits)
+    event_key: str = "off"
+    # point-in-polygon enrichment: "sql" (sql/enrich after the load) or "python" (shapely STRtree
+    # in the loader, rows arrive enriched; needs the [spatial] extra)
+    enrich_engine: str = "sql"
+    # csv rows parsed per transform batch (bounds transform/load memory)
+    transform_batch_size: int = 50_000
+    # processes for range transforms (0 = one per cpu)
+    transform_workers: int = 0
+    # write per-day parquet under data/staged and reuse it instead of re-parsing csvs (needs pyarrow)
+    staging_enabled: bool = False
+    # seconds between intraday refreshes in `etl.app watch`
+    watch_interval_s: int = 600
+    # etl.daemon: local time to finalize the previous day, ref refresh cadence, status http port (0 = off)
+    daemon_daily_at: str = "06:00"
+    daemon_ref_refresh_h: int = 24
+    daemon_status_port: int = 0
     # base directory for data and logs
     data_dir: str = "data"
 
 
 # singleton settings instance
 settings = Settings()
+
+
+# libpq connection string for settings' database
+def conn_str() -> str:
+    return (
+        f"host={settings.db_host} port={settings.db_port} dbname={settings.db_name} "
+        f"user={settings.db_user} password={settings.db_password}"
+    )
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Optional
+
+import psycopg
+import requests
+
+from .checks import run_checks
+from .cli import setup_logging, try_load_dotenv
+from .config import conn_str, settings
+from .db_bootstrap import ensure_database
+from .incremental import run_increment
+from .locks import DAEMON_LOCK, advisory_unlock, sql_stage_lock, try_advisory_lock
+from .ref_runner import run_ref
+
+_filename = Path(__file__).stem
+log = logging.getLogger(_filename)
+
+# durations kept per job for the latency summary
+_LATENCY_WINDOW = 50
+
+
+def status_path() -> Path:
+    return Path(settings.data_dir) / "state" / "daemon_status.json"
+
+
+@dataclass
+class _Job:
+    name: str
+    fn: Callable[[], str]
+    # fixed cadence in seconds, or a daily wall-clock time (HH:MM, local)
+    every_s: Optional[int] = None
+    daily_at: Optional[str] = None
+    next_run: float = 0.0
+    runs: int = 0
+    failures: int = 0
+    last_status: Optional[str] = None
+    last_start: Optional[str] = None
+    last_dt_s: Optional[float] = None
+    last_error: Optional[str] = None
+    durations: deque = field(default_factory=lambda: deque(maxlen=_LATENCY_WINDOW))
+
+    def schedule(self, now: float) -> None:
+        if self.every_s is not None:
+            self.next_run = now + self.every_s
+            return
+        hh, mm = (int(x) for x in (self.daily_at or "00:00").split(":"))
+        at = datetime.fromtimestamp(now).replace(hour=hh, minute=mm, second=0, microsecond=0)
+        if at.timestamp() <= now:
+            at += timedelta(days=1)
+        self.next_run = at.timestamp()
+
+    def status(self) -> dict:
+        ordered = sorted(self.durations)
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_status": self.last_status,
+            "last_start": self.last_start,
+            "last_dt_s": round(self.last_dt_s, 3) if self.last_dt_s is not None else None,
+            "last_error": self.last_error,
+            "p50_dt_s": round(ordered[len(ordered) // 2], 3) if ordered else None,
+            "max_dt_s": round(ordered[-1], 3) if ordered else None,
+            "next_run": datetime.fromtimestamp(self.next_run).isoformat(timespec="seconds"),
+        }
+
+
+class Daemon:
+    # resident scheduler: warms up once (database, ref data, http session, db connection), then
+    # runs due jobs one at a time in this process. jobs touching a day hold the same advisory
+    # lock as backfill workers; the ref refresh holds the enrich/marts lock, so jobs never
+    # overlap with each other or with a backfill running elsewhere.
+    def __init__(self, *, engine: str | None = None, load_method: str | None = None, checks: bool = False) -> None:
+        self.engine = engine
+        self.load_method = load_method
+        self.checks = checks
+        self.session = requests.Session()
+        self.conn: Optional[psycopg.Connection] = None
+        self.lock_conn: Optional[psycopg.Connection] = None
+        self.stop = threading.Event()
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.warmup: dict[str, float] = {}
+        self.current: Optional[str] = None
+        self._status_lock = threading.Lock()
+        self.jobs = [
+            _Job("intraday", self._job_intraday, every_s=settings.watch_interval_s),
+            _Job("daily", self._job_daily, daily_at=settings.daemon_daily_at),
+            _Job("ref", self._job_ref, every_s=settings.daemon_ref_refresh_h * 3600),
+        ]
+
+    # connections -------------------------------------------------------------------------
+
+    def _connect(self) -> psycopg.Connection:
+        return psycopg.connect(conn_str(), autocommit=True)
+
+    def _sql_conn(self) -> Optional[psycopg.Connection]:
+        # warm connection shared by loaders and direct sql files; docker engine runs psql instead
+        if self.engine == "docker":
+            return None
+        if self.conn is None or self.conn.closed or self.conn.broken:
+            self.conn = self._connect()
+        return self.conn
+
+    # jobs --------------------------------------------------------------------------------
+
+    def _day_job(self, d: date, *, checks: bool = False) -> str:
+        key = d.toordinal()
+        if not try_advisory_lock(self.lock_conn, key):
+            log.warning("daemon job busy | date=%s | claimed by another process", d.isoformat())
+            return "busy"
+        try:
+            result = run_increment(
+                d,
+                engine=self.engine,
+                load_method=self.load_method,
+                session=self.session,
+                conn=self._sql_conn(),
+            )
+        finally:
+            advisory_unlock(self.lock_conn, key)
+        if checks:
+            run_checks(d.isoformat())
+        return "unchanged" if result.skipped else "ok"
+
+    def _job_intraday(self) -> str:
+        return self._day_job(date.today())
+
+    def _job_daily(self) -> str:
+        # the previous day's file is final by now: last refresh (and optional checks)
+        return self._day_job(date.today() - timedelta(days=1), checks=self.checks)
+
+    def _job_ref(self) -> str:
+        with sql_stage_lock(self.lock_conn):
+            run_ref(engine=self.engine)
+        return "ok"
+
+    # lifecycle ---------------------------------------------------------------------------
+
+    def _warm_up(self) -> None:
+        t0 = time.perf_counter()
+        ensure_database(engine=self.engine)
+        self.warmup["ensure_database_s"] = round(time.perf_counter() - t0, 3)
+
+        self.lock_conn = self._connect()
+        if not try_advisory_lock(self.lock_conn, DAEMON_LOCK):
+            raise RuntimeError("another etl.daemon is already running against this database")
+
+        t0 = time.perf_counter()
+        run_ref(engine=self.engine)
+        self.warmup["run_ref_s"] = round(time.perf_counter() - t0, 3)
+        self._sql_conn()
+        log.info("daemon warm | %s", " | ".join(f"{k}={v}" for k, v in self.warmup.items()))
+
+    def _run_job(self, job: _Job) -> None:
+        t0 = time.perf_counter()
+        job.last_start = datetime.now().isoformat(timespec="seconds")
+        self.current = job.name
+        self.write_status()
+        log.info("daemon job start | job=%s", job.name)
+        try:
+            job.last_status = job.fn()
+            job.last_error = None
+        except Exception as exc:
+            job.failures += 1
+            job.last_status = "failed"
+            job.last_error = str(exc)[:500]
+            log.exception("daemon job failed | job=%s", job.name)
+            if self.conn is not None and self.conn.broken:
+                self.conn = None
+        job.runs += 1
+        job.last_dt_s = time.perf_counter() - t0
+        job.durations.append(job.last_dt_s)
+        job.schedule(time.time())
+        if job.last_status == "failed":
+            # failed daily/ref jobs retry at the intraday cadence instead of waiting a full period
+            job.next_run = min(job.next_run, time.time() + settings.watch_interval_s)
+        self.current = None
+        log.info("daemon job done | job=%s | status=%s | dt=%.2fs", job.name, job.last_status, job.last_dt_s)
+        self.write_status()
+
+    def status(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "running": self.current,
+            "engine": self.engine or "auto",
+            "warmup": self.warmup,
+            "jobs": {job.name: job.status() for job in self.jobs},
+        }
+
+    def write_status(self) -> None:
+        path = status_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with self._status_lock:
+            tmp_path.write_text(json.dumps(self.status(), indent=2), encoding="utf-8")
+            tmp_path.replace(path)
+
+    def run(self, *, once: bool = False) -> None:
+        self._warm_up()
+        now = time.time()
+        for job in self.jobs:
+            # intraday starts right away; daily/ref wait for their first slot
+            if job.name == "intraday":
+                job.next_run = now
+            else:
+                job.schedule(now)
+        self.write_status()
+
+        try:
+            while not self.stop.is_set():
+                due = [job for job in self.jobs if job.next_run <= time.time()]
+                for job in sorted(due, key=lambda j: j.next_run):
+                    if self.stop.is_set():
+                        break
+                    self._run_job(job)
+                if once:
+                    return
+                wait = min(job.next_run for job in self.jobs) - time.time()
+                self.stop.wait(max(wait, 1.0))
+        finally:
+            for conn in (self.conn, self.lock_conn):
+                if conn is not None and not conn.closed:
+                    conn.close()
+            log.info("daemon stopped")
+
+
+def _serve_status(daemon: Daemon, port: int) -> ThreadingHTTPServer:
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            if self.path.rstrip("/") not in ("", "/status"):
+                self.send_error(404)
+                return
+            body = json.dumps(daemon.status(), indent=2).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            log.debug("status http | " + format, *args)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    threading.Thread(target=server.serve_forever, name="daemon-status", daemon=True).start()
+    log.info("daemon status endpoint | url=http://127.0.0.1:%s/status", port)
+    return server
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="resident etl scheduler")
+    parser.add_argument("--engine", choices=["docker", "direct", "auto"], default="auto")
+    parser.add_argument("--load-method", choices=["executemany", "copy"], default=None)
+    parser.add_argument("--checks", action="store_true", help="run checks after the daily job")
+    parser.add_argument("--status-port", type=int, default=None, help="serve status json on 127.0.0.1:PORT (default: DAEMON_STATUS_PORT, 0 = off)")
+    parser.add_argument("--once", action="store_true", help="warm up, run due jobs once and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    try_load_dotenv()
+    setup_logging()
+    args = _parse_args(argv)
+
+    daemon = Daemon(
+        engine=None if args.engine == "auto" else args.engine,
+        load_method=args.load_method,
+        checks=args.checks,
+    )
+
+    def _stop(signum, _frame) -> None:
+        log.info("daemon stop requested | signal=%s", signum)
+        daemon.stop.set()
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    port = settings.daemon_status_port if args.status_port is None else args.status_port
+    server = _serve_status(daemon, port) if port else None
+    try:
+        daemon.run(once=args.once)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
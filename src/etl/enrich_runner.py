@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import time
+from datetime import date, timedelta
 from pathlib import Path
 
+import psycopg
+
+from .config import conn_str
 from .sql_runner import run_sql_file
 
 
@@ -13,15 +18,89 @@ def _repo_root() -> Path:
     return Path(__file__).resolve().parents[2]
 
 
-def run_enrich(date_str: str, engine: str | None = None) -> None:
+def _enrich_files() -> list[Path]:
     sql_dir = _repo_root() / "sql" / "enrich"
     files = sorted(sql_dir.glob("*.sql"))
 
     if not files:
         raise RuntimeError("no sql/enrich files")
+    return files
+
 
+def _run_files(files: list[Path], start: str, end: str, engine: str | None, conn: psycopg.Connection | None) -> None:
+    # DATE stays defined for single-day runs; the enrich files read START/END
+    vars = {"DATE": start, "START": start, "END": end}
     for file in files:
-        _log(f"run {file.as_posix()} | date={date_str}")
-        run_sql_file(str(file), {"DATE": date_str}, engine=engine)
+        _log(f"run {file.as_posix()} | start={start} | end={end}")
+        run_sql_file(str(file), vars, engine=engine, conn=conn)
+
 
+def run_enrich(date_str: str, engine: str | None = None, conn: psycopg.Connection | None = None) -> None:
+    files = _enrich_files()
+    _run_files(files, date_str, date_str, engine, conn)
     _log(f"done | files={len(files)}")
+
+
+def month_chunks(start: date, end: date) -> list[tuple[date, date]]:
+    # [start, end] split at calendar month boundaries
+    chunks: list[tuple[date, date]] = []
+    lo = start
+    while lo <= end:
+        next_month = (lo.replace(day=1) + timedelta(days=32)).replace(day=1)
+        hi = min(end, next_month - timedelta(days=1))
+        chunks.append((lo, hi))
+        lo = next_month
+    return chunks
+
+
+def _count_foci(conn: psycopg.Connection, start: date, end: date) -> int:
+    row = conn.execute(
+        "select count(*) from curated.inpe_focos where file_date between %s and %s",
+        (start, end),
+    ).fetchone()
+    return int(row[0])
+
+
+def run_enrich_range(
+    start: date,
+    end: date,
+    *,
+    chunk: str = "month",
+    engine: str | None = None,
+    conn: psycopg.Connection | None = None,
+) -> None:
+    # set-based enrichment of a whole range: the enrich files run once per chunk ("month") or
+    # once for [start, end] ("all"), each chunk in one transaction with one set of temp tables
+    # and indexes, instead of once per day. throughput is reported against the foci of the chunk.
+    if chunk not in ("month", "all"):
+        raise ValueError(f"invalid chunk: {chunk}")
+    if end < start:
+        raise ValueError(f"end before start: {start} > {end}")
+
+    files = _enrich_files()
+    chunks = month_chunks(start, end) if chunk == "month" else [(start, end)]
+    own = conn is None
+    count_conn = psycopg.connect(conn_str(), autocommit=True) if own else conn
+
+    total_foci = 0
+    t0 = time.perf_counter()
+    try:
+        for lo, hi in chunks:
+            t_chunk = time.perf_counter()
+            _run_files(files, lo.isoformat(), hi.isoformat(), engine, conn)
+            dt = time.perf_counter() - t_chunk
+            foci = _count_foci(count_conn, lo, hi)
+            total_foci += foci
+            _log(
+                f"chunk done | start={lo.isoformat()} | end={hi.isoformat()} | foci={foci} | "
+                f"dt={dt:.2f}s | foci_per_s={foci / dt if dt else 0.0:.0f}"
+            )
+    finally:
+        if own:
+            count_conn.close()
+
+    dt = time.perf_counter() - t0
+    _log(
+        f"range done | start={start.isoformat()} | end={end.isoformat()} | chunks={len(chunks)} | "
+        f"foci={total_foci} | dt={dt:.2f}s | foci_per_s={total_foci / dt if dt else 0.0:.0f}"
+    )
@@ -1,29 +1,138 @@
 from __future__ import annotations
 
+import calendar
 import csv
+import hashlib
+import json
 import logging
+import os
+import random
 import re
+import threading
 import time
 import zipfile
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
 from datetime import date, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, Optional, TypeVar
 from urllib.parse import urljoin
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from ..config import settings
 
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+    import msvcrt
+
 _filename = Path(__file__).stem
 log = logging.getLogger(_filename)
 
+T = TypeVar("T")
+
 
 @dataclass(frozen=True)
 class ExtractResult:
     file_date: date
     url: str
     path: Path
+    sha256: Optional[str] = None
+    # false when the content equals the version last marked as processed
+    changed: bool = True
+
+
+def _meta_path(path: Path) -> Path:
+    return path.with_name(path.name + ".meta.json")
+
+
+def _tmp_path(path: Path) -> Path:
+    # private to this process and thread; concurrent writers of one target never share a tmp file
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _read_meta(path: Path) -> dict:
+    meta_path = _meta_path(path)
+    if not meta_path.exists():
+        return {}
+    try:
+        return json.loads(meta_path.read_text(encoding="utf-8"))
+    except Exception:
+        log.warning("cache meta unreadable | path=%s", meta_path.as_posix())
+        return {}
+
+
+def _write_meta(path: Path, meta: dict) -> None:
+    meta_path = _meta_path(path)
+    tmp_path = _tmp_path(meta_path)
+    tmp_path.write_text(json.dumps(meta, indent=2, sort_keys=True), encoding="utf-8")
+    tmp_path.replace(meta_path)
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _with_content_hash(ex: ExtractResult) -> ExtractResult:
+    # sha256 is cached in the sidecar and trusted while size/mtime match
+    st = ex.path.stat()
+    meta = _read_meta(ex.path)
+    if meta.get("sha256") and meta.get("size") == st.st_size and meta.get("mtime_ns") == st.st_mtime_ns:
+        sha = meta["sha256"]
+    else:
+        sha = _file_sha256(ex.path)
+        meta.update({"sha256": sha, "size": st.st_size, "mtime_ns": st.st_mtime_ns})
+        _write_meta(ex.path, meta)
+    return replace(ex, sha256=sha, changed=sha != meta.get("processed_sha256"))
+
+
+def local_extract(d: date, path: Path) -> ExtractResult:
+    # extract result for a csv already on disk (offline runs); no network access
+    return _with_content_hash(ExtractResult(file_date=d, url=path.resolve().as_uri(), path=path))
+
+
+# remember that this content went through the whole pipeline; unchanged re-downloads are then skipped
+def mark_processed(ex: ExtractResult) -> None:
+    if not ex.sha256:
+        return
+    meta = _read_meta(ex.path)
+    meta["processed_sha256"] = ex.sha256
+    # size of the processed version: lets intraday refreshes detect a pure append
+    meta["processed_size"] = meta["size"] if meta.get("sha256") == ex.sha256 and meta.get("size") else ex.path.stat().st_size
+    meta["processed_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    _write_meta(ex.path, meta)
+
+
+def processed_version(path: Path) -> Optional[tuple[str, int]]:
+    # (sha256, size) of the version last marked processed, if both are known
+    meta = _read_meta(path)
+    if meta.get("processed_sha256") and meta.get("processed_size"):
+        return meta["processed_sha256"], int(meta["processed_size"])
+    return None
+
+
+def clear_processed() -> int:
+    # forget every processed marker of the raw cache (schemas dropped or state reset); the
+    # cached files stay, the next run loads them again. returns the number of sidecars touched
+    root = Path(settings.data_dir) / "raw" / "inpe" / "focos"
+    n = 0
+    for meta_path in root.rglob("*.meta.json") if root.exists() else ():
+        path = meta_path.with_name(meta_path.name[: -len(".meta.json")])
+        meta = _read_meta(path)
+        kept = {k: v for k, v in meta.items() if not k.startswith("processed_")}
+        if kept != meta:
+            _write_meta(path, kept)
+            n += 1
+    log.info("processed markers cleared | files=%s", n)
+    return n
 
 
 _MONTHLY_CANDIDATES = [
@@ -49,22 +158,190 @@ def _build_monthly_urls(d: date) -> list[str]:
     return [urljoin(base, pattern.format(ym=ym)) for pattern in _MONTHLY_CANDIDATES]
 
 
+def _part_path(path: Path) -> Path:
+    return path.with_name(path.name + ".part")
+
+
+_path_locks: dict[str, threading.Lock] = {}
+_path_locks_guard = threading.Lock()
+
+
+def _path_lock(path: Path) -> threading.Lock:
+    with _path_locks_guard:
+        return _path_locks.setdefault(path.resolve().as_posix(), threading.Lock())
+
+
+@contextmanager
+def _exclusive(path: Path) -> Iterator[None]:
+    # one writer per target across threads (in-process lock) and processes (os lock on a
+    # <target>.lock file); others wait and usually find the finished file
+    with _path_lock(path):
+        lock_path = path.with_name(path.name + ".lock")
+        with lock_path.open("a+b") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+                else:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _if_range(meta: dict) -> Optional[str]:
+    # validator of the version a .part was started from; weak etags are not allowed in If-Range
+    etag = meta.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return meta.get("last_modified")
+
+
+def _discard_part(part_path: Path) -> None:
+    part_path.unlink(missing_ok=True)
+    _meta_path(part_path).unlink(missing_ok=True)
+
+
+def _expected_size(r: requests.Response, offset: int) -> Optional[int]:
+    # full size of the resource, or None when the server does not say (or the body is re-encoded)
+    if r.headers.get("Content-Encoding", "identity") != "identity":
+        return None
+    content_range = r.headers.get("Content-Range", "")
+    if r.status_code == 206 and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+    length = r.headers.get("Content-Length")
+    return offset + int(length) if length and length.isdigit() else None
+
+
+def _stream_to_file(r: requests.Response, tmp_path: Path, *, offset: int = 0, h=None) -> int:
+    mode = "ab" if offset else "wb"
+    with tmp_path.open(mode) as handle:
+        for chunk in r.iter_content(chunk_size=1024 * 1024):
+            if chunk:
+                handle.write(chunk)
+                if h is not None:
+                    h.update(chunk)
+        handle.flush()
+        os.fsync(handle.fileno())
+    return tmp_path.stat().st_size
+
+
+def _check_size(url: str, written: int, expected: Optional[int]) -> None:
+    # a short body is a broken transfer; raised as ConnectionError so _with_retry retries it
+    if written == 0:
+        raise requests.ConnectionError(f"empty download | url={url}")
+    if expected is not None and written != expected:
+        raise requests.ConnectionError(f"incomplete download | url={url} | size={written} | expected={expected}")
+
+
+def _cache_valid(path: Path) -> bool:
+    # files only appear through an atomic rename; the sidecar size also catches
+    # files truncated by older, non-atomic versions of this module
+    if not path.exists():
+        return False
+    size = path.stat().st_size
+    if size == 0:
+        return False
+    expected = _read_meta(path).get("size")
+    if expected is not None and expected != size:
+        log.warning("cache size mismatch | path=%s | size=%s | expected=%s", path.as_posix(), size, expected)
+        return False
+    if path.suffix == ".zip" and not zipfile.is_zipfile(path):
+        log.warning("cache zip invalid | path=%s", path.as_posix())
+        return False
+    return True
+
+
 def _download_file(
     url: str,
     out_path: Path,
     *,
     timeout: int,
     session: requests.Session,
+    force: bool = False,
 ) -> bool:
-    r = session.get(url, timeout=timeout, stream=True)
-    if r.status_code == 404:
-        return False
-    r.raise_for_status()
-
-    with out_path.open("wb") as handle:
-        for chunk in r.iter_content(chunk_size=1024 * 1024):
-            if chunk:
-                handle.write(chunk)
+    # stream into <file>.part and rename when complete; a leftover .part from an interrupted
+    # run is resumed with an HTTP Range request, guarded by If-Range so content republished
+    # upstream restarts the download instead of being spliced onto the old prefix
+    with _exclusive(out_path):
+        if not force and _cache_valid(out_path):
+            # another writer finished it while this one waited
+            return True
+        part_path = _part_path(out_path)
+        if force:
+            _discard_part(part_path)
+        return _download_part(url, out_path, part_path, timeout=timeout, session=session)
+
+
+def _download_part(url: str, out_path: Path, part_path: Path, *, timeout: int, session: requests.Session) -> bool:
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    validator = _if_range(_read_meta(part_path)) if offset else None
+    if offset and validator is None:
+        log.info("download restart | no validator for partial file | url=%s | offset=%s", url, offset)
+        _discard_part(part_path)
+        offset = 0
+    headers = {"Range": f"bytes={offset}-", "If-Range": validator} if offset else {}
+
+    with session.get(url, timeout=timeout, stream=True, headers=headers) as r:
+        if r.status_code == 404:
+            return False
+        if r.status_code == 416 and offset:
+            # part is stale or already complete; start over without Range (connection released first)
+            log.info("download range rejected | url=%s | offset=%s", url, offset)
+            r.close()
+            _discard_part(part_path)
+            return _download_part(url, out_path, part_path, timeout=timeout, session=session)
+        r.raise_for_status()
+
+        if offset and r.status_code != 206:
+            # 200: the resource changed since the part was started (or ranges are not supported)
+            log.info("download range ignored | url=%s | offset=%s | status=%s", url, offset, r.status_code)
+            offset = 0
+        elif offset:
+            log.info("download resume | url=%s | offset=%s", url, offset)
+        if not offset:
+            # validators of the version being written, for a later If-Range resume
+            _write_meta(part_path, {"url": url, "etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")})
+
+        expected = _expected_size(r, offset)
+        written = _stream_to_file(r, part_path, offset=offset)
+        _check_size(url, written, expected)
+
+    if out_path.suffix == ".zip":
+        try:
+            with zipfile.ZipFile(part_path) as zf:
+                bad = zf.testzip()
+        except zipfile.BadZipFile as exc:
+            _discard_part(part_path)
+            raise requests.ConnectionError(f"corrupt zip | url={url} | err={exc}") from exc
+        if bad is not None:
+            _discard_part(part_path)
+            raise requests.ConnectionError(f"corrupt zip | url={url} | member={bad}")
+
+    part_meta = _read_meta(part_path)
+    part_path.replace(out_path)
+    _meta_path(part_path).unlink(missing_ok=True)
+    st = out_path.stat()
+    _write_meta(
+        out_path,
+        {
+            "url": url,
+            "etag": part_meta.get("etag"),
+            "last_modified": part_meta.get("last_modified"),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+    )
     return True
 
 
@@ -74,12 +351,14 @@ def _extract_zip_to_csv(zip_path: Path, csv_path: Path) -> None:
         if not csv_names:
             raise FileNotFoundError(f"no csv found in zip: {zip_path}")
         name = csv_names[0]
-        with zf.open(name) as src, csv_path.open("wb") as dst:
+        tmp_path = _tmp_path(csv_path)
+        with zf.open(name) as src, tmp_path.open("wb") as dst:
             while True:
                 data = src.read(1024 * 1024)
                 if not data:
                     break
                 dst.write(data)
+        tmp_path.replace(csv_path)
 
 
 def _detect_dialect(sample: str) -> csv.Dialect:
@@ -131,29 +410,160 @@ def _extract_date(value: str) -> Optional[date]:
     return None
 
 
-def _filter_monthly_to_daily(monthly_csv: Path, d: date, out_path: Path) -> int:
-    rows = 0
-    with monthly_csv.open("r", newline="", encoding="utf-8-sig", errors="replace") as src:
-        sample = src.read(4096)
-        src.seek(0)
-        dialect = _detect_dialect(sample)
-        reader = csv.reader(src, dialect)
-        header = next(reader)
-        date_idx = _find_date_col(header)
-
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        with out_path.open("w", newline="", encoding="utf-8") as dst:
-            writer = csv.writer(dst, dialect)
-            writer.writerow(header)
+def _month_days(month_start: date) -> list[date]:
+    n_days = calendar.monthrange(month_start.year, month_start.month)[1]
+    return [month_start + timedelta(days=i) for i in range(n_days)]
+
+
+def _daily_dir() -> Path:
+    return Path(settings.data_dir) / "raw" / "inpe" / "focos" / "diario_brasil"
+
+
+def _split_manifest_path(monthly_csv: Path) -> Path:
+    return monthly_csv.with_suffix(".split.json")
+
+
+def _source_fingerprint(monthly_csv: Path) -> dict:
+    st = monthly_csv.stat()
+    return {"source_size": st.st_size, "source_mtime_ns": st.st_mtime_ns}
+
+
+def _read_split_manifest(monthly_csv: Path) -> Optional[dict]:
+    path = _split_manifest_path(monthly_csv)
+    if not path.exists():
+        return None
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        log.warning("split manifest unreadable | path=%s", path.as_posix())
+        return None
+    if {k: manifest.get(k) for k in ("source_size", "source_mtime_ns")} != _source_fingerprint(monthly_csv):
+        log.info("split manifest stale | path=%s", path.as_posix())
+        return None
+    return manifest
+
+
+def _meta_source(meta: dict) -> Optional[str]:
+    # "daily" (downloaded directly) or "monthly" (split); sidecars from before the source
+    # field only exist for direct downloads
+    return meta.get("source") or ("daily" if meta.get("url") else None)
+
+
+# one split per monthly file at a time in this process; concurrent fetch threads re-splitting
+# a failed month wait for the first one and then find its manifest
+_split_locks: dict[str, threading.Lock] = {}
+_split_locks_guard = threading.Lock()
+
+
+def _split_lock(monthly_csv: Path) -> threading.Lock:
+    with _split_locks_guard:
+        return _split_locks.setdefault(monthly_csv.resolve().as_posix(), threading.Lock())
+
+
+def _split_monthly_to_daily(monthly_csv: Path, month_start: date, out_dir: Path) -> dict[date, int]:
+    with _split_lock(monthly_csv):
+        return _split_monthly_to_daily_locked(monthly_csv, month_start, out_dir)
+
+
+def _split_monthly_to_daily_locked(monthly_csv: Path, month_start: date, out_dir: Path) -> dict[date, int]:
+    # one streaming pass over the monthly csv, writing the daily files of the days it holds.
+    # days absent from it get no file (the daily source is tried instead), and daily files
+    # downloaded directly are never overwritten
+    t0 = time.perf_counter()
+    days = set(_month_days(month_start))
+    counts: dict[date, int] = {}
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    handles = {}
+    writers = {}
+    kept: set[date] = set()
+    try:
+        with monthly_csv.open("r", newline="", encoding="utf-8-sig", errors="replace") as src:
+            sample = src.read(4096)
+            src.seek(0)
+            dialect = _detect_dialect(sample)
+            reader = csv.reader(src, dialect)
+            header = next(reader)
+            date_idx = _find_date_col(header)
+
             for row in reader:
                 if date_idx >= len(row):
                     continue
                 day = _extract_date(row[date_idx])
-                if day == d:
-                    writer.writerow(row)
-                    rows += 1
+                if day not in days:
+                    continue
+                counts[day] = counts.get(day, 0) + 1
+                writer = writers.get(day)
+                if writer is None:
+                    if day in kept:
+                        continue
+                    out_path = out_dir / f"{day.isoformat()}.csv"
+                    if out_path.exists() and _meta_source(_read_meta(out_path)) == "daily":
+                        kept.add(day)
+                        continue
+                    # write to tmp files and rename at the end; a crash never leaves partial days
+                    handles[day] = _tmp_path(out_path).open("w", newline="", encoding="utf-8")
+                    writer = writers[day] = csv.writer(handles[day], dialect)
+                    writer.writerow(header)
+                writer.writerow(row)
+    except BaseException:
+        for d, handle in handles.items():
+            handle.close()
+            _tmp_path(out_dir / f"{d.isoformat()}.csv").unlink(missing_ok=True)
+        raise
+    for handle in handles.values():
+        handle.close()
+
+    for d in sorted(writers):
+        out_path = out_dir / f"{d.isoformat()}.csv"
+        _tmp_path(out_path).replace(out_path)
+        # the sidecar follows the new content; processed_* stay, so unchanged days remain unchanged
+        meta = {k: v for k, v in _read_meta(out_path).items() if k.startswith("processed_")}
+        st = out_path.stat()
+        meta.update({"source": "monthly", "monthly_csv": monthly_csv.as_posix(), "size": st.st_size, "mtime_ns": st.st_mtime_ns})
+        _write_meta(out_path, meta)
+    if kept:
+        log.info("monthly split kept daily files | month=%s | days=%s", month_start.strftime("%Y-%m"), [d.isoformat() for d in sorted(kept)])
+
+    manifest = {
+        "month": month_start.strftime("%Y-%m"),
+        "source": monthly_csv.as_posix(),
+        **_source_fingerprint(monthly_csv),
+        "days": {d.isoformat(): counts[d] for d in sorted(counts)},
+        "completed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    manifest_path = _split_manifest_path(monthly_csv)
+    tmp_path = _tmp_path(manifest_path)
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    tmp_path.replace(manifest_path)
 
-    return rows
+    log.info(
+        "monthly split ok | month=%s | days=%s | rows=%s | dt=%.2fs",
+        manifest["month"],
+        len(counts),
+        sum(counts.values()),
+        time.perf_counter() - t0,
+    )
+    return counts
+
+
+def _daily_from_monthly(monthly_csv: Path, d: date) -> tuple[Path, int]:
+    # daily file for d, splitting the whole month once; later days are pure cache hits.
+    # a day the monthly file does not hold raises FileNotFoundError
+    out_path = _daily_dir() / f"{d.isoformat()}.csv"
+    manifest = _read_split_manifest(monthly_csv)
+    if manifest is not None and d.isoformat() in manifest.get("days", {}) and _cache_valid(out_path):
+        rows = int(manifest["days"][d.isoformat()])
+        log.info("monthly split cache hit | date=%s | rows=%s | path=%s", d.isoformat(), rows, out_path.as_posix())
+        return out_path, rows
+
+    if manifest is not None and d.isoformat() not in manifest.get("days", {}):
+        counts = manifest.get("days", {})
+    else:
+        counts = {k.isoformat(): n for k, n in _split_monthly_to_daily(monthly_csv, d.replace(day=1), _daily_dir()).items()}
+    if d.isoformat() not in counts:
+        raise FileNotFoundError(f"monthly source has no rows for {d.isoformat()}: {monthly_csv}")
+    return out_path, int(counts[d.isoformat()])
 
 
 def _download_monthly_csv(
@@ -170,11 +580,10 @@ def _download_monthly_csv(
     csv_path = out_dir / f"{month_key}.csv"
     zip_path = out_dir / f"{month_key}.zip"
 
-    if csv_path.exists() and not force:
+    if not force and _cache_valid(csv_path):
         size = csv_path.stat().st_size
-        if size > 0:
-            log.info("monthly cache hit | month=%s | size_bytes=%s | path=%s", month_key, size, csv_path.as_posix())
-            return csv_path, "cache"
+        log.info("monthly cache hit | month=%s | size_bytes=%s | path=%s", month_key, size, csv_path.as_posix())
+        return csv_path, "cache"
 
     urls = _build_monthly_urls(d)
     for url in urls:
@@ -183,16 +592,15 @@ def _download_monthly_csv(
         else:
             target_path = csv_path
 
-        if target_path.exists() and not force:
+        if not force and _cache_valid(target_path):
             size = target_path.stat().st_size
-            if size > 0:
-                if target_path.suffix == ".zip" and not csv_path.exists():
-                    _extract_zip_to_csv(zip_path, csv_path)
-                log.info("monthly cache hit | month=%s | size_bytes=%s | path=%s", month_key, size, target_path.as_posix())
-                return csv_path if csv_path.exists() else target_path, url
+            if target_path.suffix == ".zip" and not csv_path.exists():
+                _extract_zip_to_csv(zip_path, csv_path)
+            log.info("monthly cache hit | month=%s | size_bytes=%s | path=%s", month_key, size, target_path.as_posix())
+            return csv_path if csv_path.exists() else target_path, url
 
         log.info("monthly download start | month=%s | url=%s", month_key, url)
-        ok = _download_file(url, target_path, timeout=timeout, session=session)
+        ok = _download_file(url, target_path, timeout=timeout, session=session, force=force)
         if not ok:
             log.info("monthly not found | url=%s", url)
             continue
@@ -222,9 +630,11 @@ def _download_daily_csv(
     out_dir.mkdir(parents=True, exist_ok=True)
     out_path = out_dir / f"{d.isoformat()}.csv"
 
-    if out_path.exists() and not force:
+    headers: dict[str, str] = {}
+    if not force and _cache_valid(out_path):
         size = out_path.stat().st_size
-        if size > 0:
+        # recent files are republished by INPE during the day; older ones are immutable
+        if d < date.today() - timedelta(days=settings.inpe_revalidate_days):
             log.info(
                 "extract cache hit | date=%s | size_bytes=%s | path=%s",
                 d.isoformat(),
@@ -233,18 +643,53 @@ def _download_daily_csv(
             )
             return ExtractResult(file_date=d, url=url, path=out_path)
 
+        meta = _read_meta(out_path)
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
     t0 = time.perf_counter()
-    log.info("extract download start | date=%s", d.isoformat())
+    log.info("extract download start | date=%s | conditional=%s", d.isoformat(), bool(headers))
 
-    r = session.get(url, timeout=timeout)
-    if r.status_code == 404:
-        raise requests.HTTPError("daily not found", response=r)
-    r.raise_for_status()
+    # closed on every exit: watch/daemon poll with one session, and an open streamed
+    # response keeps its pooled connection checked out
+    with session.get(url, timeout=timeout, headers=headers, stream=True) as r:
+        if r.status_code == 304:
+            log.info("extract not modified | date=%s | dt=%.2fs | path=%s", d.isoformat(), time.perf_counter() - t0, out_path.as_posix())
+            return ExtractResult(file_date=d, url=url, path=out_path)
+        if r.status_code == 404:
+            raise requests.HTTPError("daily not found", response=r)
+        r.raise_for_status()
 
-    out_path.write_bytes(r.content)
-    size = out_path.stat().st_size
+        # stream to a per-process tmp file, verify, then rename over the cached copy
+        tmp_path = _tmp_path(out_path)
+        h = hashlib.sha256()
+        try:
+            size = _stream_to_file(r, tmp_path, h=h)
+            _check_size(url, size, _expected_size(r, 0))
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+    tmp_path.replace(out_path)
     dt = time.perf_counter() - t0
 
+    meta = _read_meta(out_path)
+    st = out_path.stat()
+    meta.update(
+        {
+            "url": url,
+            "source": "daily",
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "sha256": h.hexdigest(),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+    )
+    _write_meta(out_path, meta)
+
     log.info(
         "extract download ok | date=%s | dt=%.2fs | size_bytes=%s | path=%s",
         d.isoformat(),
@@ -263,7 +708,20 @@ def download_daily_csv(
     force: bool = False,
     session: Optional[requests.Session] = None,
 ) -> ExtractResult:
-    sess = session or requests.Session()
+    ex = _resolve_daily_csv(d, timeout=timeout, force=force, session=session or requests.Session())
+    ex = _with_content_hash(ex)
+    log.info("extract content | date=%s | sha256=%s | changed=%s", d.isoformat(), ex.sha256, ex.changed)
+    return ex
+
+
+def _resolve_daily_csv(
+    d: date,
+    *,
+    timeout: int,
+    force: bool,
+    session: requests.Session,
+) -> ExtractResult:
+    sess = session
 
     cutoff = date.today() - timedelta(days=settings.inpe_retention_days)
     try_monthly_first = d <= cutoff
@@ -273,8 +731,7 @@ def download_daily_csv(
             monthly_csv, monthly_url = _download_monthly_csv(
                 d, timeout=timeout, force=force, session=sess
             )
-            out_path = Path(settings.data_dir) / "raw" / "inpe" / "focos" / "diario_brasil" / f"{d.isoformat()}.csv"
-            rows = _filter_monthly_to_daily(monthly_csv, d, out_path)
+            out_path, rows = _daily_from_monthly(monthly_csv, d)
             log.info(
                 "extract source=monthly | date=%s | monthly_path=%s | rows=%s | path=%s",
                 d.isoformat(),
@@ -299,8 +756,7 @@ def download_daily_csv(
             raise
 
     monthly_csv, monthly_url = _download_monthly_csv(d, timeout=timeout, force=force, session=sess)
-    out_path = Path(settings.data_dir) / "raw" / "inpe" / "focos" / "diario_brasil" / f"{d.isoformat()}.csv"
-    rows = _filter_monthly_to_daily(monthly_csv, d, out_path)
+    out_path, rows = _daily_from_monthly(monthly_csv, d)
     log.info(
         "extract source=monthly | date=%s | monthly_path=%s | rows=%s | path=%s",
         d.isoformat(),
@@ -309,3 +765,159 @@ def download_daily_csv(
         out_path.as_posix(),
     )
     return ExtractResult(file_date=d, url=monthly_url, path=out_path)
+
+
+def _make_session(pool_size: int) -> requests.Session:
+    # one keep-alive pool shared by all fetch threads
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(pool_size, 1))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return False
+
+
+def _with_retry(fn: Callable[[], T], *, retries: int, base_delay: float, label: str) -> T:
+    # exponential backoff with full jitter; 404s and other client errors are not retried
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as exc:
+            attempt += 1
+            if attempt > retries or not _is_retryable(exc):
+                raise
+            delay = random.uniform(0, base_delay * (2 ** (attempt - 1)))
+            log.warning("fetch retry | %s | attempt=%s/%s | sleep=%.2fs | err=%s", label, attempt, retries, delay, exc)
+            time.sleep(delay)
+
+
+@dataclass(frozen=True)
+class FetchPlan:
+    monthly: list[date]
+    daily: list[date]
+    monthly_days: dict[date, list[date]]
+
+
+def plan_range(start: date, end: date) -> FetchPlan:
+    # days older than the retention window come from monthly files, the rest from daily files
+    cutoff = date.today() - timedelta(days=settings.inpe_retention_days)
+    monthly_days: dict[date, list[date]] = {}
+    daily: list[date] = []
+    d = start
+    while d <= end:
+        if d <= cutoff:
+            monthly_days.setdefault(d.replace(day=1), []).append(d)
+        else:
+            daily.append(d)
+        d += timedelta(days=1)
+    return FetchPlan(monthly=sorted(monthly_days), daily=daily, monthly_days=monthly_days)
+
+
+def _fetch_month(month_start: date, *, timeout: int, force: bool, session: requests.Session) -> None:
+    monthly_csv, _ = _download_monthly_csv(month_start, timeout=timeout, force=force, session=session)
+    if force or _read_split_manifest(monthly_csv) is None:
+        _split_monthly_to_daily(monthly_csv, month_start, _daily_dir())
+
+
+# download every file needed for [start, end] concurrently
+def fetch_range(
+    start: date,
+    end: date,
+    *,
+    concurrency: Optional[int] = None,
+    retries: Optional[int] = None,
+    timeout: int = 60,
+    force: bool = False,
+    base_delay: float = 1.0,
+) -> dict[date, ExtractResult | Exception]:
+    if start > end:
+        raise ValueError("start date must be <= end date")
+    concurrency = concurrency or settings.download_concurrency
+    retries = settings.download_retries if retries is None else retries
+
+    t0 = time.perf_counter()
+    plan = plan_range(start, end)
+    log.info(
+        "fetch range start | start=%s | end=%s | months=%s | daily=%s | concurrency=%s",
+        start.isoformat(),
+        end.isoformat(),
+        len(plan.monthly),
+        len(plan.daily),
+        concurrency,
+    )
+
+    results: dict[date, ExtractResult | Exception] = {}
+    session = _make_session(concurrency)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="fetch") as pool:
+            # phase 1: monthly files, each split once into its daily files
+            month_futs = {
+                pool.submit(
+                    _with_retry,
+                    lambda m=m: _fetch_month(m, timeout=timeout, force=force, session=session),
+                    retries=retries,
+                    base_delay=base_delay,
+                    label=f"month={m.strftime('%Y-%m')}",
+                ): m
+                for m in plan.monthly
+            }
+            month_failed: set[date] = set()
+            for fut in as_completed(month_futs):
+                try:
+                    fut.result()
+                except Exception as exc:
+                    log.warning("fetch month failed | month=%s | err=%s", month_futs[fut].strftime("%Y-%m"), exc)
+                    month_failed.add(month_futs[fut])
+
+            # phase 2: per-day resolution; monthly days are split-cache hits, the rest
+            # (and months that failed) go through the daily/monthly fallback chain
+            day_futs = {}
+            for m, days in plan.monthly_days.items():
+                for d in days:
+                    day_force = force and m in month_failed
+                    day_futs[
+                        pool.submit(
+                            _with_retry,
+                            lambda d=d, f=day_force: download_daily_csv(d, timeout=timeout, force=f, session=session),
+                            retries=retries,
+                            base_delay=base_delay,
+                            label=f"date={d.isoformat()}",
+                        )
+                    ] = d
+            for d in plan.daily:
+                day_futs[
+                    pool.submit(
+                        _with_retry,
+                        lambda d=d: download_daily_csv(d, timeout=timeout, force=force, session=session),
+                        retries=retries,
+                        base_delay=base_delay,
+                        label=f"date={d.isoformat()}",
+                    )
+                ] = d
+
+            for fut in as_completed(day_futs):
+                d = day_futs[fut]
+                try:
+                    results[d] = fut.result()
+                except Exception as exc:
+                    log.error("fetch day failed | date=%s | err=%s", d.isoformat(), exc)
+                    results[d] = exc
+    finally:
+        session.close()
+
+    n_fail = sum(1 for v in results.values() if isinstance(v, Exception))
+    log.info(
+        "fetch range done | days=%s | failed=%s | dt=%.2fs",
+        len(results),
+        n_fail,
+        time.perf_counter() - t0,
+    )
+    return dict(sorted(results.items()))
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+import psycopg
+import requests
+
+from .config import conn_str, settings
+from .enrich_runner import run_enrich
+from .extract.inpe_focos_diario import ExtractResult, download_daily_csv, mark_processed, processed_version
+from .load.postgis import LoadResult, day_loaded, load_batches
+from .locks import sql_stage_lock
+from .marts_runner import run_marts, run_marts_incremental
+from .transform.inpe_focos_diario import iter_inpe_csv
+
+_filename = Path(__file__).stem
+log = logging.getLogger(_filename)
+
+
+@dataclass(frozen=True)
+class DeltaPlan:
+    # append: the processed version is a byte prefix of the new file, only bytes from offset
+    # on are parsed. full: the file was rewritten; it is parsed whole and the loader's hash
+    # prefilter drops the rows already in raw.
+    mode: str
+    offset: int
+    reason: str
+
+
+@dataclass(frozen=True)
+class IncrementResult:
+    file_date: date
+    skipped: bool
+    plan: Optional[DeltaPlan] = None
+    delta_bytes: int = 0
+    load: Optional[LoadResult] = None
+    dt: float = 0.0
+
+
+def _prefix_sha256(path: Path, size: int) -> tuple[str, bytes]:
+    # sha256 of the first size bytes, plus the last byte of that prefix
+    h = hashlib.sha256()
+    last = b""
+    remaining = size
+    with path.open("rb") as handle:
+        while remaining > 0:
+            chunk = handle.read(min(1024 * 1024, remaining))
+            if not chunk:
+                break
+            h.update(chunk)
+            last = chunk[-1:]
+            remaining -= len(chunk)
+    return h.hexdigest(), last
+
+
+def plan_delta(ex: ExtractResult) -> DeltaPlan:
+    prev = processed_version(ex.path)
+    if prev is None:
+        return DeltaPlan("full", 0, "no processed version")
+    prev_sha, prev_size = prev
+    size = ex.path.stat().st_size
+    if size <= prev_size:
+        return DeltaPlan("full", 0, "file did not grow")
+    sha, last = _prefix_sha256(ex.path, prev_size)
+    if sha != prev_sha:
+        return DeltaPlan("full", 0, "processed prefix changed")
+    if last != b"\n":
+        return DeltaPlan("full", 0, "processed prefix ends mid-line")
+    return DeltaPlan("append", prev_size, "append")
+
+
+def _write_delta_csv(src: Path, offset: int, out: Path) -> int:
+    # header line of src followed by its bytes from offset on
+    with src.open("rb") as handle, out.open("wb") as dst:
+        dst.write(handle.readline())
+        handle.seek(offset)
+        n = 0
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            dst.write(chunk)
+            n += len(chunk)
+    return n
+
+
+def _db_now(conn: Optional[psycopg.Connection] = None) -> str:
+    # database clock, so "enriched since" compares against inserted_at on the same clock
+    if conn is not None:
+        return conn.execute("select clock_timestamp()").fetchone()[0].isoformat()
+    with psycopg.connect(conn_str()) as own:
+        return own.execute("select clock_timestamp()").fetchone()[0].isoformat()
+
+
+def run_increment(
+    file_date: date,
+    *,
+    engine: str | None = None,
+    load_method: str | None = None,
+    session: Optional[requests.Session] = None,
+    conn: Optional[psycopg.Connection] = None,
+) -> IncrementResult:
+    # one intraday refresh: revalidate the day's file, load only what was appended since the
+    # last processed version, enrich the new rows and upsert the touched mart groups.
+    # session and conn (autocommit) are reused when given.
+    t0 = time.perf_counter()
+    date_str = file_date.isoformat()
+
+    ex = download_daily_csv(file_date, session=session)
+    # processed markers describe the cache; after a reset or on another database the day is loaded whole
+    loaded = day_loaded(file_date, conn=conn)
+    if not ex.changed and loaded:
+        log.info("increment skip | content unchanged | date=%s", date_str)
+        return IncrementResult(file_date=file_date, skipped=True, dt=time.perf_counter() - t0)
+
+    plan = plan_delta(ex) if loaded else DeltaPlan("full", 0, "day not in database")
+    first = processed_version(ex.path) is None or not loaded
+    since = _db_now(conn)
+
+    delta_bytes = 0
+    with tempfile.TemporaryDirectory(prefix="etl-delta-") as tmp:
+        csv_path = ex.path
+        if plan.mode == "append":
+            csv_path = Path(tmp) / f"{date_str}.delta.csv"
+            delta_bytes = _write_delta_csv(ex.path, plan.offset, csv_path)
+        else:
+            delta_bytes = ex.path.stat().st_size
+        log.info(
+            "increment delta | date=%s | mode=%s | reason=%s | offset=%s | delta_bytes=%s",
+            date_str,
+            plan.mode,
+            plan.reason,
+            plan.offset,
+            delta_bytes,
+        )
+        load = load_batches(iter_inpe_csv(str(csv_path), file_date=file_date), method=load_method, conn=conn, prefilter=True)
+
+    if load.curated.total_inserted or first:
+        with sql_stage_lock(conn):
+            # enrich only inserts/updates rows not enriched yet
+            run_enrich(date_str, engine=engine, conn=conn)
+            if first:
+                run_marts(date_str, engine=engine, conn=conn)
+            else:
+                run_marts_incremental(date_str, since, engine=engine, conn=conn)
+    else:
+        log.info("increment enrich/marts skip | no new rows | date=%s", date_str)
+    mark_processed(ex)
+
+    dt = time.perf_counter() - t0
+    log.info(
+        "increment done | date=%s | mode=%s | rows_attempted=%s | rows_inserted=%s | dt=%.2fs",
+        date_str,
+        plan.mode,
+        load.attempted,
+        load.inserted,
+        dt,
+    )
+    return IncrementResult(file_date=file_date, skipped=False, plan=plan, delta_bytes=delta_bytes, load=load, dt=dt)
+
+
+def watch(
+    file_date: date | None = None,
+    *,
+    interval: int | None = None,
+    once: bool = False,
+    engine: str | None = None,
+    load_method: str | None = None,
+) -> None:
+    # poll the current (or given) day every interval seconds; when the calendar day rolls over,
+    # the previous day gets one last refresh before the new one starts
+    interval = interval or settings.watch_interval_s
+    session = requests.Session()
+    last_day: date | None = None
+
+    log.info("watch start | date=%s | interval=%ss", file_date.isoformat() if file_date else "today", interval)
+    while True:
+        day = file_date or date.today()
+        days = [last_day, day] if last_day is not None and last_day != day else [day]
+        for d in days:
+            try:
+                run_increment(d, engine=engine, load_method=load_method, session=session)
+            except Exception as exc:
+                if once:
+                    raise
+                if isinstance(exc, requests.HTTPError):
+                    # the new day's file is usually not published yet right after midnight
+                    log.warning("watch tick failed | date=%s | %s", d.isoformat(), exc)
+                else:
+                    log.exception("watch tick failed | date=%s", d.isoformat())
+        last_day = day
+        if once:
+            return
+        time.sleep(interval)
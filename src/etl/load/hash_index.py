@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections import Counter
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+import psycopg
+
+from ..config import settings
+from ..transform.inpe_focos_diario import RecordBatch
+
+_filename = Path(__file__).stem
+log = logging.getLogger(_filename)
+
+# md5 digests as fixed 16-byte numpy strings; sorted arrays support searchsorted lookups
+_DIGEST = np.dtype("S16")
+
+
+# per-day marker the index files are validated against: a random token, replaced whenever rows
+# of the day are removed (reset_file_dates), plus the oids of the fact tables, which change when
+# a schema is dropped or a table rebuilt. one primary key lookup instead of a count(*) per load
+MARKER_DDL = """
+CREATE TABLE IF NOT EXISTS raw.inpe_focos_day_token (
+  file_date date PRIMARY KEY,
+  token uuid NOT NULL DEFAULT gen_random_uuid(),
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+"""
+
+_MARKER_SQL = """
+select concat_ws(':', t.token::text,
+                 to_regclass('raw.inpe_focos')::oid,
+                 to_regclass('curated.inpe_focos')::oid,
+                 to_regclass('curated.inpe_focos_enriched')::oid)
+from raw.inpe_focos_day_token t
+where t.file_date = %s
+"""
+
+
+def index_dir() -> Path:
+    return Path(settings.data_dir) / "state" / "event_hashes"
+
+
+def index_path(d: date, enriched: bool = False) -> Path:
+    # one file per day and target table set (raw+curated, or raw+curated+enriched)
+    suffix = ".enriched.npz" if enriched else ".npz"
+    return index_dir() / f"{d.year:04d}" / f"{d.isoformat()}{suffix}"
+
+
+def drop_index(d: date) -> None:
+    for enriched in (False, True):
+        index_path(d, enriched).unlink(missing_ok=True)
+
+
+def invalidate(cur: psycopg.Cursor, start: date, end: date) -> None:
+    # rows of [start, end] are about to be removed: index files built before no longer apply
+    cur.execute("select to_regclass('raw.inpe_focos_day_token') is not null")
+    if cur.fetchone()[0]:
+        cur.execute("delete from raw.inpe_focos_day_token where file_date between %s and %s", (start, end))
+
+
+def batch_digests(batch: RecordBatch) -> np.ndarray:
+    return np.frombuffer(bytes.fromhex("".join(batch.event_hash)), dtype=_DIGEST)
+
+
+def _read(path: Path, marker: str) -> np.ndarray | None:
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            if str(npz["marker"]) != marker:
+                return None
+            arr = npz["digests"]
+    except FileNotFoundError:
+        return None
+    except Exception:
+        log.warning("hash index unreadable | path=%s", path.as_posix())
+        return None
+    return arr if arr.dtype == _DIGEST else None
+
+
+def _write(path: Path, digests: np.ndarray, marker: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("wb") as handle:
+        np.savez(handle, digests=digests, marker=np.array(marker))
+    tmp_path.replace(path)
+
+
+def _marker(cur: psycopg.Cursor, d: date) -> str:
+    cur.execute(_MARKER_SQL, (d,))
+    row = cur.fetchone()
+    if row is None:
+        cur.execute("insert into raw.inpe_focos_day_token (file_date) values (%s) on conflict do nothing", (d,))
+        cur.execute(_MARKER_SQL, (d,))
+        row = cur.fetchone()
+    return row[0]
+
+
+def _rebuild(cur: psycopg.Cursor, d: date, marker: str, enriched: bool) -> np.ndarray:
+    # hashes present in every target table; a row missing from one of them is sent again
+    t0 = time.perf_counter()
+    sql = """
+    select decode(r.event_hash, 'hex')
+    from raw.inpe_focos r
+    join curated.inpe_focos c on c.event_hash = r.event_hash and c.file_date = r.file_date
+    """
+    if enriched:
+        sql += "join curated.inpe_focos_enriched e on e.event_hash = r.event_hash and e.file_date = r.file_date\n"
+    cur.execute(sql + "where r.file_date = %s", (d,))
+    digests = np.sort(np.array([bytes(row[0]) for row in cur.fetchall()], dtype=_DIGEST))
+    _write(index_path(d, enriched), digests, marker)
+    log.info("hash index rebuilt | date=%s | enriched=%s | hashes=%s | dt=%.2fs", d.isoformat(), enriched, len(digests), time.perf_counter() - t0)
+    return digests
+
+
+class HashIndex:
+    # event hashes already in every target table (raw and curated, plus the enriched facts when
+    # the loader writes them), per file_date. the file is trusted while its marker matches the
+    # day's (see MARKER_DDL); otherwise it is rebuilt from the tables. new digests are merged
+    # into it only after the load committed.
+    # lookups use their own autocommit connection: they only need committed rows, and the
+    # loader's connection may be busy with COPY when a new file_date shows up.
+    def __init__(self, conninfo: str, enriched: bool = False) -> None:
+        self.conninfo = conninfo
+        self.enriched = enriched
+        self._conn: psycopg.Connection | None = None
+        self._known: dict[date, np.ndarray] = {}
+        self._markers: dict[date, str] = {}
+        self._sent: dict[date, list[np.ndarray]] = {}
+        self.rows: Counter = Counter()
+        self.skipped: Counter = Counter()
+
+    def _cursor(self) -> psycopg.Cursor:
+        if self._conn is None:
+            self._conn = psycopg.connect(self.conninfo, autocommit=True)
+        return self._conn.cursor()
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _load(self, d: date) -> np.ndarray:
+        known = self._known.get(d)
+        if known is None:
+            with self._cursor() as cur:
+                # marker first: a reset after this point leaves the file stale, never wrong
+                marker = _marker(cur, d)
+                known = _read(index_path(d, self.enriched), marker)
+                if known is None:
+                    known = _rebuild(cur, d, marker, self.enriched)
+            self._known[d] = known
+            self._markers[d] = marker
+        return known
+
+    def mask_new(self, batch: RecordBatch) -> np.ndarray:
+        digests = batch_digests(batch)
+        known = self._load(batch.file_date)
+        if len(known):
+            pos = np.searchsorted(known, digests)
+            pos[pos == len(known)] = 0
+            new = known[pos] != digests
+        else:
+            new = np.ones(len(digests), dtype=bool)
+        self._sent.setdefault(batch.file_date, []).append(digests[new])
+        self.rows[batch.file_date] += len(batch)
+        self.skipped[batch.file_date] += int(len(batch) - new.sum())
+        return new
+
+    def filter(self, batches: Iterable[RecordBatch]) -> Iterator[RecordBatch]:
+        for batch in batches:
+            new = self.mask_new(batch)
+            if new.all():
+                yield batch
+            elif new.any():
+                yield batch.take(new)
+
+    def commit(self) -> None:
+        # every sent row is in each target table now (inserted or conflicting), so the day's
+        # set is known ∪ sent, still valid under the marker read before the load
+        for d, parts in self._sent.items():
+            merged = np.unique(np.concatenate([self._known[d], *parts]))
+            _write(index_path(d, self.enriched), merged, self._markers[d])
+            self._known[d] = merged
+        self._sent.clear()
+
+    def log_skip_rate(self) -> None:
+        for d in sorted(self.rows):
+            rows = self.rows[d]
+            log.info(
+                "load prefilter | file_date=%s | rows=%s | skipped=%s | sent=%s | skip_rate=%.1f%%",
+                d.isoformat(),
+                rows,
+                self.skipped[d],
+                rows - self.skipped[d],
+                100.0 * self.skipped[d] / rows if rows else 0.0,
+            )
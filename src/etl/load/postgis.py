@@ -2,25 +2,54 @@ from __future__ import annotations
 
 import logging
 import time
-from dataclasses import dataclass
-from datetime import date
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from itertools import chain
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator, Optional
 
 import psycopg
 
-from ..config import settings
-from ..transform.inpe_focos_diario import Record
+from ..config import conn_str, settings
+from ..sql_runner import _apply_vars
+from ..transform.inpe_focos_diario import ROW_FIELDS, Record, RecordBatch, batches_from_records
+from ..transform.spatial import ENRICH_FIELDS, SpatialEngine, require_shapely, shared_engine
+from .hash_index import MARKER_DDL, HashIndex, invalidate
 
 _filename = Path(__file__).stem
 log = logging.getLogger(_filename)
 
 
+@dataclass(frozen=True)
+class TableLoadCounts:
+    inserted: dict[date, int] = field(default_factory=dict)
+    skipped: dict[date, int] = field(default_factory=dict)
+
+    @property
+    def total_inserted(self) -> int:
+        return sum(self.inserted.values())
+
+    @property
+    def total_skipped(self) -> int:
+        return sum(self.skipped.values())
+
+
 @dataclass(frozen=True)
 class LoadResult:
+    # inserted/attempted refer to raw.inpe_focos; per-table, per-file_date counts below
     inserted: int
     attempted: int
+    attempted_by_date: dict[date, int] = field(default_factory=dict)
+    raw: TableLoadCounts = field(default_factory=TableLoadCounts)
+    curated: TableLoadCounts = field(default_factory=TableLoadCounts)
+    # rows written already enriched (ENRICH_ENGINE=python); empty otherwise
+    enriched: TableLoadCounts = field(default_factory=TableLoadCounts)
+
 
+# fact tables range-partitioned by month on file_date
+FACT_TABLES = ("raw.inpe_focos", "curated.inpe_focos", "curated.inpe_focos_enriched")
 
 # schema and indexes for raw and curated tables
 DDL = """
@@ -29,8 +58,41 @@ CREATE EXTENSION IF NOT EXISTS postgis;
 CREATE SCHEMA IF NOT EXISTS raw;
 CREATE SCHEMA IF NOT EXISTS curated;
 
+-- create (if missing) the monthly partition of parent holding d; no-op for non-partitioned tables
+CREATE OR REPLACE FUNCTION curated.ensure_month_partition(parent regclass, d date, part_prefix text DEFAULT NULL)
+RETURNS text
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  month_start date := date_trunc('month', d)::date;
+  nsp text;
+  rel text;
+  kind "char";
+  part_name text;
+BEGIN
+  SELECT n.nspname, c.relname, c.relkind INTO nsp, rel, kind
+  FROM pg_class c
+  JOIN pg_namespace n ON n.oid = c.relnamespace
+  WHERE c.oid = parent;
+
+  IF kind <> 'p' THEN
+    RETURN NULL;
+  END IF;
+
+  part_name := coalesce(part_prefix, rel) || '_p' || to_char(month_start, 'YYYYMM');
+  IF to_regclass(format('%I.%I', nsp, part_name)) IS NULL THEN
+    PERFORM pg_advisory_xact_lock(hashtext(nsp || '.' || part_name));
+    EXECUTE format(
+      'CREATE TABLE IF NOT EXISTS %I.%I PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+      nsp, part_name, parent, month_start, (month_start + interval '1 month')::date
+    );
+  END IF;
+  RETURN format('%I.%I', nsp, part_name);
+END
+$$;
+
 CREATE TABLE IF NOT EXISTS raw.inpe_focos (
-  event_hash text PRIMARY KEY,
+  event_hash text NOT NULL,
   source text NOT NULL,
   file_date date NOT NULL,
   ingested_at timestamptz NOT NULL DEFAULT now(),
@@ -42,14 +104,15 @@ CREATE TABLE IF NOT EXISTS raw.inpe_focos (
   lat double precision NOT NULL,
   lon double precision NOT NULL,
   geom geometry(Point,4326),
-  props jsonb NOT NULL
-);
+  props jsonb NOT NULL,
+  PRIMARY KEY (event_hash, file_date)
+) PARTITION BY RANGE (file_date);
 
 CREATE INDEX IF NOT EXISTS idx_raw_inpe_focos_geom ON raw.inpe_focos USING gist(geom);
 CREATE INDEX IF NOT EXISTS idx_raw_inpe_focos_file_date ON raw.inpe_focos (file_date);
 
 CREATE TABLE IF NOT EXISTS curated.inpe_focos (
-  event_hash text PRIMARY KEY,
+  event_hash text NOT NULL,
   file_date date NOT NULL,
   view_ts text,
   satelite text,
@@ -59,46 +122,217 @@ CREATE TABLE IF NOT EXISTS curated.inpe_focos (
   lat double precision NOT NULL,
   lon double precision NOT NULL,
   geom geometry(Point,4326),
-  inserted_at timestamptz NOT NULL DEFAULT now()
-);
+  inserted_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (event_hash, file_date)
+) PARTITION BY RANGE (file_date);
 
 CREATE INDEX IF NOT EXISTS idx_curated_inpe_focos_geom ON curated.inpe_focos USING gist(geom);
 CREATE INDEX IF NOT EXISTS idx_curated_inpe_focos_file_date ON curated.inpe_focos (file_date);
 """
 
+# {key_col}/{key_val} add the optional compact event_key (see event_key_type)
 RAW_SQL = """
 INSERT INTO raw.inpe_focos (
-  event_hash, source, file_date, view_ts, satelite, municipio, estado, bioma,
+  event_hash{key_col}, source, file_date, view_ts, satelite, municipio, estado, bioma,
   lat, lon, geom, props
 )
 VALUES (
-  %(event_hash)s, %(source)s, %(file_date)s, %(view_ts)s, %(satelite)s, %(municipio)s, %(estado)s, %(bioma)s,
+  %(event_hash)s{key_val}, %(source)s, %(file_date)s, %(view_ts)s, %(satelite)s, %(municipio)s, %(estado)s, %(bioma)s,
   %(lat)s, %(lon)s,
   ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326),
   %(props)s::jsonb
 )
-ON CONFLICT (event_hash) DO NOTHING;
+ON CONFLICT DO NOTHING
+RETURNING file_date;
 """
 
 CURATED_SQL = """
 INSERT INTO curated.inpe_focos (
-  event_hash, file_date, view_ts, satelite, municipio, estado, bioma,
+  event_hash{key_col}, file_date, view_ts, satelite, municipio, estado, bioma,
   lat, lon, geom
 )
 VALUES (
-  %(event_hash)s, %(file_date)s, %(view_ts)s, %(satelite)s, %(municipio)s, %(estado)s, %(bioma)s,
+  %(event_hash)s{key_val}, %(file_date)s, %(view_ts)s, %(satelite)s, %(municipio)s, %(estado)s, %(bioma)s,
   %(lat)s, %(lon)s,
   ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326)
 )
-ON CONFLICT (event_hash) DO NOTHING;
+ON CONFLICT DO NOTHING
+RETURNING file_date;
 """
 
+LOAD_METHODS = ("executemany", "copy")
 
-def _conn_str() -> str:
-    return (
-        f"host={settings.db_host} port={settings.db_port} dbname={settings.db_name} "
-        f"user={settings.db_user} password={settings.db_password}"
-    )
+# session-private staging table; temp tables are never wal-logged
+STAGE_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS tmp_inpe_focos_stage (
+  event_hash text NOT NULL,
+  source text NOT NULL,
+  file_date date NOT NULL,
+  view_ts text,
+  satelite text,
+  municipio text,
+  estado text,
+  bioma text,
+  lat double precision NOT NULL,
+  lon double precision NOT NULL,
+  props text NOT NULL
+) ON COMMIT DROP;
+"""
+
+STAGE_COPY_SQL = """
+COPY tmp_inpe_focos_stage (
+  event_hash, source, file_date, view_ts, satelite, municipio, estado, bioma,
+  lat, lon, props
+) FROM STDIN (FORMAT BINARY)
+"""
+
+STAGE_TYPES = ["text", "text", "date", "text", "text", "text", "text", "text", "float8", "float8", "text"]
+
+# the cte returns inserted rows per file_date straight from the write
+RAW_FROM_STAGE_SQL = """
+WITH ins AS (
+INSERT INTO raw.inpe_focos (
+  event_hash{key_col}, source, file_date, view_ts, satelite, municipio, estado, bioma,
+  lat, lon, geom, props
+)
+SELECT
+  s.event_hash{key_val}, s.source, s.file_date, s.view_ts, s.satelite, s.municipio, s.estado, s.bioma,
+  s.lat, s.lon,
+  ST_SetSRID(ST_MakePoint(s.lon, s.lat), 4326),
+  s.props::jsonb
+FROM tmp_inpe_focos_stage s
+ON CONFLICT DO NOTHING
+RETURNING file_date
+)
+SELECT file_date, count(*)::int FROM ins GROUP BY file_date;
+"""
+
+CURATED_FROM_STAGE_SQL = """
+WITH ins AS (
+INSERT INTO curated.inpe_focos (
+  event_hash{key_col}, file_date, view_ts, satelite, municipio, estado, bioma,
+  lat, lon, geom
+)
+SELECT
+  s.event_hash{key_val}, s.file_date, s.view_ts, s.satelite, s.municipio, s.estado, s.bioma,
+  s.lat, s.lon,
+  ST_SetSRID(ST_MakePoint(s.lon, s.lat), 4326)
+FROM tmp_inpe_focos_stage s
+ON CONFLICT DO NOTHING
+RETURNING file_date
+)
+SELECT file_date, count(*)::int FROM ins GROUP BY file_date;
+"""
+
+# where point-in-polygon enrichment runs: "sql" (sql/enrich after the load) or "python"
+# (shapely STRtree in the loader, rows land in curated.inpe_focos_enriched already enriched)
+ENRICH_ENGINES = ("sql", "python")
+
+# table ddl of the enriched facts; loaded here only when the loader writes them itself
+ENRICH_SCHEMA_SQL = Path(__file__).resolve().parents[3] / "sql" / "enrich" / "10_enrich_schema.sql"
+
+# rows written enriched are marked checked, so the sql enrich pass leaves them alone.
+# the source bioma wins over the reference one, as in sql/enrich/20_enrich_focos.sql
+ENRICHED_SQL = """
+INSERT INTO curated.inpe_focos_enriched (
+  event_hash, file_date, view_ts, satelite, municipio, estado, bioma,
+  lat, lon, geom,
+  mun_cd_mun, mun_nm_mun, mun_uf, mun_area_km2,
+  cd_bioma, uc_id, cd_cnuc, nome_uc, terrai_cod, terrai_nom, etnia_nome,
+  bioma_checked, uc_checked, ti_checked
+)
+VALUES (
+  %(event_hash)s, %(file_date)s, %(view_ts)s, %(satelite)s, %(municipio)s, %(estado)s, COALESCE(%(bioma)s, %(ref_bioma)s),
+  %(lat)s, %(lon)s,
+  ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326),
+  %(mun_cd_mun)s, %(mun_nm_mun)s, %(mun_uf)s, %(mun_area_km2)s,
+  %(cd_bioma)s, %(uc_id)s, %(cd_cnuc)s, %(nome_uc)s, %(terrai_cod)s, %(terrai_nom)s, %(etnia_nome)s,
+  true, true, true
+)
+ON CONFLICT DO NOTHING
+RETURNING file_date;
+"""
+
+# attribution columns added to the staging table when the loader enriches
+STAGE_ENRICH_DDL = """
+ALTER TABLE tmp_inpe_focos_stage
+  ADD COLUMN IF NOT EXISTS mun_cd_mun text,
+  ADD COLUMN IF NOT EXISTS mun_nm_mun text,
+  ADD COLUMN IF NOT EXISTS mun_uf text,
+  ADD COLUMN IF NOT EXISTS mun_area_km2 double precision,
+  ADD COLUMN IF NOT EXISTS cd_bioma text,
+  ADD COLUMN IF NOT EXISTS ref_bioma text,
+  ADD COLUMN IF NOT EXISTS uc_id text,
+  ADD COLUMN IF NOT EXISTS cd_cnuc text,
+  ADD COLUMN IF NOT EXISTS nome_uc text,
+  ADD COLUMN IF NOT EXISTS terrai_cod text,
+  ADD COLUMN IF NOT EXISTS terrai_nom text,
+  ADD COLUMN IF NOT EXISTS etnia_nome text;
+"""
+
+STAGE_ENRICH_COPY_SQL = """
+COPY tmp_inpe_focos_stage (
+  event_hash, source, file_date, view_ts, satelite, municipio, estado, bioma,
+  lat, lon, props,
+  mun_cd_mun, mun_nm_mun, mun_uf, mun_area_km2,
+  cd_bioma, ref_bioma, uc_id, cd_cnuc, nome_uc, terrai_cod, terrai_nom, etnia_nome
+) FROM STDIN (FORMAT BINARY)
+"""
+
+STAGE_ENRICH_TYPES = STAGE_TYPES + ["text", "text", "text", "float8"] + ["text"] * 8
+
+ENRICHED_FROM_STAGE_SQL = """
+WITH ins AS (
+INSERT INTO curated.inpe_focos_enriched (
+  event_hash, file_date, view_ts, satelite, municipio, estado, bioma,
+  lat, lon, geom,
+  mun_cd_mun, mun_nm_mun, mun_uf, mun_area_km2,
+  cd_bioma, uc_id, cd_cnuc, nome_uc, terrai_cod, terrai_nom, etnia_nome,
+  bioma_checked, uc_checked, ti_checked
+)
+SELECT
+  s.event_hash, s.file_date, s.view_ts, s.satelite, s.municipio, s.estado, COALESCE(s.bioma, s.ref_bioma),
+  s.lat, s.lon,
+  ST_SetSRID(ST_MakePoint(s.lon, s.lat), 4326),
+  s.mun_cd_mun, s.mun_nm_mun, s.mun_uf, s.mun_area_km2,
+  s.cd_bioma, s.uc_id, s.cd_cnuc, s.nome_uc, s.terrai_cod, s.terrai_nom, s.etnia_nome,
+  true, true, true
+FROM tmp_inpe_focos_stage s
+ON CONFLICT DO NOTHING
+RETURNING file_date
+)
+SELECT file_date, count(*)::int FROM ins GROUP BY file_date;
+"""
+
+# optional compact key stored next to event_hash: the same md5, as uuid (128 bit) or its
+# first 64 bits as bigint. derived from the hex in sql so loaders and backfill always agree.
+EVENT_KEY_TYPES = ("uuid", "bigint")
+_EVENT_KEY_EXPR = {
+    "uuid": "({h})::uuid",
+    "bigint": "('x' || left({h}, 16))::bit(64)::bigint",
+}
+
+# tables that carry event_key; curated.inpe_focos_enriched stays keyed by event_hash
+EVENT_KEY_TABLES = ("raw.inpe_focos", "curated.inpe_focos")
+
+
+def event_key_type(kind: str | None = None) -> str | None:
+    kind = settings.event_key if kind is None else kind
+    if kind in ("", "off"):
+        return None
+    if kind not in EVENT_KEY_TYPES:
+        raise ValueError(f"invalid event key type: {kind} (expected one of {EVENT_KEY_TYPES} or off)")
+    return kind
+
+
+def event_key_expr(kind: str, hash_sql: str) -> str:
+    return _EVENT_KEY_EXPR[kind].format(h=hash_sql)
+
+
+def _with_event_key(template: str, kind: str | None, hash_sql: str) -> str:
+    if kind is None:
+        return template.format(key_col="", key_val="")
+    return template.format(key_col=", event_key", key_val=", " + event_key_expr(kind, hash_sql))
 
 
 def _conn_str_safe() -> str:
@@ -108,112 +342,552 @@ def _conn_str_safe() -> str:
     )
 
 
-# ensure database schemas and tables exist
-def ensure_db() -> None:
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _next_month(d: date) -> date:
+    return (d.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _is_partitioned(cur: psycopg.Cursor, table: str) -> bool | None:
+    cur.execute("select relkind::text from pg_class where oid = to_regclass(%s)", (table,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return row[0] == "p"
+
+
+def _event_key_column(cur: psycopg.Cursor, table: str) -> tuple[str, bool] | None:
+    # (type, not null) of table.event_key, None when the column does not exist
+    cur.execute(
+        """
+        select format_type(a.atttypid, a.atttypmod), a.attnotnull
+        from pg_attribute a
+        where a.attrelid = to_regclass(%s) and a.attname = 'event_key' and not a.attisdropped
+        """,
+        (table,),
+    )
+    row = cur.fetchone()
+    return (row[0], bool(row[1])) if row else None
+
+
+def _ensure_event_key(cur: psycopg.Cursor, table: str, kind: str | None) -> None:
+    col = _event_key_column(cur, table)
+    if kind is None:
+        if col and col[1]:
+            raise RuntimeError(f"{table}.event_key is the primary key; set EVENT_KEY={col[0]} to load")
+        return
+    if col is None:
+        # nullable column: catalog-only change; rows loaded before stay null until backfilled
+        cur.execute(f"alter table {table} add column if not exists event_key {kind}")
+        log.info("event key column added | table=%s | type=%s", table, kind)
+    elif col[0] != kind:
+        raise RuntimeError(f"{table}.event_key is {col[0]}, but EVENT_KEY={kind}")
+
+
+def ensure_partitions(cur: psycopg.Cursor, table: str, file_dates: Iterable[date]) -> list[str]:
+    months = sorted({_month_start(d) for d in file_dates})
+    created: list[str] = []
+    for month in months:
+        cur.execute("select curated.ensure_month_partition(%s::regclass, %s)", (table, month))
+        row = cur.fetchone()
+        if row and row[0]:
+            created.append(row[0])
+    return created
+
+
+@contextmanager
+def _connection(conn: Optional[psycopg.Connection] = None) -> Iterator[psycopg.Connection]:
+    # reuse a caller-owned connection, or open (and close) one for this call
+    if conn is not None:
+        yield conn
+        return
+    with psycopg.connect(conn_str()) as own:
+        yield own
+
+
+# ensure database schemas, tables and monthly partitions for file_dates exist; with enriched,
+# also curated.inpe_focos_enriched (sql/enrich/10_enrich_schema.sql)
+def ensure_db(file_dates: Iterable[date] = (), conn: Optional[psycopg.Connection] = None, enriched: bool = False) -> None:
     t0 = time.perf_counter()
     log.debug("ensure_db start | %s", _conn_str_safe())
 
-    with psycopg.connect(_conn_str()) as conn:
+    file_dates = list(file_dates)
+    with _connection(conn) as conn, conn.transaction():
         with conn.cursor() as cur:
+            # concurrent loaders would race on create-or-replace / create-if-not-exists
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext('etl.load.ensure_db'))")
             cur.execute(DDL)
-        conn.commit()
+            cur.execute(MARKER_DDL)
+            kind = event_key_type()
+            for table in EVENT_KEY_TABLES:
+                _ensure_event_key(cur, table, kind)
+            for table in ("raw.inpe_focos", "curated.inpe_focos"):
+                if not _is_partitioned(cur, table):
+                    log.warning(
+                        "ensure_db legacy layout | table=%s is not partitioned | run: python -m etl.app partitions --migrate",
+                        table,
+                    )
+                    continue
+                if file_dates:
+                    parts = ensure_partitions(cur, table, file_dates)
+                    log.debug("ensure_db partitions | table=%s | parts=%s", table, parts)
+            if enriched and file_dates:
+                schema_sql = ENRICH_SCHEMA_SQL.read_text(encoding="utf-8").lstrip("\ufeff")
+                cur.execute(_apply_vars(schema_sql, {"START": min(file_dates).isoformat(), "END": max(file_dates).isoformat()}))
 
     log.info("ensure_db ok | dt=%.2fs", time.perf_counter() - t0)
 
 
-def _chunks(rows: list[dict], size: int) -> Iterable[list[dict]]:
-    for i in range(0, len(rows), size):
-        yield rows[i : i + size]
+def day_loaded(file_date: date, conn: Optional[psycopg.Connection] = None) -> bool:
+    # true when raw and enriched facts both hold rows of file_date (missing tables count as empty)
+    with _connection(conn) as conn, conn.cursor() as cur:
+        cur.execute("select to_regclass('raw.inpe_focos') is not null and to_regclass('curated.inpe_focos_enriched') is not null")
+        if not cur.fetchone()[0]:
+            return False
+        cur.execute(
+            """
+            select exists (select 1 from raw.inpe_focos where file_date = %s)
+               and exists (select 1 from curated.inpe_focos_enriched where file_date = %s)
+            """,
+            (file_date, file_date),
+        )
+        return bool(cur.fetchone()[0])
+
+
+def _legacy_index_defs(cur: psycopg.Cursor, table: str) -> list[str]:
+    schema, name = table.split(".", 1)
+    cur.execute(
+        """
+        select i.indexdef
+        from pg_indexes i
+        join pg_class c on c.relname = i.indexname
+        join pg_namespace n on n.oid = c.relnamespace and n.nspname = i.schemaname
+        join pg_index x on x.indexrelid = c.oid
+        where i.schemaname = %s and i.tablename = %s and not x.indisprimary
+        """,
+        (schema, name),
+    )
+    return [row[0] for row in cur.fetchall()]
 
 
-def _count_raw_by_file_date(conn: psycopg.Connection, file_dates: list[date]) -> dict[date, int]:
-    if not file_dates:
-        return {}
+def migrate_to_partitioned(tables: Iterable[str] = FACT_TABLES) -> list[str]:
+    # rebuild legacy heap fact tables as monthly-partitioned tables, keeping rows and indexes.
+    # dependent views are dropped (cascade); re-apply them with validate_marts --apply-minimal.
+    t0 = time.perf_counter()
+    migrated: list[str] = []
 
-    sql = """
-    select file_date, count(*)::int as n
-    from raw.inpe_focos
-    where file_date = any(%s)
-    group by file_date
-    """
-    with conn.cursor() as cur:
-        cur.execute(sql, (file_dates,))
-        rows = cur.fetchall()
+    with psycopg.connect(conn_str()) as conn:
+        with conn.cursor() as cur:
+            cur.execute(DDL)
+            for table in tables:
+                state = _is_partitioned(cur, table)
+                if state is None or state:
+                    log.info("partition migrate skip | table=%s | exists=%s", table, state is not None)
+                    continue
+
+                schema, name = table.split(".", 1)
+                tmp_name = f"{name}_part"
+                index_defs = _legacy_index_defs(cur, table)
+
+                cur.execute(f"create table {schema}.{tmp_name} (like {table} including defaults) partition by range (file_date)")
+                cur.execute(f"alter table {schema}.{tmp_name} add primary key (event_hash, file_date)")
+
+                cur.execute(f"select min(file_date), max(file_date) from {table}")
+                lo, hi = cur.fetchone()
+                month = _month_start(lo) if lo else None
+                while month is not None and month <= hi:
+                    cur.execute(
+                        "select curated.ensure_month_partition(%s::regclass, %s, %s)",
+                        (f"{schema}.{tmp_name}", month, name),
+                    )
+                    month = _next_month(month)
+
+                cur.execute(f"insert into {schema}.{tmp_name} select * from {table}")
+                n_rows = cur.rowcount
+                cur.execute(f"drop table {table} cascade")
+                cur.execute(f"alter table {schema}.{tmp_name} rename to {name}")
+                cur.execute(f"alter index {schema}.{tmp_name}_pkey rename to {name}_pkey")
+                for index_def in index_defs:
+                    cur.execute(index_def.replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS", 1))
+
+                migrated.append(table)
+                log.info("partition migrate ok | table=%s | rows=%s | indexes=%s", table, n_rows, len(index_defs))
+        conn.commit()
+
+    log.info("partition migrate done | migrated=%s | dt=%.2fs", migrated, time.perf_counter() - t0)
+    return migrated
+
+
+def index_sizes(cur: psycopg.Cursor, table: str) -> dict[str, int]:
+    # bytes per index of table, summed over all partitions
+    cur.execute(
+        """
+        select i.indexrelid::regclass::text,
+               coalesce((select sum(pg_relation_size(t.relid)) from pg_partition_tree(i.indexrelid) t), 0)::bigint
+        from pg_index i
+        where i.indrelid = to_regclass(%s)
+        order by 1
+        """,
+        (table,),
+    )
+    return {name: int(size) for name, size in cur.fetchall()}
 
-    out: dict[date, int] = {d: 0 for d in file_dates}
-    for d, n in rows:
-        out[d] = int(n)
-    return out
+
+def _leaf_tables(cur: psycopg.Cursor, table: str) -> list[str]:
+    cur.execute(
+        "select relid::regclass::text from pg_partition_tree(to_regclass(%s)) where isleaf order by 1",
+        (table,),
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def migrate_event_key(
+    kind: str,
+    *,
+    backfill: bool = True,
+    swap_pk: bool = False,
+    tables: Iterable[str] = EVENT_KEY_TABLES,
+) -> dict[str, dict[str, int]]:
+    # dual-write migration to the compact key:
+    #   1. add event_key (loaders with EVENT_KEY set write it from then on)
+    #   2. backfill rows loaded before, one partition per transaction
+    #   3. unique (event_key, file_date) index; with swap_pk it becomes the primary key instead
+    #      and the text key index is dropped (event_hash stays as a plain column for enrich)
+    # returns index sizes per table after the migration
+    kind = event_key_type(kind)
+    if kind is None:
+        raise ValueError("migrate_event_key needs a key type")
+    t0 = time.perf_counter()
+    sizes: dict[str, dict[str, int]] = {}
+
+    with psycopg.connect(conn_str()) as conn:
+        with conn.cursor() as cur:
+            cur.execute(DDL)
+            conn.commit()
+
+            for table in tables:
+                schema, name = table.split(".", 1)
+                _ensure_event_key(cur, table, kind)
+                conn.commit()
+                log.info("event key sizes before | table=%s | %s", table, index_sizes(cur, table))
+
+                if backfill:
+                    expr = event_key_expr(kind, "event_hash")
+                    for part in _leaf_tables(cur, table):
+                        t_part = time.perf_counter()
+                        cur.execute(f"update {part} set event_key = {expr} where event_key is null")
+                        n_rows = cur.rowcount
+                        conn.commit()
+                        log.info("event key backfill | partition=%s | rows=%s | dt=%.2fs", part, n_rows, time.perf_counter() - t_part)
+
+                cur.execute(
+                    "select conname, pg_get_constraintdef(oid) from pg_constraint where conrelid = to_regclass(%s) and contype = 'p'",
+                    (table,),
+                )
+                pk = cur.fetchone()
+                keyed = pk is not None and "event_key" in pk[1]
+                uidx = f"{name}_event_key_uidx"
+                if swap_pk and not keyed:
+                    cur.execute(f"alter table {table} alter column event_key set not null")
+                    if pk is not None:
+                        cur.execute(f"alter table {table} drop constraint {pk[0]}")
+                    cur.execute(f"alter table {table} add constraint {name}_pkey primary key (event_key, file_date)")
+                    cur.execute(f"drop index if exists {schema}.{uidx}")
+                    log.info("event key primary key swapped | table=%s", table)
+                elif not keyed:
+                    cur.execute(f"create unique index if not exists {uidx} on {table} (event_key, file_date)")
+                conn.commit()
+
+                sizes[table] = index_sizes(cur, table)
+                log.info("event key sizes after | table=%s | %s", table, sizes[table])
+
+    log.info("event key migrate done | type=%s | swap_pk=%s | dt=%.2fs", kind, swap_pk, time.perf_counter() - t0)
+    return sizes
+
+
+def reset_file_dates(start: date, end: date, tables: Iterable[str] = FACT_TABLES) -> None:
+    # clear fact rows for [start, end] before a reload; whole months truncate their partition,
+    # partial months fall back to a delete pruned to that single partition
+    t0 = time.perf_counter()
+
+    with psycopg.connect(conn_str()) as conn:
+        with conn.cursor() as cur:
+            invalidate(cur, start, end)
+            for table in tables:
+                state = _is_partitioned(cur, table)
+                if state is None:
+                    continue
+
+                month = _month_start(start)
+                while month <= end:
+                    month_end = _next_month(month) - timedelta(days=1)
+                    lo = max(month, start)
+                    hi = min(month_end, end)
+                    schema, name = table.split(".", 1)
+                    part = f"{schema}.{name}_p{month.strftime('%Y%m')}"
+
+                    if state and lo == month and hi == month_end:
+                        cur.execute("select to_regclass(%s)", (part,))
+                        if cur.fetchone()[0] is not None:
+                            cur.execute(f"truncate table {part}")
+                            log.info("reset truncate | partition=%s", part)
+                    else:
+                        cur.execute(
+                            f"delete from {table} where file_date between %s and %s",
+                            (lo, hi),
+                        )
+                        log.info(
+                            "reset delete | table=%s | from=%s | to=%s | rows=%s",
+                            table,
+                            lo.isoformat(),
+                            hi.isoformat(),
+                            cur.rowcount,
+                        )
+                    month = _next_month(month)
+        conn.commit()
+
+    log.info("reset done | from=%s | to=%s | dt=%.2fs", start.isoformat(), end.isoformat(), time.perf_counter() - t0)
+
+
+def _count_returned(cur: psycopg.Cursor, counts: Counter) -> None:
+    # one result set per executemany row; conflicting rows return nothing
+    for _ in cur.results():
+        for (d,) in cur.fetchall():
+            counts[d] += 1
+
+
+class _DateTracker:
+    # attempted rows per file_date, plus month partitions created on first sight
+    def __init__(self, cur: psycopg.Cursor, enriched: bool = False) -> None:
+        self.cur = cur
+        self.tables = ("raw.inpe_focos", "curated.inpe_focos") + (("curated.inpe_focos_enriched",) if enriched else ())
+        self.attempted: Counter = Counter()
+        self._months: set[date] = set()
+
+    def count(self, batch: RecordBatch) -> None:
+        self.attempted[batch.file_date] += len(batch)
+
+    def ensure_partitions(self) -> None:
+        new = {d for d in self.attempted if _month_start(d) not in self._months}
+        if not new:
+            return
+        for table in self.tables:
+            ensure_partitions(self.cur, table, new)
+        self._months.update(_month_start(d) for d in new)
+
+
+def _load_executemany(
+    conn: psycopg.Connection,
+    batches: Iterable[RecordBatch],
+    source: str,
+    chunk_size: int,
+    spatial: Optional[SpatialEngine] = None,
+) -> tuple[Counter, Counter, Counter, Counter]:
+    raw_counts: Counter = Counter()
+    curated_counts: Counter = Counter()
+    enriched_counts: Counter = Counter()
+    kind = event_key_type()
+    raw_sql = _with_event_key(RAW_SQL, kind, "%(event_hash)s")
+    curated_sql = _with_event_key(CURATED_SQL, kind, "%(event_hash)s")
+
+    with conn.cursor() as cur:
+        dates = _DateTracker(cur, enriched=spatial is not None)
+        idx = 0
+        for batch in batches:
+            dates.count(batch)
+            dates.ensure_partitions()
+            # whole batch attributed at once; chunks slice the columns
+            attrs = spatial.attribute_batch(batch) if spatial is not None else None
+            for start in range(0, len(batch), chunk_size):
+                idx += 1
+                log.debug("chunk start | idx=%s | size=%s", idx, min(chunk_size, len(batch) - start))
+                t_chunk = time.perf_counter()
+
+                # parameter dicts only for the current chunk
+                rows = [dict(zip(ROW_FIELDS, row)) for row in batch.iter_rows(source, start, start + chunk_size)]
+                cur.executemany(raw_sql, rows, returning=True)
+                _count_returned(cur, raw_counts)
+                cur.executemany(curated_sql, rows, returning=True)
+                _count_returned(cur, curated_counts)
+                if attrs is not None:
+                    for name in ENRICH_FIELDS:
+                        for row, value in zip(rows, attrs[name][start : start + chunk_size].tolist()):
+                            row[name] = value
+                    cur.executemany(ENRICHED_SQL, rows, returning=True)
+                    _count_returned(cur, enriched_counts)
+
+                log.debug("chunk ok | idx=%s | dt=%.2fs", idx, time.perf_counter() - t_chunk)
+
+    return raw_counts, curated_counts, enriched_counts, dates.attempted
+
+
+def _load_copy(
+    conn: psycopg.Connection,
+    batches: Iterable[RecordBatch],
+    source: str,
+    spatial: Optional[SpatialEngine] = None,
+) -> tuple[Counter, Counter, Counter, Counter]:
+    # stream records into a staging table, then fan out with set-based inserts
+    with conn.cursor() as cur:
+        cur.execute(STAGE_DDL)
+        if spatial is not None:
+            cur.execute(STAGE_ENRICH_DDL)
+        dates = _DateTracker(cur, enriched=spatial is not None)
+
+        t_copy = time.perf_counter()
+        with cur.copy(STAGE_COPY_SQL if spatial is None else STAGE_ENRICH_COPY_SQL) as copy:
+            copy.set_types(STAGE_TYPES if spatial is None else STAGE_ENRICH_TYPES)
+            for batch in batches:
+                dates.count(batch)
+                if spatial is None:
+                    for row in batch.iter_rows(source):
+                        copy.write_row(row)
+                else:
+                    for row, attrs in zip(batch.iter_rows(source), spatial.rows(batch)):
+                        copy.write_row(row + attrs)
+        log.debug("copy stage ok | rows=%s | dt=%.2fs", sum(dates.attempted.values()), time.perf_counter() - t_copy)
+
+        # the connection is busy during COPY; partitions are only needed by the fanout
+        dates.ensure_partitions()
+
+        t_fanout = time.perf_counter()
+        kind = event_key_type()
+        cur.execute(_with_event_key(RAW_FROM_STAGE_SQL, kind, "s.event_hash"))
+        raw_counts = Counter({d: int(n) for d, n in cur.fetchall()})
+        cur.execute(_with_event_key(CURATED_FROM_STAGE_SQL, kind, "s.event_hash"))
+        curated_counts = Counter({d: int(n) for d, n in cur.fetchall()})
+        enriched_counts: Counter = Counter()
+        if spatial is not None:
+            cur.execute(ENRICHED_FROM_STAGE_SQL)
+            enriched_counts = Counter({d: int(n) for d, n in cur.fetchall()})
+        log.debug("copy fanout ok | dt=%.2fs", time.perf_counter() - t_fanout)
+
+    return raw_counts, curated_counts, enriched_counts, dates.attempted
+
+
+def _table_counts(inserted: Counter, attempted: Counter) -> TableLoadCounts:
+    return TableLoadCounts(
+        inserted={d: int(inserted.get(d, 0)) for d in sorted(attempted)},
+        skipped={d: int(attempted[d] - inserted.get(d, 0)) for d in sorted(attempted)},
+    )
 
 
 def load_records(
     records: Iterable[Record],
     source: str = "inpe_diario_brasil",
     chunk_size: int = 5000,
+    method: str | None = None,
+    conn: Optional[psycopg.Connection] = None,
+    prefilter: bool | None = None,
 ) -> LoadResult:
+    # row-object entry point; records are regrouped into columnar batches of chunk_size
+    return load_batches(
+        batches_from_records(records, chunk_size),
+        source=source,
+        chunk_size=chunk_size,
+        method=method,
+        conn=conn,
+        prefilter=prefilter,
+    )
+
+
+def load_batches(
+    batches: Iterable[RecordBatch],
+    source: str = "inpe_diario_brasil",
+    chunk_size: int = 5000,
+    method: str | None = None,
+    conn: Optional[psycopg.Connection] = None,
+    prefilter: bool | None = None,
+    enrich_engine: str | None = None,
+) -> LoadResult:
+    # with prefilter (default: LOAD_PREFILTER) rows whose event_hash is already in every target
+    # table for their file_date are dropped before they are sent; they count as attempted and skipped.
+    # with enrich_engine "python" (default: ENRICH_ENGINE) rows are also written to
+    # curated.inpe_focos_enriched, attributed in-process
     t0 = time.perf_counter()
 
-    rec_list = list(records)
-    attempted = len(rec_list)
-    log.info("load start | records=%s | source=%s | chunk_size=%s", attempted, source, chunk_size)
-    if not rec_list:
-        log.warning("load skip | empty records")
+    method = method or settings.load_method
+    prefilter = settings.load_prefilter if prefilter is None else prefilter
+    enrich_engine = enrich_engine or settings.enrich_engine
+    if method not in LOAD_METHODS:
+        raise ValueError(f"invalid load method: {method} (expected one of {LOAD_METHODS})")
+    if enrich_engine not in ENRICH_ENGINES:
+        raise ValueError(f"invalid enrich engine: {enrich_engine} (expected one of {ENRICH_ENGINES})")
+    if enrich_engine == "python":
+        require_shapely()
+
+    # batches may be a lazy iterator: it is consumed one batch at a time and never materialized
+    it = (batch for batch in batches if len(batch))
+    first = next(it, None)
+    if first is None:
+        log.warning("load skip | empty records | source=%s | method=%s", source, method)
         return LoadResult(inserted=0, attempted=0)
+    log.info("load start | source=%s | method=%s | chunk_size=%s | enrich_engine=%s", source, method, chunk_size, enrich_engine)
 
-    ensure_db()
-
-    file_dates = sorted({r.file_date for r in rec_list})
-    log.debug("load file_dates | %s", [d.isoformat() for d in file_dates])
-
-    rows: list[dict] = []
-    for r in rec_list:
-        rows.append(
-            {
-                "event_hash": r.event_hash,
-                "source": source,
-                "file_date": r.file_date,
-                "view_ts": r.view_ts,
-                "satelite": r.satelite,
-                "municipio": r.municipio,
-                "estado": r.estado,
-                "bioma": r.bioma,
-                "lat": r.lat,
-                "lon": r.lon,
-                "props": r.props_json,
-            }
-        )
+    # schema and the first batch's partitions in their own transaction; months seen
+    # later in the stream are created inside the load transaction
+    ensure_db([first.file_date], conn=conn, enriched=enrich_engine == "python")
 
-    inserted_total = 0
+    index = HashIndex(conn_str(), enriched=enrich_engine == "python") if prefilter else None
     try:
-        with psycopg.connect(_conn_str()) as conn:
-            raw_before = _count_raw_by_file_date(conn, file_dates)
-            log.info("raw counts (before) | %s", {d.isoformat(): n for d, n in raw_before.items()})
-
-            with conn.cursor() as cur:
-                for idx, chunk in enumerate(_chunks(rows, chunk_size), start=1):
-                    log.debug("chunk start | idx=%s | size=%s", idx, len(chunk))
-                    t_chunk = time.perf_counter()
-
-                    cur.executemany(RAW_SQL, chunk)
-                    cur.executemany(CURATED_SQL, chunk)
-
-                    log.debug("chunk ok | idx=%s | dt=%.2fs", idx, time.perf_counter() - t_chunk)
-
-            conn.commit()
-
-            raw_after = _count_raw_by_file_date(conn, file_dates)
-            log.info("raw counts (after) | %s", {d.isoformat(): n for d, n in raw_after.items()})
-
-            inserted_total = sum(raw_after[d] - raw_before.get(d, 0) for d in file_dates)
+        with _connection(conn) as conn, conn.transaction():
+            spatial = shared_engine(conn) if enrich_engine == "python" else None
+            stream: Iterable[RecordBatch] = chain([first], it)
+            if index is not None:
+                stream = index.filter(stream)
+            if method == "copy":
+                raw_counts, curated_counts, enriched_counts, attempted_by_date = _load_copy(conn, stream, source, spatial)
+            else:
+                raw_counts, curated_counts, enriched_counts, attempted_by_date = _load_executemany(
+                    conn, stream, source, chunk_size, spatial
+                )
+
+        if index is not None:
+            index.commit()
+            index.log_skip_rate()
+            for d, n in index.rows.items():
+                attempted_by_date[d] = n
 
     except Exception:
         log.exception("load failed")
         raise
+    finally:
+        if index is not None:
+            index.close()
+
+    attempted = sum(attempted_by_date.values())
+    log.debug("load file_dates | %s", [d.isoformat() for d in sorted(attempted_by_date)])
+
+    result = LoadResult(
+        inserted=sum(raw_counts.values()),
+        attempted=attempted,
+        attempted_by_date={d: int(attempted_by_date[d]) for d in sorted(attempted_by_date)},
+        raw=_table_counts(raw_counts, attempted_by_date),
+        curated=_table_counts(curated_counts, attempted_by_date),
+        enriched=_table_counts(enriched_counts, attempted_by_date) if enrich_engine == "python" else TableLoadCounts(),
+    )
+
+    for d, n in result.attempted_by_date.items():
+        log.info(
+            "load counts | file_date=%s | attempted=%s | raw_inserted=%s | raw_skipped=%s"
+            " | curated_inserted=%s | curated_skipped=%s",
+            d.isoformat(),
+            n,
+            result.raw.inserted[d],
+            result.raw.skipped[d],
+            result.curated.inserted[d],
+            result.curated.skipped[d],
+        )
 
     log.info(
-        "load done | inserted=%s | attempted=%s | dt=%.2fs",
-        inserted_total,
+        "load done | inserted=%s | curated_inserted=%s | enriched_inserted=%s | attempted=%s | method=%s | dt=%.2fs",
+        result.inserted,
+        result.curated.total_inserted,
+        result.enriched.total_inserted,
         attempted,
+        method,
         time.perf_counter() - t0,
     )
-    return LoadResult(inserted=inserted_total, attempted=attempted)
+    return result
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from ..config import settings
+from ..transform.arrow import arrow_schema, batch_from_arrow, batch_to_arrow, require_pyarrow
+from ..transform.inpe_focos_diario import RecordBatch, StringTable
+
+_filename = Path(__file__).stem
+log = logging.getLogger(_filename)
+
+# parquet metadata keys (bytes, as stored by pyarrow)
+_META_SHA256 = b"etl.source_sha256"
+_META_ROWS = b"etl.rows"
+
+
+def staged_dir() -> Path:
+    return Path(settings.data_dir) / "staged" / "inpe_focos"
+
+
+def staged_path(d: date) -> Path:
+    return staged_dir() / f"{d.year:04d}" / f"{d.isoformat()}.parquet"
+
+
+def stage_batches(
+    file_date: date,
+    batches: Iterable[RecordBatch],
+    *,
+    source_sha256: Optional[str] = None,
+) -> Iterator[RecordBatch]:
+    # pass batches through while writing them to the day's parquet file; the file only
+    # replaces the previous one once the whole stream was consumed
+    _, pq = require_pyarrow()
+    out_path = staged_path(file_date)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(f"{out_path.name}.{os.getpid()}.tmp")
+
+    t0 = time.perf_counter()
+    rows = 0
+    writer = pq.ParquetWriter(tmp_path, arrow_schema(), compression="zstd")
+    try:
+        for batch in batches:
+            writer.write_batch(batch_to_arrow(batch))
+            rows += len(batch)
+            yield batch
+        writer.add_key_value_metadata({_META_SHA256: (source_sha256 or "").encode(), _META_ROWS: str(rows).encode()})
+        writer.close()
+    except BaseException:
+        writer.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    tmp_path.replace(out_path)
+    log.info(
+        "staged write ok | date=%s | rows=%s | size_bytes=%s | dt=%.2fs | path=%s",
+        file_date.isoformat(),
+        rows,
+        out_path.stat().st_size,
+        time.perf_counter() - t0,
+        out_path.as_posix(),
+    )
+
+
+def staged_sha256(d: date) -> Optional[str]:
+    # source csv sha256 recorded when the day was staged; None if not staged
+    path = staged_path(d)
+    if not path.exists():
+        return None
+    _, pq = require_pyarrow()
+    meta = pq.read_metadata(path).metadata or {}
+    return meta.get(_META_SHA256, b"").decode() or None
+
+
+def read_staged_day(d: date, *, batch_size: int | None = None) -> Iterator[RecordBatch]:
+    _, pq = require_pyarrow()
+    path = staged_path(d)
+    if not path.exists():
+        raise FileNotFoundError(f"staged parquet not found: {path}")
+
+    t0 = time.perf_counter()
+    strings = StringTable()
+    rows = 0
+    pf = pq.ParquetFile(path)
+    for rb in pf.iter_batches(batch_size=batch_size or settings.transform_batch_size):
+        if rb.num_rows == 0:
+            continue
+        rows += rb.num_rows
+        yield batch_from_arrow(rb, d, strings)
+    log.info("staged read ok | date=%s | rows=%s | dt=%.2fs | path=%s", d.isoformat(), rows, time.perf_counter() - t0, path.as_posix())
+
+
+def staged_days(start: date, end: date) -> list[date]:
+    days: list[date] = []
+    for year in range(start.year, end.year + 1):
+        for path in sorted((staged_dir() / f"{year:04d}").glob("*.parquet")):
+            try:
+                d = date.fromisoformat(path.stem)
+            except ValueError:
+                continue
+            if start <= d <= end:
+                days.append(d)
+    return days
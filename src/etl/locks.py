@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import psycopg
+
+from .config import conn_str
+
+# namespace (classid) for the two-key session advisory locks shared by backfill, rebuild,
+# watch and the daemon. objids: a day's ordinal claims that day; the keys below are global
+LOCK_NS = 0x65746C01
+# serializes the enrich/marts sql: monthly marts delete/reinsert whole months
+SQL_STAGE_LOCK = -1
+# held for the daemon's lifetime: one daemon per database
+DAEMON_LOCK = -2
+
+
+def try_advisory_lock(conn: psycopg.Connection, key: int) -> bool:
+    with conn.cursor() as cur:
+        cur.execute("select pg_try_advisory_lock(%s, %s)", (LOCK_NS, key))
+        return bool(cur.fetchone()[0])
+
+
+def advisory_lock(conn: psycopg.Connection, key: int) -> None:
+    # blocks until the lock is free
+    with conn.cursor() as cur:
+        cur.execute("select pg_advisory_lock(%s, %s)", (LOCK_NS, key))
+
+
+def advisory_unlock(conn: psycopg.Connection, key: int) -> None:
+    if conn.closed or conn.broken:
+        return
+    with conn.cursor() as cur:
+        cur.execute("select pg_advisory_unlock(%s, %s)", (LOCK_NS, key))
+
+
+@contextmanager
+def sql_stage_lock(conn: Optional[psycopg.Connection] = None) -> Iterator[None]:
+    # SQL_STAGE_LOCK for the duration of the block, on conn or, without one (docker engine),
+    # on a short-lived connection of its own
+    lock_conn = conn if conn is not None else psycopg.connect(conn_str(), autocommit=True)
+    try:
+        advisory_lock(lock_conn, SQL_STAGE_LOCK)
+        try:
+            yield
+        finally:
+            advisory_unlock(lock_conn, SQL_STAGE_LOCK)
+    finally:
+        if lock_conn is not conn:
+            lock_conn.close()
@@ -2,6 +2,9 @@ from __future__ import annotations
 
 from pathlib import Path
 
+import psycopg
+
+from .config import conn_str
 from .sql_runner import run_sql_file
 
 
@@ -13,15 +16,19 @@ def _repo_root() -> Path:
     return Path(__file__).resolve().parents[2]
 
 
-def run_marts(date_str: str, engine: str | None = None) -> None:
+# every mart run_marts writes; run_marts_incremental keeps the same set current
+MART_FILES = (
+    "10_focos_diario_municipio.sql",
+    "11_focos_mensal_municipio.sql",
+    "20_focos_diario_uf.sql",
+    "21_focos_mensal_uf.sql",
+    "30_focos_diario_uf_trend.sql",
+)
+
+
+def run_marts(date_str: str, engine: str | None = None, conn: psycopg.Connection | None = None) -> None:
     repo_root = _repo_root()
-    files = [
-        repo_root / "sql" / "marts" / "10_focos_diario_municipio.sql",
-        repo_root / "sql" / "marts" / "11_focos_mensal_municipio.sql",
-        repo_root / "sql" / "marts" / "20_focos_diario_uf.sql",
-        repo_root / "sql" / "marts" / "21_focos_mensal_uf.sql",
-        repo_root / "sql" / "marts" / "30_focos_diario_uf_trend.sql",
-    ]
+    files = [repo_root / "sql" / "marts" / name for name in MART_FILES]
 
     for file in files:
         if not file.exists():
@@ -29,6 +36,37 @@ def run_marts(date_str: str, engine: str | None = None) -> None:
 
     for file in files:
         _log(f"run {file.as_posix()} | date={date_str}")
-        run_sql_file(str(file), {"DATE": date_str}, engine=engine)
+        run_sql_file(str(file), {"DATE": date_str}, engine=engine, conn=conn)
+
+    _log(f"done | files={len(files)}")
+
+
+def _trend_view_exists(conn: psycopg.Connection | None) -> bool:
+    sql = "select to_regclass('marts.focos_diario_uf_trend') is not null"
+    if conn is not None:
+        return bool(conn.execute(sql).fetchone()[0])
+    with psycopg.connect(conn_str()) as own:
+        return bool(own.execute(sql).fetchone()[0])
 
+
+def run_marts_incremental(
+    date_str: str,
+    since: str,
+    engine: str | None = None,
+    conn: psycopg.Connection | None = None,
+) -> None:
+    # upsert the groups of every run_marts mart touched by rows enriched since `since`
+    # (timestamptz): daily/monthly municipio and uf tables. the uf trend is a view over the
+    # daily uf mart, so it only has to exist
+    marts_dir = _repo_root() / "sql" / "marts"
+    files = [marts_dir / "incremental" / "10_focos_delta.sql"]
+    if not _trend_view_exists(conn):
+        files.append(marts_dir / "30_focos_diario_uf_trend.sql")
+    for file in files:
+        if not file.exists():
+            raise FileNotFoundError(f"missing file: {file}")
+
+    for file in files:
+        _log(f"run {file.as_posix()} | date={date_str} | since={since}")
+        run_sql_file(str(file), {"DATE": date_str, "SINCE": since}, engine=engine, conn=conn)
     _log(f"done | files={len(files)}")
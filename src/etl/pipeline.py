@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+_filename = Path(__file__).stem
+log = logging.getLogger(_filename)
+
+_DONE = object()
+
+
+@dataclass(frozen=True)
+class Stage:
+    # fn(item, payload) -> payload for the next stage; item is the day key
+    name: str
+    fn: Callable[[str, Any], Any]
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    failed: int = 0
+    callback_failed: int = 0
+    busy: float = 0.0
+    wait_in: float = 0.0
+    wait_out: float = 0.0
+
+
+def _callback(stats: StageStats, fn: Callable[..., None], item: str, *args: Any) -> None:
+    # a raising on_done/on_fail is counted and logged; the stage keeps consuming its queue
+    try:
+        fn(item, *args)
+    except (Exception, SystemExit) as exc:
+        stats.callback_failed += 1
+        log.error("stage callback fail | stage=%s | item=%s | callback=%s | err=%s", stats.name, item, fn.__name__, exc)
+
+
+def _stage_worker(
+    stage: Stage,
+    stats: StageStats,
+    q_in: queue.Queue,
+    q_out: queue.Queue | None,
+    on_done: Callable[[str, Any], None],
+    on_fail: Callable[[str, str, BaseException], None],
+) -> None:
+    try:
+        _stage_loop(stage, stats, q_in, q_out, on_done, on_fail)
+    except BaseException as exc:
+        # a dead stage must not wedge the pipeline: fail what is still queued for it, so the
+        # upstream put() never blocks, and pass _DONE on so downstream stages return
+        log.error("stage died | stage=%s | err=%s", stage.name, exc)
+        while True:
+            msg = q_in.get()
+            if msg is _DONE:
+                break
+            stats.failed += 1
+            _callback(stats, on_fail, msg[0], stage.name, exc)
+        if q_out is not None:
+            q_out.put(_DONE)
+
+
+def _stage_loop(
+    stage: Stage,
+    stats: StageStats,
+    q_in: queue.Queue,
+    q_out: queue.Queue | None,
+    on_done: Callable[[str, Any], None],
+    on_fail: Callable[[str, str, BaseException], None],
+) -> None:
+    while True:
+        t_wait = time.perf_counter()
+        msg = q_in.get()
+        stats.wait_in += time.perf_counter() - t_wait
+
+        if msg is _DONE:
+            if q_out is not None:
+                q_out.put(_DONE)
+            return
+
+        item, payload = msg
+        t_busy = time.perf_counter()
+        try:
+            result = stage.fn(item, payload)
+        except (Exception, SystemExit) as exc:
+            stats.busy += time.perf_counter() - t_busy
+            stats.failed += 1
+            log.error("stage fail | stage=%s | item=%s | err=%s", stage.name, item, exc)
+            _callback(stats, on_fail, item, stage.name, exc)
+            continue
+        stats.busy += time.perf_counter() - t_busy
+        stats.items += 1
+
+        if q_out is None:
+            _callback(stats, on_done, item, result)
+            continue
+
+        # blocks while the next stage is behind (backpressure)
+        t_put = time.perf_counter()
+        q_out.put((item, result))
+        stats.wait_out += time.perf_counter() - t_put
+
+
+def log_stage_report(stats: list[StageStats], wall: float) -> None:
+    for st in stats:
+        log.info(
+            "stage timing | stage=%s | items=%s | failed=%s | callback_failed=%s | busy=%.2fs | avg=%.2fs | wait_in=%.2fs | wait_out=%.2fs | util=%.0f%%",
+            st.name,
+            st.items,
+            st.failed,
+            st.callback_failed,
+            st.busy,
+            st.busy / st.items if st.items else 0.0,
+            st.wait_in,
+            st.wait_out,
+            100.0 * st.busy / wall if wall > 0 else 0.0,
+        )
+    if stats:
+        bottleneck = max(stats, key=lambda st: st.busy)
+        log.info("stage bottleneck | stage=%s | busy=%.2fs | wall=%.2fs", bottleneck.name, bottleneck.busy, wall)
+
+
+def run_pipeline(
+    items: list[str],
+    stages: list[Stage],
+    *,
+    on_done: Callable[[str, Any], None],
+    on_fail: Callable[[str, str, BaseException], None],
+    queue_size: int = 2,
+) -> list[StageStats]:
+    # one thread per stage, joined by bounded queues; at most queue_size payloads wait
+    # between two stages, so item N+1 is extracted while item N is parsed, and so on
+    if not stages:
+        raise ValueError("pipeline needs at least one stage")
+    if queue_size < 1:
+        raise ValueError("queue_size must be >= 1")
+
+    t0 = time.perf_counter()
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    stats = [StageStats(name=stage.name) for stage in stages]
+    threads: list[threading.Thread] = []
+
+    for idx, stage in enumerate(stages):
+        q_out = queues[idx + 1] if idx + 1 < len(stages) else None
+        thread = threading.Thread(
+            target=_stage_worker,
+            args=(stage, stats[idx], queues[idx], q_out, on_done, on_fail),
+            name=f"pipeline-{stage.name}",
+            daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+
+    log.info(
+        "pipeline start | items=%s | stages=%s | queue_size=%s",
+        len(items),
+        ",".join(stage.name for stage in stages),
+        queue_size,
+    )
+    for item in items:
+        queues[0].put((item, None))
+    queues[0].put(_DONE)
+
+    for thread in threads:
+        thread.join()
+
+    wall = time.perf_counter() - t0
+    log.info("pipeline done | items=%s | wall=%.2fs", len(items), wall)
+    log_stage_report(stats, wall)
+    return stats
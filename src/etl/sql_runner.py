@@ -129,8 +129,16 @@ def _run_sql_docker(path: Path, vars: dict[str, str] | None) -> None:
         )
 
 
-def _run_sql_direct(path: Path, vars: dict[str, str] | None, dsn: str | None) -> None:
-    if dsn:
+def _run_sql_direct(
+    path: Path,
+    vars: dict[str, str] | None,
+    dsn: str | None,
+    shared_conn: psycopg.Connection | None = None,
+) -> None:
+    if shared_conn is not None:
+        # caller-owned connection (autocommit); left open for the next file
+        conn = shared_conn
+    elif dsn:
         conn = psycopg.connect(dsn)
     else:
         conn = psycopg.connect(
@@ -140,7 +148,8 @@ def _run_sql_direct(path: Path, vars: dict[str, str] | None, dsn: str | None) ->
             user=os.getenv("DB_USER", settings.db_user),
             password=os.getenv("DB_PASSWORD", settings.db_password),
         )
-    conn.autocommit = True
+    if shared_conn is None:
+        conn.autocommit = True
     raw_text = path.read_text(encoding="utf-8")
     raw_text = raw_text.lstrip("\ufeff")
     filtered = "\n".join(
@@ -151,9 +160,13 @@ def _run_sql_direct(path: Path, vars: dict[str, str] | None, dsn: str | None) ->
         with conn.cursor() as cur:
             cur.execute(sql_text)
     except Exception as exc:
+        if shared_conn is not None and conn.info.transaction_status != psycopg.pq.TransactionStatus.IDLE:
+            # files with explicit begin/commit leave the session inside a failed block
+            conn.execute("rollback")
         raise RuntimeError(f"direct sql failed | file={path} | err={exc}") from exc
     finally:
-        conn.close()
+        if shared_conn is None:
+            conn.close()
 
 
 def run_sql_file(
@@ -161,6 +174,7 @@ def run_sql_file(
     vars: dict[str, str] | None = None,
     engine: str | None = None,
     dsn: str | None = None,
+    conn: psycopg.Connection | None = None,
 ) -> None:
     path = _resolve_sql_path(sql_path)
     engine = _detect_engine(engine)
@@ -169,4 +183,4 @@ def run_sql_file(
     if engine == "docker":
         return _run_sql_docker(path, vars)
 
-    return _run_sql_direct(path, vars, dsn)
+    return _run_sql_direct(path, vars, dsn, shared_conn=conn)
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+
+from .inpe_focos_diario import RecordBatch, StringTable
+
+
+def require_pyarrow():
+    # pyarrow is optional: pip install "inpe-queimadas-etl[staging]"
+    try:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+    except ImportError as exc:
+        raise RuntimeError("arrow/parquet support needs pyarrow (pip install 'inpe-queimadas-etl[staging]')") from exc
+    return pa, pq
+
+
+def has_pyarrow() -> bool:
+    try:
+        require_pyarrow()
+    except RuntimeError:
+        return False
+    return True
+
+
+def arrow_schema():
+    pa, _ = require_pyarrow()
+    text_dict = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema(
+        [
+            ("event_hash", pa.string()),
+            ("file_date", pa.date32()),
+            ("view_ts", pa.string()),
+            ("satelite", text_dict),
+            ("municipio", text_dict),
+            ("estado", text_dict),
+            ("bioma", text_dict),
+            ("lat", pa.float64()),
+            ("lon", pa.float64()),
+            ("props_json", pa.string()),
+        ]
+    )
+
+
+def _dict_array(batch: RecordBatch, codes: np.ndarray):
+    # string-table codes map straight onto an arrow dictionary column
+    pa, _ = require_pyarrow()
+    indices = pa.array(codes, type=pa.int32(), mask=codes < 0)
+    return pa.DictionaryArray.from_arrays(indices, pa.array(batch.strings.values, type=pa.string()))
+
+
+def batch_to_arrow(batch: RecordBatch):
+    pa, _ = require_pyarrow()
+    n = len(batch)
+    return pa.record_batch(
+        [
+            pa.array(batch.event_hash, type=pa.string()),
+            pa.array([batch.file_date] * n, type=pa.date32()),
+            pa.array(batch.view_ts, type=pa.string()),
+            _dict_array(batch, batch.satelite),
+            _dict_array(batch, batch.municipio),
+            _dict_array(batch, batch.estado),
+            _dict_array(batch, batch.bioma),
+            pa.array(batch.lat, type=pa.float64()),
+            pa.array(batch.lon, type=pa.float64()),
+            pa.array(batch.props_json, type=pa.string()),
+        ],
+        schema=arrow_schema(),
+    )
+
+
+def batch_from_arrow(rb, file_date: date, strings: StringTable) -> RecordBatch:
+    # copies everything out of rb, so the arrow buffers of the staged parquet file can be released
+    def _codes(name: str) -> np.ndarray:
+        # re-key the arrow dictionary into the shared table; null indices map to -1
+        col = rb.column(name)
+        mapping = np.append(strings.encode(np.array(col.dictionary.to_pylist(), dtype=object)), np.int32(-1))
+        indices = col.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+        return mapping[indices].astype(np.int32)
+
+    return RecordBatch(
+        file_date=file_date,
+        event_hash=rb.column("event_hash").to_pylist(),
+        view_ts=rb.column("view_ts").to_pylist(),
+        satelite=_codes("satelite"),
+        municipio=_codes("municipio"),
+        estado=_codes("estado"),
+        bioma=_codes("bioma"),
+        lat=np.array(rb.column("lat"), dtype=np.float64),
+        lon=np.array(rb.column("lon"), dtype=np.float64),
+        props_json=rb.column("props_json").to_pylist(),
+        strings=strings,
+    )
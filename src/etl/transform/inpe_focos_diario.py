@@ -1,16 +1,22 @@
 from __future__ import annotations
 
+import codecs
+import csv
 import hashlib
 import json
 import logging
 import math
 from dataclasses import dataclass
 from datetime import date
+from itertools import repeat
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
+import numpy as np
 import pandas as pd
 
+from ..config import settings
+
 _filename = Path(__file__).stem
 log = logging.getLogger(_filename)
 
@@ -21,8 +27,8 @@ def _norm_cols(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def _find_col(df: pd.DataFrame, preferred: list[str], contains: list[str]) -> str | None:
-    cols = list(df.columns)
+def _find_col(columns: Iterable[str], preferred: list[str], contains: list[str]) -> str | None:
+    cols = list(columns)
 
     for c in preferred:
         if c in cols:
@@ -37,7 +43,12 @@ def _find_col(df: pd.DataFrame, preferred: list[str], contains: list[str]) -> st
 
 
 def _to_float(s: pd.Series) -> pd.Series:
-    return pd.to_numeric(s.astype(str).str.replace(",", ".", regex=False), errors="coerce")
+    # always float64: a chunk whose values are all integral would otherwise come out int64
+    # and serialize as -11 instead of -11.0, making props depend on the batch size
+    return pd.to_numeric(s.astype(str).str.replace(",", ".", regex=False), errors="coerce").astype("float64")
+
+
+_NULL_TOKENS = ("nan", "na", "null", "none", "")
 
 
 def _clean_value(v: Any) -> Any:
@@ -53,7 +64,7 @@ def _clean_value(v: Any) -> Any:
 
     if isinstance(v, str):
         vv = v.strip().lower()
-        if vv in ("nan", "na", "null", "none", ""):
+        if vv in _NULL_TOKENS:
             return None
 
     return v
@@ -78,68 +89,193 @@ class Record:
     props_json: str
 
 
-def transform_inpe_csv(path: str, file_date: date) -> list[Record]:
-    # parse, clean, and shape records from INPE CSV
-    p = Path(path)
-
-    log.info("transform start | file_date=%s | path=%s", file_date.isoformat(), p.as_posix())
-    try:
-        df = pd.read_csv(p, sep=None, engine="python", dtype=str)
-    except Exception:
-        log.exception("read_csv failed | path=%s", p.as_posix())
-        raise
-    df = _norm_cols(df)
-
-    lat_col = _find_col(df, preferred=["lat", "latitude"], contains=["lat"])
-    lon_col = _find_col(df, preferred=["lon", "long", "longitude"], contains=["lon", "long"])
-    if not lat_col or not lon_col:
-        log.error("missing lat/lon columns | cols=%s", list(df.columns)[:80])
-        raise ValueError(f"não encontrei colunas de lat/lon. colunas: {list(df.columns)[:80]}")
-
-    ts_col = _find_col(df, preferred=["datahora", "data_hora_gmt", "data_hora"], contains=["datahora", "hora", "gmt"])
-    sat_col = _find_col(df, preferred=["satelite"], contains=["satel"])
-    mun_col = _find_col(df, preferred=["municipio"], contains=["municip"])
-    uf_col = _find_col(df, preferred=["estado", "uf"], contains=["estado", "uf"])
-    bio_col = _find_col(df, preferred=["bioma"], contains=["bioma"])
-
-    log.info(
-        "columns picked | lat=%s | lon=%s | ts=%s | sat=%s | mun=%s | uf=%s | bioma=%s",
-        lat_col,
-        lon_col,
-        ts_col,
-        sat_col,
-        mun_col,
-        uf_col,
-        bio_col,
-    )
-
-    rows_in = len(df)
+class StringTable:
+    # shared dictionary for repetitive text columns (satelite, municipio, estado, bioma);
+    # batches carry int32 codes into it, -1 is None
+    def __init__(self) -> None:
+        self.values: list[str] = []
+        self._index: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _code(self, value: str) -> int:
+        code = self._index.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._index[value] = code
+        return code
+
+    def encode(self, values: Iterable[str | None]) -> np.ndarray:
+        arr = values if isinstance(values, np.ndarray) else np.array(list(values), dtype=object)
+        codes, uniques = pd.factorize(arr, use_na_sentinel=True)
+        mapping = np.array([self._code(u) for u in uniques] + [-1], dtype=np.int32)
+        return mapping[codes]
+
+    def decode(self, codes: np.ndarray) -> list[str | None]:
+        lookup: list[str | None] = [*self.values, None]
+        return [lookup[c] for c in codes.tolist()]
+
+
+# column order of RecordBatch.iter_rows; matches the raw.inpe_focos insert/copy column lists
+ROW_FIELDS = (
+    "event_hash",
+    "source",
+    "file_date",
+    "view_ts",
+    "satelite",
+    "municipio",
+    "estado",
+    "bioma",
+    "lat",
+    "lon",
+    "props",
+)
 
-    df[lat_col] = _to_float(df[lat_col])
-    df[lon_col] = _to_float(df[lon_col])
 
-    before_dropna = len(df)
-    df = df.dropna(subset=[lat_col, lon_col])
-    dropped_na = before_dropna - len(df)
+@dataclass(frozen=True)
+class RecordBatch:
+    # columnar records of one file_date: float arrays, string-table codes, and plain
+    # lists only where values are unique per row
+    file_date: date
+    event_hash: list[str]
+    view_ts: list[str | None]
+    satelite: np.ndarray
+    municipio: np.ndarray
+    estado: np.ndarray
+    bioma: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+    props_json: list[str]
+    strings: StringTable
+
+    def __len__(self) -> int:
+        return len(self.event_hash)
+
+    def iter_rows(self, source: str, start: int = 0, stop: int | None = None) -> Iterator[tuple]:
+        # loader rows in ROW_FIELDS order, decoded lazily
+        sl = slice(start, stop)
+        return zip(
+            self.event_hash[sl],
+            repeat(source),
+            repeat(self.file_date),
+            self.view_ts[sl],
+            self.strings.decode(self.satelite[sl]),
+            self.strings.decode(self.municipio[sl]),
+            self.strings.decode(self.estado[sl]),
+            self.strings.decode(self.bioma[sl]),
+            self.lat[sl].tolist(),
+            self.lon[sl].tolist(),
+            self.props_json[sl],
+        )
 
-    before_range = len(df)
-    df = df[(df[lat_col].between(-90, 90)) & (df[lon_col].between(-180, 180))]
-    dropped_range = before_range - len(df)
+    def take(self, mask: np.ndarray) -> RecordBatch:
+        # rows where mask is true, sharing this batch's string table
+        idx = np.flatnonzero(mask).tolist()
+        return RecordBatch(
+            file_date=self.file_date,
+            event_hash=[self.event_hash[i] for i in idx],
+            view_ts=[self.view_ts[i] for i in idx],
+            satelite=self.satelite[mask],
+            municipio=self.municipio[mask],
+            estado=self.estado[mask],
+            bioma=self.bioma[mask],
+            lat=self.lat[mask],
+            lon=self.lon[mask],
+            props_json=[self.props_json[i] for i in idx],
+            strings=self.strings,
+        )
 
-    log.info(
-        "coord filter | rows_in=%s | dropped_na=%s | dropped_range=%s | rows_out=%s",
-        rows_in,
-        dropped_na,
-        dropped_range,
-        len(df),
-    )
+    def records(self) -> list[Record]:
+        return [
+            Record(h, d, ts, sat, mun, uf, bio, lat, lon, props)
+            for h, _, d, ts, sat, mun, uf, bio, lat, lon, props in self.iter_rows("")
+        ]
+
+    @classmethod
+    def from_records(cls, records: list[Record], strings: StringTable | None = None) -> RecordBatch:
+        # records must share one file_date
+        strings = strings if strings is not None else StringTable()
+        return cls(
+            file_date=records[0].file_date,
+            event_hash=[r.event_hash for r in records],
+            view_ts=[r.view_ts for r in records],
+            satelite=strings.encode([r.satelite for r in records]),
+            municipio=strings.encode([r.municipio for r in records]),
+            estado=strings.encode([r.estado for r in records]),
+            bioma=strings.encode([r.bioma for r in records]),
+            lat=np.array([r.lat for r in records], dtype=np.float64),
+            lon=np.array([r.lon for r in records], dtype=np.float64),
+            props_json=[r.props_json for r in records],
+            strings=strings,
+        )
 
-    if len(df) == 0:
-        log.warning("no valid rows after coord filter | file_date=%s", file_date.isoformat())
-        return []
 
+def batches_from_records(records: Iterable[Record], size: int) -> Iterator[RecordBatch]:
+    # group a record stream into batches of at most size rows, split on file_date changes
+    strings = StringTable()
+    chunk: list[Record] = []
+    for r in records:
+        if chunk and (len(chunk) >= size or r.file_date != chunk[0].file_date):
+            yield RecordBatch.from_records(chunk, strings)
+            chunk = []
+        chunk.append(r)
+    if chunk:
+        yield RecordBatch.from_records(chunk, strings)
+
+
+class _SeenHashes:
+    # event hashes already emitted for a file, kept as 16-byte md5 digests instead of
+    # 32-char hex strings (~49 vs ~81 bytes per entry)
+    def __init__(self) -> None:
+        self._seen: set[bytes] = set()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def add(self, event_hash: str) -> bool:
+        key = bytes.fromhex(event_hash)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        return True
+
+    def mask_new(self, hashes: Iterable[str]) -> np.ndarray:
+        # first occurrence of each hash is kept, within the batch and across batches
+        return np.fromiter(map(self.add, hashes), dtype=bool)
+
+
+def _clean_column(s: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    # column-wise _clean_value plus the json text of each cleaned value, as object
+    # arrays; every distinct value is cleaned and encoded once, nulls become None/null
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    values: list[Any] = [None if u.strip().lower() in _NULL_TOKENS else u for u in uniques]
+    values.append(None)
+    encoded = ["null" if v is None else json.dumps(v, ensure_ascii=False) for v in values]
+    return np.array(values, dtype=object)[codes], np.array(encoded, dtype=object)[codes]
+
+
+def _number_fragments(values: list[float]) -> np.ndarray:
+    # json.dumps writes ints and floats with their __repr__
+    return np.array([repr(v) for v in values], dtype=object)
+
+
+def _build_records_rowwise(
+    df: pd.DataFrame,
+    file_date: date,
+    lat_col: str,
+    lon_col: str,
+    ts_col: str | None,
+    sat_col: str | None,
+    mun_col: str | None,
+    uf_col: str | None,
+    bio_col: str | None,
+    *,
+    seen: _SeenHashes,
+    strings: StringTable,
+) -> tuple[RecordBatch | None, int, int]:
     recs: list[Record] = []
-    seen_hash: set[str] = set()
     dup_count = 0
     json_fallback = 0
 
@@ -163,10 +299,9 @@ def transform_inpe_csv(path: str, file_date: date) -> list[Record]:
 
         event_hash = hashlib.md5(_json_dumps_safe(payload).encode("utf-8")).hexdigest()
 
-        if event_hash in seen_hash:
+        if not seen.add(event_hash):
             dup_count += 1
             continue
-        seen_hash.add(event_hash)
 
         try:
             props_json = _json_dumps_safe(props)
@@ -190,7 +325,253 @@ def transform_inpe_csv(path: str, file_date: date) -> list[Record]:
             )
         )
 
+    batch = RecordBatch.from_records(recs, strings) if recs else None
+    return batch, dup_count, json_fallback
+
+
+def _build_records_vectorized(
+    df: pd.DataFrame,
+    file_date: date,
+    lat_col: str,
+    lon_col: str,
+    ts_col: str | None,
+    sat_col: str | None,
+    mun_col: str | None,
+    uf_col: str | None,
+    bio_col: str | None,
+    *,
+    seen: _SeenHashes,
+    strings: StringTable,
+) -> tuple[RecordBatch | None, int, int]:
+    # same output as _build_records_rowwise, built one column at a time. the json
+    # text is assembled from per-column fragments laid out exactly like json.dumps
+    # (", " and ": " separators), so event_hash and props_json stay byte-identical.
+
+    lats = df[lat_col].tolist()
+    lons = df[lon_col].tolist()
+    cleaned: dict[str, tuple[np.ndarray, np.ndarray]] = {
+        col: _clean_column(df[col]) for col in df.columns if not pd.api.types.is_numeric_dtype(df[col])
+    }
+
+    payloads = (
+        '{"file_date": ' + json.dumps(str(file_date)) + ', "lat": '
+        + _number_fragments([round(v, 6) for v in lats]) + ', "lon": '
+        + _number_fragments([round(v, 6) for v in lons]) + ', "view_ts": '
+        + (cleaned[ts_col][1] if ts_col else "null") + ', "satelite": '
+        + (cleaned[sat_col][1] if sat_col else "null") + "}"
+    )
+    hashes = np.array([hashlib.md5(p.encode("utf-8")).hexdigest() for p in payloads], dtype=object)
+
+    keep = seen.mask_new(hashes.tolist())
+    dup_count = int(len(keep) - keep.sum())
+    df = df[keep]
+    hashes = hashes[keep]
+    n = len(hashes)
+    if n == 0:
+        return None, dup_count, 0
+
+    cleaned = {col: (values[keep], encoded[keep]) for col, (values, encoded) in cleaned.items()}
+
+    # one ", ".join per row over "key: value" fragment columns, wrapped in braces
+    parts = []
+    for col in df.columns:
+        frag = cleaned[col][1] if col in cleaned else _number_fragments(df[col].tolist())
+        parts.append((json.dumps(str(col), ensure_ascii=False) + ": " + frag).tolist())
+    props_json = ["{" + body + "}" for body in map(", ".join, zip(*parts))]
+
+    def _text(name: str | None) -> list[str | None]:
+        return cleaned[name][0].tolist() if name else [None] * n
+
+    def _codes(name: str | None) -> np.ndarray:
+        return strings.encode(cleaned[name][0]) if name else np.full(n, -1, dtype=np.int32)
+
+    batch = RecordBatch(
+        file_date=file_date,
+        event_hash=hashes.tolist(),
+        view_ts=_text(ts_col),
+        satelite=_codes(sat_col),
+        municipio=_codes(mun_col),
+        estado=_codes(uf_col),
+        bioma=_codes(bio_col),
+        lat=np.array(lats, dtype=np.float64)[keep],
+        lon=np.array(lons, dtype=np.float64)[keep],
+        props_json=props_json,
+        strings=strings,
+    )
+    return batch, dup_count, 0
+
+
+@dataclass(frozen=True)
+class CsvProbe:
+    encoding: str
+    sep: str
+    header: tuple[str, ...]
+
+
+_PROBE_BYTES = 64 * 1024
+
+# resolved column mapping per normalized header; INPE files share a handful of layouts
+_COLS_CACHE: dict[tuple[str, ...], tuple[str | None, ...]] = {}
+
+
+def probe_csv(path: Path) -> CsvProbe:
+    # encoding and delimiter from the first bytes, so the C parser can skip sniffing
+    with path.open("rb") as handle:
+        raw = handle.read(_PROBE_BYTES)
+
+    encoding = "utf-8"
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(raw, final=False)
+    except UnicodeDecodeError:
+        encoding = "latin-1"
+
+    text = raw.decode(encoding, errors="ignore").lstrip("\ufeff")
+    lines = text.splitlines()
+    first_line = lines[0] if lines else ""
+    # same rule as read_csv(sep=None): sniff the delimiter from the header line only
+    sep = csv.Sniffer().sniff(first_line).delimiter
+    header = tuple(next(csv.reader([first_line], delimiter=sep)))
+    return CsvProbe(encoding=encoding, sep=sep, header=header)
+
+
+def _read_csv_chunks(p: Path, batch_size: int):
+    try:
+        probe = probe_csv(p)
+    except csv.Error as exc:
+        # no clear delimiter in the header line; let the python engine deal with it
+        log.warning("csv probe failed | path=%s | err=%s | engine=python", p.as_posix(), exc)
+        return pd.read_csv(p, sep=None, engine="python", dtype=str, chunksize=batch_size)
+
+    log.debug("csv probe | path=%s | encoding=%s | sep=%r | cols=%s", p.as_posix(), probe.encoding, probe.sep, len(probe.header))
+    # no usecols: props keeps the full row, so every column is needed. all are read as
+    # str, which skips type inference and keeps the values the python engine produced
+    return pd.read_csv(
+        p,
+        sep=probe.sep,
+        engine="c",
+        encoding=probe.encoding,
+        dtype=str,
+        chunksize=batch_size,
+    )
+
+
+def _pick_cols(columns: Iterable[str]) -> tuple[str | None, ...]:
+    key = tuple(columns)
+    cached = _COLS_CACHE.get(key)
+    if cached is not None:
+        log.debug("columns cached | lat=%s | lon=%s | ts=%s | sat=%s | mun=%s | uf=%s | bioma=%s", *cached)
+        return cached
+
+    lat_col = _find_col(key, preferred=["lat", "latitude"], contains=["lat"])
+    lon_col = _find_col(key, preferred=["lon", "long", "longitude"], contains=["lon", "long"])
+    if not lat_col or not lon_col:
+        log.error("missing lat/lon columns | cols=%s", list(key)[:80])
+        raise ValueError(f"não encontrei colunas de lat/lon. colunas: {list(key)[:80]}")
+
+    ts_col = _find_col(key, preferred=["datahora", "data_hora_gmt", "data_hora"], contains=["datahora", "hora", "gmt"])
+    sat_col = _find_col(key, preferred=["satelite"], contains=["satel"])
+    mun_col = _find_col(key, preferred=["municipio"], contains=["municip"])
+    uf_col = _find_col(key, preferred=["estado", "uf"], contains=["estado", "uf"])
+    bio_col = _find_col(key, preferred=["bioma"], contains=["bioma"])
+
+    log.info(
+        "columns picked | lat=%s | lon=%s | ts=%s | sat=%s | mun=%s | uf=%s | bioma=%s",
+        lat_col,
+        lon_col,
+        ts_col,
+        sat_col,
+        mun_col,
+        uf_col,
+        bio_col,
+    )
+    cols = (lat_col, lon_col, ts_col, sat_col, mun_col, uf_col, bio_col)
+    _COLS_CACHE[key] = cols
+    return cols
+
+
+def iter_inpe_csv(
+    path: str,
+    file_date: date,
+    *,
+    batch_size: int | None = None,
+    vectorized: bool = True,
+) -> Iterator[RecordBatch]:
+    # parse, clean, and shape records from INPE CSV, batch_size input rows at a time;
+    # only one chunk of the file is held in memory, dedup spans the whole file
+    p = Path(path)
+    batch_size = batch_size or settings.transform_batch_size
+
+    log.info("transform start | file_date=%s | path=%s | batch_size=%s", file_date.isoformat(), p.as_posix(), batch_size)
+    try:
+        reader = _read_csv_chunks(p, batch_size)
+    except Exception:
+        log.exception("read_csv failed | path=%s", p.as_posix())
+        raise
+
+    cols: tuple[str | None, ...] | None = None
+    seen = _SeenHashes()
+    strings = StringTable()
+    rows_in = dropped_na = dropped_range = 0
+    n_records = dup_count = json_fallback = n_batches = 0
+
+    with reader:
+        for df in reader:
+            df = _norm_cols(df)
+
+            if cols is None:
+                cols = _pick_cols(df.columns)
+            lat_col, lon_col = cols[0], cols[1]
+
+            rows_in += len(df)
+
+            df[lat_col] = _to_float(df[lat_col])
+            df[lon_col] = _to_float(df[lon_col])
+
+            before_dropna = len(df)
+            df = df.dropna(subset=[lat_col, lon_col])
+            dropped_na += before_dropna - len(df)
+
+            before_range = len(df)
+            df = df[(df[lat_col].between(-90, 90)) & (df[lon_col].between(-180, 180))]
+            dropped_range += before_range - len(df)
+
+            if len(df) == 0:
+                continue
+
+            # the column-wise builder needs unique names (to_dict would collapse duplicates)
+            if vectorized and df.columns.is_unique:
+                batch, dups, fallback = _build_records_vectorized(df, file_date, *cols, seen=seen, strings=strings)
+            else:
+                batch, dups, fallback = _build_records_rowwise(df, file_date, *cols, seen=seen, strings=strings)
+
+            dup_count += dups
+            json_fallback += fallback
+            if batch is None:
+                continue
+            n_batches += 1
+            n_records += len(batch)
+            log.debug("transform batch | idx=%s | records=%s | dup=%s", n_batches, len(batch), dups)
+            yield batch
+
+    log.info(
+        "coord filter | rows_in=%s | dropped_na=%s | dropped_range=%s | rows_out=%s",
+        rows_in,
+        dropped_na,
+        dropped_range,
+        rows_in - dropped_na - dropped_range,
+    )
+    if n_records == 0:
+        log.warning("no valid rows after coord filter | file_date=%s", file_date.isoformat())
+
+    log.info(
+        "transform done | records=%s | dup_in_file=%s | json_fallback=%s | batches=%s",
+        n_records,
+        dup_count,
+        json_fallback,
+        n_batches,
+    )
 
-    log.info("transform done | records=%s | dup_in_file=%s | json_fallback=%s", len(recs), dup_count, json_fallback)
 
-    return recs
+def transform_inpe_csv(path: str, file_date: date, *, vectorized: bool = True) -> list[Record]:
+    # materialized variant of iter_inpe_csv
+    return [r for batch in iter_inpe_csv(path, file_date, vectorized=vectorized) for r in batch.records()]
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from ..config import settings
+from .inpe_focos_diario import RecordBatch, iter_inpe_csv
+
+_filename = Path(__file__).stem
+log = logging.getLogger(_filename)
+
+
+@dataclass(frozen=True)
+class DayTransform:
+    file_date: date
+    path: Path
+    batches: list[RecordBatch]
+    rows: int
+    dt: float
+
+
+def _transform_worker(path: str, file_date: date) -> DayTransform:
+    # batches travel back pickled: their columns are lists of str and numpy arrays, which
+    # pickle serializes in bulk
+    t0 = time.perf_counter()
+    batches = list(iter_inpe_csv(path, file_date=file_date))
+    return DayTransform(file_date, Path(path), batches, sum(len(b) for b in batches), time.perf_counter() - t0)
+
+
+def raw_csv_path(d: date, input_dir: Path | None = None) -> Path:
+    base = input_dir or Path(settings.data_dir) / "raw" / "inpe" / "focos" / "diario_brasil"
+    return base / f"{d.isoformat()}.csv"
+
+
+def transform_files(
+    items: Iterable[tuple[date, Path]],
+    *,
+    workers: int | None = None,
+) -> Iterator[DayTransform]:
+    # transform local csv files across a process pool, yielding days in input order;
+    # at most 2 * workers finished days wait in the parent at any time
+    items = list(items)
+    workers = workers or settings.transform_workers or os.cpu_count() or 1
+
+    log.info("transform range start | days=%s | workers=%s", len(items), workers)
+    t0 = time.perf_counter()
+    rows = 0
+    window = max(2 * workers, 1)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: list[Future] = []
+        todo = iter(items)
+        try:
+            for d, path in todo:
+                pending.append(pool.submit(_transform_worker, str(path), d))
+                if len(pending) < window:
+                    continue
+                day = pending.pop(0).result()
+                rows += day.rows
+                yield day
+            while pending:
+                day = pending.pop(0).result()
+                rows += day.rows
+                yield day
+        finally:
+            for fut in pending:
+                fut.cancel()
+
+    dt = time.perf_counter() - t0
+    log.info(
+        "transform range done | days=%s | rows=%s | dt=%.2fs | rows_per_sec=%.0f",
+        len(items),
+        rows,
+        dt,
+        rows / dt if dt > 0 else 0.0,
+    )
+
+
+def transform_range(
+    start: date,
+    end: date,
+    *,
+    workers: int | None = None,
+    input_dir: Path | None = None,
+) -> Iterator[DayTransform]:
+    # offline: only days whose csv is already on disk (raw cache or input_dir) are transformed
+    items: list[tuple[date, Path]] = []
+    d = start
+    while d <= end:
+        path = raw_csv_path(d, input_dir)
+        if path.exists():
+            items.append((d, path))
+        else:
+            log.warning("transform range missing csv | date=%s | path=%s", d.isoformat(), path.as_posix())
+        d += timedelta(days=1)
+    return transform_files(items, workers=workers)
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import logging
+import time
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import psycopg
+
+from .inpe_focos_diario import RecordBatch
+
+_filename = Path(__file__).stem
+log = logging.getLogger(_filename)
+
+
+def require_shapely():
+    # shapely is optional: pip install "inpe-queimadas-etl[spatial]"
+    try:
+        import shapely  # type: ignore
+    except ImportError as exc:
+        raise RuntimeError("the python enrich engine needs shapely>=2 (pip install 'inpe-queimadas-etl[spatial]')") from exc
+    if int(shapely.__version__.split(".")[0]) < 2:
+        raise RuntimeError(f"the python enrich engine needs shapely>=2 (found {shapely.__version__})")
+    return shapely
+
+
+def has_shapely() -> bool:
+    try:
+        require_shapely()
+    except RuntimeError:
+        return False
+    return True
+
+
+# attribution columns per row. ref_bioma is the reference bioma; on insert the source bioma
+# wins over it, as in sql/enrich/20_enrich_focos.sql
+ENRICH_FIELDS = (
+    "mun_cd_mun",
+    "mun_nm_mun",
+    "mun_uf",
+    "mun_area_km2",
+    "cd_bioma",
+    "ref_bioma",
+    "uc_id",
+    "cd_cnuc",
+    "nome_uc",
+    "terrai_cod",
+    "terrai_nom",
+    "etnia_nome",
+)
+
+# nearest-municipality fallback radius (geodesic metres) and the sphere used to measure it
+MUN_FALLBACK_M = 2000.0
+_EARTH_RADIUS_M = 6_371_008.8
+
+# same reference tables and tie-breaks as the sql path: municipality pieces by cd_mun,
+# bioma/uc/ti pieces by id. rows come back ordered, so tree index order is id order.
+_MUN_SQL = "select cd_mun, st_asbinary(geom) from ref.ibge_municipios_sub order by id"
+_MUN_ATTR_SQL = "select cd_mun, nm_mun, uf, area_km2 from ref.ibge_municipios"
+_LAYER_SQL = {
+    "bioma": (
+        ("cd_bioma", "ref_bioma"),
+        "select cd_bioma::text, bioma::text, st_asbinary(geom) from ref.biomas_4326_sub where geom is not null order by id",
+    ),
+    "uc": (
+        ("uc_id", "cd_cnuc", "nome_uc"),
+        "select uc_id::text, cd_cnuc::text, nome_uc::text, st_asbinary(geom) from ref.ucs_4326_sub where geom is not null order by id",
+    ),
+    "ti": (
+        ("terrai_cod", "terrai_nom", "etnia_nome"),
+        "select terrai_cod::text, terrai_nom::text, etnia_nome::text, st_asbinary(geom) from ref.tis_4326_sub where geom is not null order by id",
+    ),
+}
+_MUN_FIELDS = ("mun_cd_mun", "mun_nm_mun", "mun_uf", "mun_area_km2")
+
+# fingerprint stamps written by ref refreshes (sql/ref/06_, 07_): they move only when the
+# municipality pieces are rebuilt or a bioma/uc/ti layer's content changes
+_REF_VERSION_SQL = """
+select
+  (select max(built_at) from ref.ibge_municipios_sub_src),
+  (select max(built_at) from ref.ref_layers_sub_src)
+"""
+
+
+class _Layer:
+    # one STRtree over reference pieces; attrs holds one row of attribute values per piece
+    # (object array, None where missing) and rank the sql "order by" among overlapping pieces
+    def __init__(self, name: str, fields: tuple[str, ...], geoms: np.ndarray, attrs: np.ndarray, rank: np.ndarray) -> None:
+        shapely = require_shapely()
+        self.name = name
+        self.fields = fields
+        self.geoms = geoms
+        self.attrs = attrs
+        self.rank = rank
+        self.tree = shapely.STRtree(geoms)
+
+    def __len__(self) -> int:
+        return len(self.geoms)
+
+    def first_hit(self, points: np.ndarray) -> np.ndarray:
+        # tree index of the first intersecting piece per point (sql tie-break), -1 for none
+        hit = np.full(len(points), -1, dtype=np.int64)
+        if not len(self) or not len(points):
+            return hit
+        inp, tree = self.tree.query(points, predicate="intersects")
+        if not len(inp):
+            return hit
+        order = np.lexsort((self.rank[tree], inp))
+        inp, tree = inp[order], tree[order]
+        first = np.ones(len(inp), dtype=bool)
+        first[1:] = inp[1:] != inp[:-1]
+        hit[inp[first]] = tree[first]
+        return hit
+
+    def take(self, hit: np.ndarray) -> dict[str, np.ndarray]:
+        # attribute columns for hit indexes; -1 maps to None
+        out: dict[str, np.ndarray] = {}
+        found = hit >= 0
+        for j, name in enumerate(self.fields):
+            col = np.full(len(hit), None, dtype=object)
+            if len(self):
+                col[found] = self.attrs[hit[found], j]
+            out[name] = col
+        return out
+
+
+def _haversine_m(lon1: np.ndarray, lat1: np.ndarray, lon2: np.ndarray, lat2: np.ndarray) -> np.ndarray:
+    lon1, lat1, lon2, lat2 = (np.radians(a) for a in (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * _EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _read_layer(cur: psycopg.Cursor, query: str) -> tuple[np.ndarray, np.ndarray]:
+    shapely = require_shapely()
+    cur.execute(query)
+    rows = cur.fetchall()
+    geoms = shapely.from_wkb(np.array([bytes(r[-1]) for r in rows], dtype=object))
+    attrs = np.empty((len(rows), len(rows[0]) - 1 if rows else 0), dtype=object)
+    for i, r in enumerate(rows):
+        attrs[i, :] = r[:-1]
+    return geoms, attrs
+
+
+class SpatialEngine:
+    # in-process point-in-polygon for enrichment: the subdivided reference layers are read once
+    # into shapely STRtrees and whole batches are attributed with vectorized tree queries.
+    # same rules as sql/enrich/20_enrich_focos.sql: lowest cd_mun (or piece id) on overlaps,
+    # nearest municipality within 2 km for unmatched points. the fallback distance is measured
+    # on a sphere to the planar nearest point, so points within a few metres of the 2 km edge
+    # may differ from postgis' spheroid distance.
+    def __init__(self, mun: _Layer, layers: list[_Layer], mun_attrs: dict[str, tuple]) -> None:
+        self.mun = mun
+        self.layers = layers
+        self.mun_attrs = mun_attrs
+
+    @classmethod
+    def from_db(cls, conn: psycopg.Connection) -> SpatialEngine:
+        t0 = time.perf_counter()
+        with conn.cursor() as cur:
+            cur.execute(_MUN_ATTR_SQL)
+            mun_attrs = {row[0]: tuple(row) for row in cur.fetchall()}
+
+            geoms, keys = _read_layer(cur, _MUN_SQL)
+            cd_mun = keys[:, 0] if len(keys) else np.empty(0, dtype=object)
+            # a piece keyed to a municipality missing from ref.ibge_municipios still matches, with null attributes
+            attrs = np.array([mun_attrs.get(cd, (None,) * len(_MUN_FIELDS)) for cd in cd_mun], dtype=object).reshape(-1, len(_MUN_FIELDS))
+            rank = np.unique(cd_mun.astype(str), return_inverse=True)[1] if len(cd_mun) else np.empty(0, dtype=np.int64)
+            mun = _Layer("mun", _MUN_FIELDS, geoms, attrs, rank)
+
+            layers = []
+            for name, (fields, query) in _LAYER_SQL.items():
+                geoms, attrs = _read_layer(cur, query)
+                layers.append(_Layer(name, fields, geoms, attrs, np.arange(len(geoms))))
+
+        log.info(
+            "spatial engine loaded | %s | dt=%.2fs",
+            " | ".join(f"{layer.name}={len(layer)}" for layer in (mun, *layers)),
+            time.perf_counter() - t0,
+        )
+        return cls(mun, layers, mun_attrs)
+
+    def _mun_hits(self, points: np.ndarray, lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+        shapely = require_shapely()
+        hit = self.mun.first_hit(points)
+        unmatched = np.flatnonzero(hit < 0)
+        if not len(unmatched) or not len(self.mun):
+            return hit
+        inp, tree = self.mun.tree.query_nearest(points[unmatched], all_matches=False)
+        line = shapely.shortest_line(points[unmatched[inp]], self.mun.geoms[tree])
+        ends = shapely.get_coordinates(line).reshape(-1, 2, 2)
+        dist = _haversine_m(lon[unmatched[inp]], lat[unmatched[inp]], ends[:, 1, 0], ends[:, 1, 1])
+        near = dist <= MUN_FALLBACK_M
+        hit[unmatched[inp[near]]] = tree[near]
+        return hit
+
+    def attribute(self, lon: np.ndarray, lat: np.ndarray) -> dict[str, np.ndarray]:
+        # ENRICH_FIELDS columns (object arrays) for the given points
+        shapely = require_shapely()
+        points = shapely.points(lon, lat)
+        out = self.mun.take(self._mun_hits(points, lon, lat))
+        for layer in self.layers:
+            out.update(layer.take(layer.first_hit(points)))
+        return out
+
+    def attribute_batch(self, batch: RecordBatch) -> dict[str, np.ndarray]:
+        return self.attribute(batch.lon, batch.lat)
+
+    def rows(self, batch: RecordBatch) -> Iterator[tuple]:
+        # attribution tuples in ENRICH_FIELDS order, aligned with batch.iter_rows
+        cols = self.attribute_batch(batch)
+        return zip(*(cols[name].tolist() for name in ENRICH_FIELDS))
+
+
+# per process: loaded once, reloaded only when the reference data changes
+_shared: dict = {}
+
+
+def shared_engine(conn: psycopg.Connection) -> SpatialEngine:
+    with conn.cursor() as cur:
+        cur.execute(_REF_VERSION_SQL)
+        version = tuple(cur.fetchone())
+    if _shared.get("version") != version or "engine" not in _shared:
+        _shared["engine"] = SpatialEngine.from_db(conn)
+        _shared["version"] = version
+    return _shared["engine"]
@@ -225,7 +225,7 @@ def main(argv: list[str] | None = None) -> None:
         format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
     )
 
-    vars_dict = {"DATE": args.date} if args.date else None
+    vars_dict = {"DATE": args.date, "START": args.date, "END": args.date} if args.date else None
     repo_root = _repo_root()
 
     if args.apply_minimal:
@@ -241,7 +241,9 @@ def main(argv: list[str] | None = None) -> None:
     )
     stats_runtime_core = _apply_files(
         [
-            repo_root / "sql" / "enrich" / "20_enrich_municipio.sql",
+            repo_root / "sql" / "ref" / "06_ref_municipios_sub.sql",
+            repo_root / "sql" / "enrich" / "10_enrich_schema.sql",
+            repo_root / "sql" / "enrich" / "20_enrich_focos.sql",
             repo_root / "sql" / "marts" / "10_focos_diario_municipio.sql",
             repo_root / "sql" / "marts" / "20_focos_diario_uf.sql",
         ],
@@ -35,7 +35,10 @@ REQUIRED_SQL_FILES = [
     "sqlm/marts/canonical/055_v_focos_enriched_full.sql",
     "sqlm/marts/canonical/060_v_chart_focos_scatter.sql",
     "sqlm/marts/canonical/065_mv_focos_day_dim.sql",
-    "sql/enrich/20_enrich_municipio.sql",
+    "sql/ref/06_ref_municipios_sub.sql",
+    "sql/ref/07_ref_layers_src.sql",
+    "sql/enrich/10_enrich_schema.sql",
+    "sql/enrich/20_enrich_focos.sql",
     "sql/marts/10_focos_diario_municipio.sql",
     "sql/marts/20_focos_diario_uf.sql",
     "sql/checks/010_superset_uf_choropleth.sql",
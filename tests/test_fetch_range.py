@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from etl.config import settings
+from etl.extract import inpe_focos_diario as extract
+
+HEADER = "id;lat;lon;data_hora_gmt;satelite\n"
+
+
+def _csv(days: list[date], per_day: int = 3) -> bytes:
+    rows = [f"{d:%Y%m%d}{i};-10.{i};-50.{i};{d.isoformat()} 1{i}:00:00;AQUA_M-T\n" for d in days for i in range(per_day)]
+    return (HEADER + "".join(rows)).encode()
+
+
+class _Inpe(BaseHTTPRequestHandler):
+    # stand-in for the INPE dataserver: static files, injected 503s, Range/If-Range, If-None-Match
+    files: dict[str, bytes] = {}
+    etags: dict[str, str] = {}
+    fail_first: Counter = Counter()
+    hits: Counter = Counter()
+    seen: list[tuple[str, dict[str, str]]] = []
+    lock = threading.Lock()
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        with self.lock:
+            self.hits[self.path] += 1
+            self.seen.append((self.path, dict(self.headers)))
+            fail = self.fail_first[self.path] > 0
+            if fail:
+                self.fail_first[self.path] -= 1
+        if fail:
+            self.send_error(503)
+            return
+        body = self.files.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        etag = self.etags.get(self.path)
+        if etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        rng = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if rng and (if_range is None or if_range == etag):
+            offset = int(rng.split("=", 1)[1].rstrip("-"))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {offset}-{len(body) - 1}/{len(body)}")
+            body = body[offset:]
+        else:
+            self.send_response(200)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def inpe(tmp_path, monkeypatch):
+    _Inpe.files, _Inpe.etags, _Inpe.fail_first, _Inpe.hits, _Inpe.seen = {}, {}, Counter(), Counter(), []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Inpe)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "inpe_base_url", f"{base}/diario/Brasil")
+    monkeypatch.setattr(settings, "inpe_monthly_base_url", f"{base}/mensal/Brasil")
+    monkeypatch.setattr(settings, "inpe_retention_days", 45)
+    yield _Inpe
+    server.shutdown()
+    server.server_close()
+
+
+def _daily_url(d: date) -> str:
+    return f"/diario/Brasil/focos_diario_br_{d:%Y%m%d}.csv"
+
+
+def _monthly_url(month: date) -> str:
+    return f"/mensal/Brasil/focos_mensal_br_{month:%Y%m}.csv"
+
+
+def test_plan_range_splits_at_retention_cutoff(monkeypatch):
+    monkeypatch.setattr(settings, "inpe_retention_days", 45)
+    cutoff = date.today() - timedelta(days=45)
+    start, end = cutoff - timedelta(days=40), cutoff + timedelta(days=3)
+
+    plan = extract.plan_range(start, end)
+
+    assert plan.daily == [cutoff + timedelta(days=i) for i in range(1, 4)]
+    assert plan.monthly == sorted({d.replace(day=1) for d in plan.monthly_days})
+    monthly = [d for days in plan.monthly_days.values() for d in days]
+    assert sorted(monthly) == [start + timedelta(days=i) for i in range(41)]
+    for month, days in plan.monthly_days.items():
+        assert all(d.replace(day=1) == month for d in days)
+
+
+def test_fetch_range_retries_transient_errors(inpe):
+    d = date.today() - timedelta(days=3)
+    inpe.files[_daily_url(d)] = _csv([d])
+    inpe.fail_first[_daily_url(d)] = 2
+
+    results = extract.fetch_range(d, d, concurrency=2, retries=3, base_delay=0)
+
+    assert isinstance(results[d], extract.ExtractResult)
+    assert results[d].path.read_bytes() == _csv([d])
+    assert inpe.hits[_daily_url(d)] == 3
+
+
+def test_fetch_range_gives_up_after_retries(inpe):
+    d = date.today() - timedelta(days=3)
+    inpe.files[_daily_url(d)] = _csv([d])
+    inpe.fail_first[_daily_url(d)] = 5
+
+    results = extract.fetch_range(d, d, concurrency=1, retries=2, base_delay=0)
+
+    assert isinstance(results[d], requests.HTTPError)
+    assert inpe.hits[_daily_url(d)] == 3
+
+
+def test_fetch_range_does_not_retry_not_found(inpe):
+    d = date.today() - timedelta(days=3)
+
+    results = extract.fetch_range(d, d, concurrency=1, retries=3, base_delay=0)
+
+    # daily 404 falls back to the monthly candidates, each asked once
+    assert isinstance(results[d], FileNotFoundError)
+    assert inpe.hits[_daily_url(d)] == 1
+    assert inpe.hits[_monthly_url(d)] == 1
+
+
+def test_fetch_range_concurrent_months(inpe):
+    jan = [date(2020, 1, 1) + timedelta(days=i) for i in range(31)]
+    feb = [date(2020, 2, 1) + timedelta(days=i) for i in range(10)]
+    inpe.files[_monthly_url(jan[0])] = _csv(jan)
+    inpe.files[_monthly_url(feb[0])] = _csv(feb)
+
+    results = extract.fetch_range(jan[0], feb[-1], concurrency=4, retries=0, base_delay=0)
+
+    assert sorted(results) == jan + feb
+    for d, ex in results.items():
+        assert isinstance(ex, extract.ExtractResult), (d, ex)
+        assert ex.path.read_text().splitlines() == _csv([d]).decode().splitlines()
+    # each month downloaded and split once; no daily requests for months the monthly file holds
+    assert inpe.hits[_monthly_url(jan[0])] == 1
+    assert inpe.hits[_monthly_url(feb[0])] == 1
+    assert not [p for p in inpe.hits if p.startswith("/diario/")]
+
+
+def test_download_resumes_partial_file_with_if_range(inpe, tmp_path):
+    body = _csv([date(2020, 1, 1)], per_day=200)
+    inpe.files["/mensal/file.csv"] = body
+    inpe.etags["/mensal/file.csv"] = '"v1"'
+    out = tmp_path / "file.csv"
+    part = extract._part_path(out)
+    part.write_bytes(body[:1000])
+    extract._write_meta(part, {"etag": '"v1"'})
+    url = settings.inpe_monthly_base_url.rsplit("/", 1)[0] + "/file.csv"
+
+    with requests.Session() as session:
+        assert extract._download_file(url, out, timeout=5, session=session)
+
+    assert out.read_bytes() == body
+    assert not part.exists()
+    _, headers = inpe.seen[-1]
+    assert headers["Range"] == "bytes=1000-"
+    assert headers["If-Range"] == '"v1"'
+
+
+def test_download_discards_partial_file_of_changed_resource(inpe, tmp_path):
+    old = _csv([date(2020, 1, 1)], per_day=200)
+    new = _csv([date(2020, 1, 2)], per_day=250)
+    inpe.files["/mensal/file.csv"] = new
+    inpe.etags["/mensal/file.csv"] = '"v2"'
+    out = tmp_path / "file.csv"
+    part = extract._part_path(out)
+    part.write_bytes(old[:1000])
+    extract._write_meta(part, {"etag": '"v1"'})
+    url = settings.inpe_monthly_base_url.rsplit("/", 1)[0] + "/file.csv"
+
+    with requests.Session() as session:
+        assert extract._download_file(url, out, timeout=5, session=session)
+
+    assert out.read_bytes() == new
+    assert extract._read_meta(out)["etag"] == '"v2"'
+
+
+class _TrackingSession(requests.Session):
+    # records whether every response handed out was closed
+    def __init__(self) -> None:
+        super().__init__()
+        self.responses: list[requests.Response] = []
+
+    def get(self, *args, **kwargs) -> requests.Response:
+        r = super().get(*args, **kwargs)
+        r.closed_by_caller = False
+        close = r.close
+
+        def tracked_close() -> None:
+            r.closed_by_caller = True
+            close()
+
+        r.close = tracked_close
+        self.responses.append(r)
+        return r
+
+
+def test_download_part_closes_not_found_response(inpe, tmp_path):
+    url = settings.inpe_monthly_base_url.rsplit("/", 1)[0] + "/missing.csv"
+
+    with _TrackingSession() as session:
+        assert not extract._download_file(url, tmp_path / "missing.csv", timeout=5, session=session)
+
+    assert session.responses and all(r.closed_by_caller for r in session.responses)
+
+
+def test_daily_conditional_get_closes_its_responses(inpe, monkeypatch):
+    monkeypatch.setattr(settings, "inpe_revalidate_days", 2)
+    d = date.today()
+    inpe.files[_daily_url(d)] = _csv([d])
+    inpe.etags[_daily_url(d)] = '"v1"'
+
+    with _TrackingSession() as session:
+        extract.download_daily_csv(d, session=session)
+        # recent day, unchanged: revalidated with If-None-Match, answered 304
+        extract.download_daily_csv(d, session=session)
+        del inpe.files[_daily_url(d)]
+        # daily 404, then the monthly fallback finds nothing either
+        with pytest.raises((requests.HTTPError, FileNotFoundError)):
+            extract.download_daily_csv(d, force=True, session=session)
+
+    assert [r.status_code for r in session.responses[:3]] == [200, 304, 404]
+    assert all(r.closed_by_caller for r in session.responses)
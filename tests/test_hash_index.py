@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+
+from etl.config import settings
+from etl.load import hash_index
+from etl.load.hash_index import HashIndex, batch_digests, index_path
+from etl.transform.inpe_focos_diario import iter_inpe_csv
+
+CSV = """lat;lon;data_hora_gmt;satelite
+-11.5;-52.1;2024-08-01 10:00:00;AQUA_M-T
+-11.6;-52.2;2024-08-01 10:05:00;AQUA_M-T
+-11.7;-52.3;2024-08-01 10:10:00;NOAA-20
+"""
+
+DAY = date(2024, 8, 1)
+
+
+def _batch(tmp_path):
+    path = tmp_path / "focos.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return next(iter(iter_inpe_csv(str(path), file_date=DAY)))
+
+
+def test_index_file_is_trusted_only_under_its_marker(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    digests = np.sort(batch_digests(_batch(tmp_path)))
+    hash_index._write(index_path(DAY), digests, "token-a:1:2:3")
+
+    assert np.array_equal(hash_index._read(index_path(DAY), "token-a:1:2:3"), digests)
+    # token replaced by a reset, or a table oid changed by a dropped schema
+    assert hash_index._read(index_path(DAY), "token-b:1:2:3") is None
+    assert hash_index._read(index_path(DAY), "token-a:1:9:3") is None
+    # separate file per target table set
+    assert hash_index._read(index_path(DAY, enriched=True), "token-a:1:2:3") is None
+
+
+def test_filter_drops_known_rows_and_commit_merges_sent(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    batch = _batch(tmp_path)
+    digests = batch_digests(batch)
+    index = HashIndex("", enriched=True)
+    index._known[DAY] = np.sort(digests[:1])
+    index._markers[DAY] = "m"
+
+    out = list(index.filter([batch]))
+
+    assert [b.event_hash for b in out] == [batch.event_hash[1:]]
+    assert index.rows[DAY] == 3 and index.skipped[DAY] == 1
+    index.commit()
+    assert np.array_equal(hash_index._read(index_path(DAY, enriched=True), "m"), np.sort(digests))
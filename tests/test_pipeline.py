@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import threading
+
+from etl.pipeline import Stage, run_pipeline
+
+ITEMS = [f"2024-08-{d:02d}" for d in range(1, 11)]
+
+
+def _run(stages, on_done, on_fail):
+    # run_pipeline in a thread, so a wedged pipeline fails the test instead of hanging it
+    out: dict = {}
+    thread = threading.Thread(
+        target=lambda: out.setdefault("stats", run_pipeline(ITEMS, stages, on_done=on_done, on_fail=on_fail, queue_size=1)),
+        daemon=True,
+    )
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive(), "run_pipeline did not return"
+    return out["stats"]
+
+
+def _boom(*_args):
+    raise OSError("state file not writable")
+
+
+def test_raising_callbacks_do_not_wedge_the_pipeline():
+    def flaky(item, payload):
+        if item.endswith("3"):
+            raise ValueError("bad day")
+        return item
+
+    stats = _run([Stage("a", lambda item, payload: item), Stage("b", flaky)], _boom, _boom)
+
+    assert [st.items for st in stats] == [10, 9]
+    assert stats[1].failed == 1
+    # every on_done and the on_fail raised; all were counted and the last stage kept draining
+    assert stats[1].callback_failed == 10
+
+
+def test_dead_stage_fails_its_queued_items_and_releases_upstream(monkeypatch):
+    import etl.pipeline as pipeline
+
+    real = pipeline._stage_loop
+
+    def dying_loop(stage, *args):
+        if stage.name == "b":
+            raise RuntimeError("stage thread crashed")
+        real(stage, *args)
+
+    monkeypatch.setattr(pipeline, "_stage_loop", dying_loop)
+    done: list[str] = []
+    failed: list[str] = []
+
+    stats = _run(
+        [Stage("a", lambda item, payload: item), Stage("b", lambda item, payload: item)],
+        lambda item, result: done.append(item),
+        lambda item, stage, exc: failed.append(item),
+    )
+
+    assert done == []
+    assert failed == ITEMS
+    assert stats[0].items == 10
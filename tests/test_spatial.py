@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+shapely = pytest.importorskip("shapely", minversion="2")
+
+from etl.transform import spatial
+from etl.transform.spatial import _LAYER_SQL, _MUN_ATTR_SQL, _MUN_SQL, _REF_VERSION_SQL, SpatialEngine, shared_engine
+
+# two overlapping unit squares at the equator; 0.01 degree of longitude is ~1.1 km there
+WEST = shapely.box(0.0, 0.0, 1.0, 1.0)
+EAST = shapely.box(0.5, 0.0, 1.5, 1.0)
+
+
+class _Cursor:
+    def __init__(self, results: dict[str, list]) -> None:
+        self.results = results
+        self.rows: list = []
+
+    def __enter__(self) -> _Cursor:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+    def execute(self, query: str) -> None:
+        self.rows = self.results[query]
+
+    def fetchall(self) -> list:
+        return self.rows
+
+    def fetchone(self) -> tuple:
+        return self.rows[0]
+
+
+class _Conn:
+    # answers the engine's reference queries from in-memory rows
+    def __init__(self, results: dict[str, list]) -> None:
+        self.results = results
+
+    def cursor(self) -> _Cursor:
+        return _Cursor(self.results)
+
+
+def _wkb(geom) -> bytes:
+    return shapely.to_wkb(geom)
+
+
+def _ref_rows() -> dict[str, list]:
+    return {
+        _MUN_ATTR_SQL: [("1", "Leste", "AA", 10.0), ("2", "Oeste", "BB", 20.0)],
+        # piece ids follow row order: the west piece (cd_mun 2) comes first
+        _MUN_SQL: [("2", _wkb(WEST)), ("1", _wkb(EAST))],
+        _LAYER_SQL["bioma"][1]: [("9", "Nove", _wkb(WEST)), ("1", "Um", _wkb(EAST))],
+        _LAYER_SQL["uc"][1]: [],
+        _LAYER_SQL["ti"][1]: [("7", "Terra", "Povo", _wkb(EAST))],
+    }
+
+
+def _attribute(points: list[tuple[float, float]]) -> dict[str, list]:
+    engine = SpatialEngine.from_db(_Conn(_ref_rows()))
+    lon = np.array([p[0] for p in points])
+    lat = np.array([p[1] for p in points])
+    return {name: col.tolist() for name, col in engine.attribute(lon, lat).items()}
+
+
+def test_overlaps_pick_lowest_cd_mun_and_lowest_piece_id():
+    out = _attribute([(0.75, 0.5), (0.25, 0.5), (1.25, 0.5)])
+
+    # municipalities: lowest cd_mun wins, whatever the piece order
+    assert out["mun_cd_mun"] == ["1", "2", "1"]
+    assert out["mun_nm_mun"] == ["Leste", "Oeste", "Leste"]
+    assert out["mun_area_km2"] == [10.0, 20.0, 10.0]
+    # other layers: lowest piece id wins, whatever the key value
+    assert out["cd_bioma"] == ["9", "9", "1"]
+    assert out["ref_bioma"] == ["Nove", "Nove", "Um"]
+    assert out["terrai_cod"] == ["7", None, "7"]
+    assert out["uc_id"] == [None, None, None]
+    assert set(out) == set(spatial.ENRICH_FIELDS)
+
+
+def test_unmatched_points_take_the_nearest_municipality_within_2_km():
+    out = _attribute([(-0.01, 0.5), (1.51, 0.5), (-0.03, 0.5), (1.2, -0.01)])
+
+    # ~1.1 km outside a square: nearest municipality; ~3.3 km: none
+    assert out["mun_cd_mun"] == ["2", "1", None, "1"]
+    assert out["mun_uf"] == ["BB", "AA", None, "AA"]
+    # the fallback is municipality-only
+    assert out["cd_bioma"] == [None, None, None, None]
+
+
+def test_shared_engine_reloads_only_when_the_ref_stamps_move(monkeypatch):
+    monkeypatch.setattr(spatial, "_shared", {})
+    loads: list[object] = []
+
+    def fake_from_db(conn):
+        loads.append(conn)
+        return object()
+
+    monkeypatch.setattr(SpatialEngine, "from_db", staticmethod(fake_from_db))
+    stamps = {_REF_VERSION_SQL: [("2024-01-01", "2024-01-02")]}
+    conn = _Conn(stamps)
+
+    first = shared_engine(conn)
+    assert shared_engine(conn) is first
+    assert len(loads) == 1
+
+    stamps[_REF_VERSION_SQL] = [("2024-01-01", "2024-03-01")]
+    assert shared_engine(conn) is not first
+    assert len(loads) == 2
+
+
+def test_bench_checks_against_the_production_enrich_attribution():
+    from etl.bench import _enrich_attribution_sql
+
+    section = _enrich_attribution_sql()
+    for table in ("tmp_mun", "tmp_bioma", "tmp_uc", "tmp_ti"):
+        assert f"create temp table {table}" in section
+    assert "st_dwithin(" in section
+    # attribution only: no write to the enriched table, no transaction control
+    assert "curated.inpe_focos_enriched" not in section
+    assert "commit" not in section.replace("on commit drop", "")
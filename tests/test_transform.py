@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import json
+from datetime import date
+
+from etl.transform.inpe_focos_diario import iter_inpe_csv
+from etl.transform.parallel import transform_files
+
+CSV = """id;lat;lon;data_hora_gmt;satelite;municipio;estado;bioma
+a1;-11;-52;2024-08-01 10:00:00;AQUA_M-T;SAO FELIX DO XINGU;PARA;Amazonia
+a2;-11;-53;2024-08-01 10:05:00;AQUA_M-T;ALTAMIRA;PARA;Amazonia
+a3;-10,25;-51,5;2024-08-01 11:00:00;NOAA-20;ALTAMIRA;PARA;Amazonia
+a4;-9.5;-50;2024-08-01 12:00:00;NOAA-20;MARABA;PARA;Amazonia
+"""
+
+
+def _rows(path, batch_size):
+    out = []
+    for batch in iter_inpe_csv(str(path), file_date=date(2024, 8, 1), batch_size=batch_size):
+        out.extend(zip(batch.event_hash, batch.props_json))
+    return out
+
+
+def test_props_do_not_depend_on_batch_size(tmp_path):
+    path = tmp_path / "focos.csv"
+    path.write_text(CSV, encoding="utf-8")
+
+    # batch_size=2: the first chunk holds only integral coordinates
+    assert _rows(path, 2) == _rows(path, 100)
+    props = [json.loads(p) for _, p in _rows(path, 2)]
+    assert [p["lat"] for p in props] == [-11.0, -11.0, -10.25, -9.5]
+    assert '"lat": -11.0' in _rows(path, 2)[0][1]
+
+
+def test_transform_files_matches_serial(tmp_path):
+    items = []
+    for day in (1, 2, 3):
+        d = date(2024, 8, day)
+        path = tmp_path / f"{d.isoformat()}.csv"
+        path.write_text(CSV.replace("2024-08-01", d.isoformat()), encoding="utf-8")
+        items.append((d, path))
+
+    pooled = list(transform_files(items, workers=2))
+
+    assert [day.file_date for day in pooled] == [d for d, _ in items]
+    for day, (d, path) in zip(pooled, items):
+        serial = list(iter_inpe_csv(str(path), file_date=d))
+        assert [b.event_hash for b in day.batches] == [b.event_hash for b in serial]
+        assert [b.props_json for b in day.batches] == [b.props_json for b in serial]
+        assert day.rows == sum(len(b) for b in serial)